@@ -0,0 +1,55 @@
+"""
+Measure how training throughput scales with the number of worker processes in
+src.training.parallel, from 1 worker up to one per CPU core.
+
+Usage:
+    uv run python3 -m benchmarks.bench_parallel [-n N_EPISODES] [-s SYNC_INTERVAL]
+        [-m MERGE]
+"""
+
+import argparse
+import os
+import time
+
+from src.training import train_parallel
+from src.training.parallel import MERGES
+
+
+def main(n_episodes: int, sync_interval: int, max_workers: int, merge: str) -> None:
+    print(
+        f"{n_episodes} episodes, {merge} merge every {sync_interval} episodes per "
+        "worker"
+    )
+    print(f"{os.cpu_count()} CPU cores")
+    print("workers  seconds  episodes/s  speedup")
+    baseline = None
+    for n_workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        train_parallel(
+            n_episodes,
+            n_workers=n_workers,
+            sync_interval=sync_interval,
+            merge=merge,
+            seed=0,
+        )
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(
+            f"{n_workers:7}  {elapsed:7.2f}  {n_episodes / elapsed:10,.0f}  "
+            f"{baseline / elapsed:6.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel training benchmark")
+    parser.add_argument("-n", "--n-episodes", type=int, default=100000)
+    parser.add_argument("-s", "--sync-interval", type=int, default=1000)
+    parser.add_argument("-w", "--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-m", "--merge", choices=MERGES, default="mean")
+    args = parser.parse_args()
+    main(
+        n_episodes=args.n_episodes,
+        sync_interval=args.sync_interval,
+        max_workers=args.max_workers,
+        merge=args.merge,
+    )
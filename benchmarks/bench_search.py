@@ -0,0 +1,68 @@
+"""
+Measure a depth-first traversal of the full game tree: every sequence of moves
+from the empty board, 526,906 positions in all (a game ends as soon as neither
+player can complete a line, see src.games.bitboard). The traversal plays and takes
+back moves on a single TicTacToe with play_move() and undo_move(), and is
+compared with copying the game at every position instead. The make/unmake
+traversal is src.games.tictactoe.count_positions().
+
+Memory is traced with tracemalloc: with make/unmake, the memory in use after the
+traversal is the same as before it, and the peak doesn't grow with the number of
+positions visited, so nothing is kept per position.
+
+Usage:
+    uv run python3 -m benchmarks.bench_search [-r REPEATS]
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from src.games import TicTacToe
+from src.games.tictactoe import count_positions
+
+
+def count_copy(game: TicTacToe, marker: str = "X") -> int:
+    """Count the positions in the game tree below game, playing each move on a
+    copy of it"""
+    if game.is_over():
+        return 1
+    nodes = 1
+    other = "O" if marker == "X" else "X"
+    for row, col in game.get_all_valid_moves():
+        child = game.copy()
+        child.play_move(marker, row, col)
+        nodes += count_copy(child, other)
+    return nodes
+
+
+def measure(label: str, count: Callable[[TicTacToe], int], repeats: int) -> None:
+    best = float("inf")
+    nodes = 0
+    for _ in range(repeats):
+        game = TicTacToe()
+        start = time.perf_counter()
+        nodes = count(game)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label}: {nodes:,} positions in {best:.3f}s (best of {repeats})")
+    print(f"  {nodes / best:,.0f} positions/s")
+
+    game = TicTacToe()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    count(game)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"  memory: {after - before:+,} bytes after the traversal, "
+        f"peak {peak - before:,} bytes"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Game tree traversal benchmark")
+    parser.add_argument("-r", "--repeats", type=int, default=3)
+    args = parser.parse_args()
+    measure("make/unmake", count_positions, args.repeats)
+    measure("copy", count_copy, args.repeats)
@@ -0,0 +1,74 @@
+"""
+Compare how training throughput scales with the number of threads in
+src.training.threaded against the number of worker processes in
+src.training.parallel, from 1 up to one per CPU core.
+
+Threads only run at once on a free-threaded build of Python, so run this with
+python3.14t to see them scale. With the GIL, the threads are still timed (rather
+than falling back to one), to show that they don't.
+
+Usage:
+    uv run --python 3.14t python -m benchmarks.bench_threaded [-n N_EPISODES]
+        [-w MAX_WORKERS] [-m MERGE] [-b BACKEND]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from src.training import train_parallel
+from src.training.episode import BACKENDS
+from src.training.parallel import MERGES
+from src.training.threaded import gil_enabled, train_threaded
+
+
+def main(n_episodes: int, max_workers: int, merge: str, backend: str) -> None:
+    print(f"Python {sys.version.split()[0]}, GIL {'on' if gil_enabled() else 'off'}")
+    print(f"{n_episodes} episodes, processes merging by {merge}")
+    print(f"{os.cpu_count()} CPU cores")
+    print(
+        "workers  threads: seconds  episodes/s  speedup  processes: seconds  "
+        "episodes/s  speedup"
+    )
+    baselines: dict[str, float] = {}
+    for n_workers in range(1, max_workers + 1):
+        timings = {}
+        start = time.perf_counter()
+        train_threaded(n_episodes, n_workers, seed=0, backend=backend, fallback=False)
+        timings["threads"] = time.perf_counter() - start
+        start = time.perf_counter()
+        # Worker processes only play on the object backend:
+        train_parallel(n_episodes, n_workers=n_workers, merge=merge, seed=0)
+        timings["processes"] = time.perf_counter() - start
+
+        line = f"{n_workers:7}"
+        for kind, elapsed in timings.items():
+            baselines.setdefault(kind, elapsed)
+            line += (
+                f"  {' ' * len(kind)} {elapsed:7.2f}  {n_episodes / elapsed:10,.0f}  "
+                f"{baselines[kind] / elapsed:6.2f}x"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Threaded training benchmark")
+    parser.add_argument("-n", "--n-episodes", type=int, default=100000)
+    parser.add_argument("-w", "--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("-m", "--merge", choices=MERGES, default="mean")
+    parser.add_argument(
+        "-b",
+        "--backend",
+        choices=BACKENDS,
+        default="object",
+        help="Game for the threads to play on. Use object (the default) to "
+        "compare like for like with the processes.",
+    )
+    args = parser.parse_args()
+    main(
+        n_episodes=args.n_episodes,
+        max_workers=args.max_workers,
+        merge=args.merge,
+        backend=args.backend,
+    )
@@ -0,0 +1,82 @@
+"""
+Measure how many plies per second the TicTacToe engine can play, using the same
+sequence of calls that train.play_episode makes on every ply (observe the state,
+list valid moves, play a move and check if the game is over), and how many
+training episodes per second play_episode gets through. Both are measured for
+the object-based TicTacToe and for TableTicTacToe, which looks moves up in a
+precomputed transition table.
+
+Usage:
+    uv run python3 -m benchmarks.bench_tictactoe [-n N_GAMES]
+"""
+
+import argparse
+import random
+import time
+
+from src.agents import QLearningAgent
+from src.games import TicTacToe
+from src.games.tabletictactoe import TableTicTacToe
+from src.training.episode import BACKENDS, play_episode
+
+
+def play_random_games(n_games: int, seed: int = 0, backend: str = "object") -> int:
+    """Play n_games of random moves and return the total number of plies"""
+    rng = random.Random(seed)
+    plies = 0
+    for _ in range(n_games):
+        game: TicTacToe | TableTicTacToe
+        if backend == "object":
+            game = TicTacToe()
+            observe = game.board.as_key
+        else:
+            game = TableTicTacToe()
+            observe = game.as_key
+        marker = "X"
+        while not game.is_over():
+            observe()
+            row, col = rng.choice(game.get_all_valid_moves())
+            game.play_move(marker=marker, row=row, col=col)
+            game.is_over()
+            marker = "O" if marker == "X" else "X"
+            plies += 1
+    return plies
+
+
+def play_episodes(n_episodes: int, seed: int = 0, backend: str = "object") -> None:
+    """Train two new players on n_episodes, exploring less as they go"""
+    random.seed(seed)
+    player_x, player_o = QLearningAgent(), QLearningAgent()
+    for episode_idx in range(n_episodes):
+        alpha = 1.0 - episode_idx / n_episodes
+        play_episode(alpha, player_x, player_o, backend=backend)
+
+
+def main(n_games: int, repeats: int) -> None:
+    for backend in BACKENDS:
+        best = float("inf")
+        plies = 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            plies = play_random_games(n_games, backend=backend)
+            best = min(best, time.perf_counter() - start)
+        print(
+            f"{backend}: {n_games} games, {plies} plies in {best:.3f}s "
+            f"(best of {repeats})"
+        )
+        print(f"  {plies / best:,.0f} plies/s")
+
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            play_episodes(n_games, backend=backend)
+            best = min(best, time.perf_counter() - start)
+        print(f"  play_episode: {n_games / best:,.0f} episodes/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TicTacToe engine benchmark")
+    parser.add_argument("-n", "--n-games", type=int, default=20000)
+    parser.add_argument("-r", "--repeats", type=int, default=5)
+    args = parser.parse_args()
+    main(n_games=args.n_games, repeats=args.repeats)
@@ -0,0 +1,288 @@
+"""
+Repeatable timings of the hot paths of the game, agent, persistence and
+training code, compared against a stored baseline.
+
+Each benchmark times one operation with timeit: the number of calls is scaled
+until a run takes at least 0.2s, and the best of several runs is kept. Results
+are written as JSON, and compared against the baseline (benchmarks/
+baseline.json by default). The suite exits with status 1 if any benchmark has
+slowed down by more than the threshold.
+
+Usage:
+    uv run python3 -m benchmarks.suite [-o RESULTS.json] [-t THRESHOLD] [-k FILTER]
+    uv run python3 -m benchmarks.suite --update-baseline
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+
+from src.agents import QLearningAgent
+from src.games import TicTacToe, stateindex, statekey
+from src.games.solver import Solver
+from src.persistence import QTable
+from src.training import play_episode
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+# A game that X wins on the last move, as (marker, row, col):
+_MOVES = [
+    ("X", 0, 0),
+    ("O", 1, 1),
+    ("X", 2, 2),
+    ("O", 0, 2),
+    ("X", 2, 0),
+    ("O", 1, 0),
+    ("X", 2, 1),
+]
+_SAVED_QTABLE = Path(__file__).parents[1] / "saves" / "agent_o_q_table.csv"
+
+# Each benchmark sets up whatever it needs, and returns a function to time and
+# the number of operations that each call of the function performs. Benchmarks
+# that leave something to clean up (such as files) return a context manager
+# giving the same, which is exited once they have been timed:
+Timed = tuple[Callable[[], object], int]
+Benchmark = Callable[[], Timed | AbstractContextManager[Timed]]
+
+
+def _mid_game() -> TicTacToe:
+    game = TicTacToe()
+    for marker, row, col in _MOVES[:4]:
+        game.play_move(marker, row, col)
+    return game
+
+
+def bench_play_move() -> Timed:
+    """TicTacToe.play_move, on a new game that is played until X wins"""
+
+    def play() -> None:
+        game = TicTacToe()
+        for marker, row, col in _MOVES:
+            game.play_move(marker, row, col)
+
+    return play, len(_MOVES)
+
+
+def bench_is_over() -> Timed:
+    """TicTacToe.is_over, in the middle of a game"""
+    return _mid_game().is_over, 1
+
+
+def bench_as_str() -> Timed:
+    """Board.as_str, in the middle of a game"""
+    return _mid_game().board.as_str, 1
+
+
+def bench_get_all_valid_moves() -> Timed:
+    """TicTacToe.get_all_valid_moves, in the middle of a game"""
+    return _mid_game().get_all_valid_moves, 1
+
+
+def bench_select_action() -> Timed:
+    """QLearningAgent.select_action, with the saved Q-table of the O player"""
+    agent = QLearningAgent()
+    agent.load(_SAVED_QTABLE)
+    game = _mid_game()
+    state, valid_moves = game.board.as_key(), game.get_all_valid_moves()
+    return lambda: agent.select_action(state, valid_moves), 1
+
+
+def bench_update() -> Timed:
+    """QLearningAgent.update, with the saved Q-table of the O player"""
+    agent = QLearningAgent()
+    agent.load(_SAVED_QTABLE)
+    start_state = statekey.from_str("X---O----")
+    new_state = statekey.from_str("XO--O---X")
+    return lambda: agent.update(start_state, 1, 0.0, new_state), 1
+
+
+def _filled_qtable(n_states: int) -> QTable:
+    """A QTable with random values for the first n_states reachable states"""
+    rng = random.Random(0)
+    qtable = QTable()
+    for state in stateindex.KEYS[:n_states]:
+        for action in range(9):
+            qtable.update(state, action, rng.random())
+    return qtable
+
+
+def bench_save(n_states: int) -> Benchmark:
+    """QTable.save, with n_states states"""
+
+    @contextmanager
+    def setup() -> Iterator[Timed]:
+        qtable = _filled_qtable(n_states)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "qtable.csv"
+            yield lambda: qtable.save(path), 1
+
+    return setup
+
+
+def bench_load(n_states: int) -> Benchmark:
+    """QTable.load, with n_states states"""
+
+    @contextmanager
+    def setup() -> Iterator[Timed]:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "qtable.csv"
+            _filled_qtable(n_states).save(path)
+            yield lambda: QTable().load(path), 1
+
+    return setup
+
+
+def bench_play_episode(backend: str) -> Benchmark:
+    """play_episode on a backend, between agents that have already been trained
+    a little"""
+
+    def setup() -> Timed:
+        random.seed(0)
+        player_x, player_o = QLearningAgent(), QLearningAgent()
+        for _ in range(1000):
+            play_episode(1.0, player_x, player_o, backend=backend)
+        return lambda: play_episode(0.1, player_x, player_o, backend=backend), 1
+
+    return setup
+
+
+def bench_solve() -> Timed:
+    """Solver.value of the empty board, with an empty transposition table"""
+    return lambda: Solver().value(0, 0), 1
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    "game.play_move": bench_play_move,
+    "game.is_over": bench_is_over,
+    "board.as_str": bench_as_str,
+    "game.get_all_valid_moves": bench_get_all_valid_moves,
+    "agent.select_action": bench_select_action,
+    "agent.update": bench_update,
+    **{
+        f"qtable.{op.__name__[6:]}[{n}]": op(n)
+        for op in [bench_save, bench_load]
+        for n in [100, 1000, stateindex.N_STATES]
+    },
+    "training.play_episode": bench_play_episode("object"),
+    "training.play_episode[table]": bench_play_episode("table"),
+    "solver.solve": bench_solve,
+}
+
+
+def run(names: list[str], repeats: int) -> dict[str, float]:
+    """Time the named benchmarks. Return the seconds per operation of each."""
+    results = {}
+    for name in names:
+        setup = BENCHMARKS[name]()
+        if not isinstance(setup, AbstractContextManager):
+            setup = nullcontext(setup)
+        with setup as (fn, n_ops):
+            timer = timeit.Timer(fn)
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=repeats, number=number))
+        results[name] = best / number / n_ops
+    return results
+
+
+def compare(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Find the benchmarks that are more than threshold (e.g. 0.25 for 25%)
+    slower than the baseline"""
+    return [
+        name
+        for name, seconds in results.items()
+        if name in baseline and seconds > baseline[name] * (1 + threshold)
+    ]
+
+
+def main(
+    output: None | Path,
+    baseline_path: Path,
+    threshold: float,
+    pattern: str,
+    repeats: int,
+    update_baseline: bool,
+) -> int:
+    names = [name for name in BENCHMARKS if pattern in name]
+    results = run(names, repeats)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if output is not None:
+        output.write_text(json.dumps(report, indent=2) + "\n")
+    if update_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+
+    baseline = {}
+    if baseline_path.exists():
+        stored = json.loads(baseline_path.read_text())
+        baseline = stored["results"]
+        if (stored["python"], stored["machine"]) != (
+            report["python"],
+            report["machine"],
+        ):
+            print(
+                f"Baseline was measured on Python {stored['python']} "
+                f"({stored['machine']}), so timings may not be comparable"
+            )
+    regressions = compare(results, baseline, threshold)
+
+    print(f"{'benchmark':28}  {'us/op':>10}  {'baseline':>10}  {'change':>7}")
+    for name, seconds in results.items():
+        line = f"{name:28}  {seconds * 1e6:10.3f}"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f"  {baseline[name] * 1e6:10.3f}  {change:+7.1%}"
+        if name in regressions:
+            line += "  REGRESSION"
+        print(line)
+
+    if regressions:
+        print(
+            f"{len(regressions)} benchmark(s) slower than baseline by > {threshold:.0%}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hot path benchmark suite")
+    parser.add_argument("-o", "--output", type=Path, default=None)
+    parser.add_argument("-b", "--baseline", type=Path, default=BASELINE)
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Fail if a benchmark is this much slower than baseline. Default=0.25",
+    )
+    parser.add_argument(
+        "-k", "--filter", default="", help="Only run benchmarks containing this"
+    )
+    parser.add_argument("-r", "--repeats", type=int, default=5)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Save the results as the new baseline",
+    )
+    args = parser.parse_args()
+    sys.exit(
+        main(
+            output=args.output,
+            baseline_path=args.baseline,
+            threshold=args.threshold,
+            pattern=args.filter,
+            repeats=args.repeats,
+            update_baseline=args.update_baseline,
+        )
+    )
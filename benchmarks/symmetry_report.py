@@ -0,0 +1,89 @@
+"""
+Compare training with and without symmetry canonicalization (see
+src.games.symmetry). For each, report the number of rows in each Q-table, the
+size of the saved CSV files, and how many episodes it took to converge.
+
+Every CHECK_EVERY episodes, each agent's greedy policy is played against every
+possible sequence of opponent moves (see src.training.evaluation), and the fraction of those games that the
+agent loses is recorded. Training has converged once the losing fraction for
+both agents falls below TOLERANCE and stays there for the rest of the run.
+
+Usage:
+    uv run python3 -m benchmarks.symmetry_report [-n N_EPISODES] [-k CHECK_EVERY]
+"""
+
+import argparse
+import random
+import tempfile
+from pathlib import Path
+
+from src.agents import QLearningAgent
+from src.persistence import QTable
+from src.training.evaluation import losing_fraction
+from train import play_episode
+
+
+def run(
+    n_episodes: int, check_every: int, tolerance: float, symmetric: bool, seed: int
+) -> dict:
+    random.seed(seed)
+    player_x = QLearningAgent(symmetric=symmetric)
+    player_o = QLearningAgent(symmetric=symmetric)
+
+    converged_at = None
+    for episode_idx in range(n_episodes):
+        alpha = 1.0 - episode_idx / n_episodes
+        play_episode(alpha, player_x=player_x, player_o=player_o)
+        if (episode_idx + 1) % check_every == 0:
+            worst = max(losing_fraction(player_x, "X"), losing_fraction(player_o, "O"))
+            if worst > tolerance:
+                converged_at = None
+            elif converged_at is None:
+                converged_at = episode_idx + 1
+
+    # Training may have ended between checks, or before the first:
+    final_losing = max(losing_fraction(player_x, "X"), losing_fraction(player_o, "O"))
+    result = {"converged_at": converged_at, "final_losing": final_losing}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for marker, player in [("x", player_x), ("o", player_o)]:
+            fp = Path(tmpdir) / f"{marker}.csv"
+            player.save(fp)
+            inner = getattr(player.qtable, "inner", player.qtable)
+            assert isinstance(inner, QTable)
+            result[f"{marker}_rows"] = len(inner.table)
+            result[f"{marker}_bytes"] = fp.stat().st_size
+    return result
+
+
+def main(n_episodes: int, check_every: int, tolerance: float, seeds: int) -> None:
+    print(
+        f"{n_episodes} episodes, policies checked every {check_every}, "
+        f"converged when losing < {tolerance:.0%}"
+    )
+    print(
+        "symmetry  seed  X rows  O rows  X CSV (kB)  O CSV (kB)  final losing  "
+        "converged at"
+    )
+    for symmetric in [False, True]:
+        for seed in range(seeds):
+            r = run(n_episodes, check_every, tolerance, symmetric, seed)
+            print(
+                f"{symmetric!s:8}  {seed:4}  {r['x_rows']:6}  {r['o_rows']:6}  "
+                f"{r['x_bytes'] / 1000:10.1f}  {r['o_bytes'] / 1000:10.1f}  "
+                f"{r['final_losing']:12.1%}  {r['converged_at'] or 'never':>12}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Symmetry canonicalization report")
+    parser.add_argument("-n", "--n-episodes", type=int, default=20000)
+    parser.add_argument("-k", "--check-every", type=int, default=500)
+    parser.add_argument("-t", "--tolerance", type=float, default=0.02)
+    parser.add_argument("-s", "--seeds", type=int, default=3)
+    args = parser.parse_args()
+    main(
+        n_episodes=args.n_episodes,
+        check_every=args.check_every,
+        tolerance=args.tolerance,
+        seeds=args.seeds,
+    )
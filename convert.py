@@ -0,0 +1,103 @@
+"""
+Convert saved Q-tables between CSV files and the binary format of
+src.persistence.binaryformat, or compile them into greedy policies (see
+src.agents.policyagent). Each file is written next to the original, with the
+other extension.
+
+Usage:
+    uv run python3 convert.py saves/agent_x_q_table.csv saves/agent_o_q_table.csv
+    uv run python3 convert.py --policy saves/agent_o_q_table.csv
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from src.agents import PolicyAgent
+from src.agents.policyagent import compile_policy
+from src.games import stateindex
+from src.persistence import ArrayQTable, Persistence, SymmetricQTable, binaryformat
+
+
+def convert(src: Path, symmetric: bool = False, dtype: str = "float64") -> Path:
+    """
+    Convert a saved Q-table to the other format. Return the path of the new file.
+
+    Arguments:
+    src (Path): CSV or binary file to convert
+    symmetric (bool): The table was trained with symmetry. Only used when
+    converting from CSV, as binary files record it themselves.
+    dtype (str): Type of the values in the binary file
+    """
+    qtable = ArrayQTable()
+    qtable.load(src)
+    if binaryformat.is_binary(src):
+        dst = src.with_suffix(".csv")
+        qtable.save(dst)
+        return dst
+
+    # Only keep the states in the table, rather than every state:
+    dst = src.with_suffix(binaryformat.SUFFIX)
+    state_ids = np.flatnonzero(qtable.visited)
+    state_rows = np.full(stateindex.N_STATES, -1, dtype=np.int32)
+    state_rows[state_ids] = np.arange(len(state_ids))
+    binaryformat.write(
+        dst, state_rows, qtable.values[state_ids].astype(dtype), symmetric=symmetric
+    )
+    return dst
+
+
+def compile_file(src: Path, symmetric: bool = False) -> Path:
+    """
+    Compile a saved Q-table into a policy. Return the path of the policy file.
+
+    Arguments:
+    src (Path): CSV or binary file to compile
+    symmetric (bool): The table was trained with symmetry. Only used for CSV
+    files, as binary files record it themselves.
+    """
+    qtable = ArrayQTable()
+    qtable.load(src)
+    if binaryformat.is_binary(src):
+        symmetric = binaryformat.read(src).symmetric
+    dst = src.with_suffix(".policy")
+    policy_qtable: Persistence = SymmetricQTable(qtable) if symmetric else qtable
+    PolicyAgent(compile_policy(policy_qtable)).save(dst)
+    return dst
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert saved Q-tables between CSV and binary files"
+    )
+    parser.add_argument("files", type=Path, nargs="+")
+    parser.add_argument(
+        "--symmetry",
+        action="store_true",
+        help="The CSV files were saved with --symmetry",
+    )
+    parser.add_argument(
+        "--policy",
+        action="store_true",
+        help="Compile the Q-tables into policy files for play.py",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["float64", "float32"],
+        default="float64",
+        help="Type of the values in binary files. Default=float64",
+    )
+    args = parser.parse_args()
+    for src in args.files:
+        if args.policy:
+            dst = compile_file(src, symmetric=args.symmetry)
+        else:
+            dst = convert(src, symmetric=args.symmetry, dtype=args.dtype)
+        print(
+            f"{src} ({src.stat().st_size:,} bytes) -> {dst} ({dst.stat().st_size:,} bytes)"
+        )
+
+
+if __name__ == "__main__":
+    main()
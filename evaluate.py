@@ -0,0 +1,63 @@
+"""
+Score saved agents against perfect play, over every position they can face (see
+src.training.evaluation). Each file can be a Q-table (CSV or binary) or a
+compiled policy.
+
+Usage:
+    uv run python3 evaluate.py saves/agent_o_q_table.policy
+    uv run python3 evaluate.py --marker X saves/agent_x_q_table.csv
+"""
+
+import argparse
+from pathlib import Path
+
+from src.agents import Agent, PolicyAgent, QLearningAgent
+from src.persistence import ArrayQTable, binaryformat
+from src.training.evaluation import evaluate_agent
+
+
+def load_agent(fp: Path, symmetric: bool = False) -> Agent:
+    """Load a saved policy or Q-table"""
+    agent: Agent
+    if fp.suffix == ".policy":
+        agent = PolicyAgent()
+    else:
+        if binaryformat.is_binary(fp):
+            symmetric = binaryformat.read(fp).symmetric
+        agent = QLearningAgent(qtable=ArrayQTable(), symmetric=symmetric)
+    agent.load(fp)
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score saved agents against perfect play"
+    )
+    parser.add_argument("files", type=Path, nargs="+")
+    parser.add_argument(
+        "--marker",
+        choices=["X", "O"],
+        default="O",
+        help="The side the agents were trained to play. Default=O",
+    )
+    parser.add_argument(
+        "--symmetry",
+        action="store_true",
+        help="The CSV files were saved with --symmetry",
+    )
+    args = parser.parse_args()
+    for fp in args.files:
+        result = evaluate_agent(load_agent(fp, args.symmetry), args.marker)
+        print(f"{fp} playing {result.marker}:")
+        print(f"  exploitability: {result.exploitability:g}")
+        print(
+            f"  optimal moves:  {result.optimal_fraction:.1%} of "
+            f"{result.n_positions:,} positions"
+        )
+        print(f"  losing states:  {len(result.losing_states)}")
+        for state in result.losing_states:
+            print(f"    {state}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
+import argparse
 from pathlib import Path
 
-from src.agents import QLearningAgent
+from src.agents import Agent, PolicyAgent, QLearningAgent
 from src.exceptions import IllegalMoveError
 from src.games import TicTacToe
+from src.persistence import ArrayQTable, binaryformat
 
 
 class CLI:
@@ -35,10 +37,26 @@ class CLI:
 
 
 class Play:
-    def __init__(self):
+    def __init__(
+        self, symmetric: bool = False, fp: Path = Path("saves/agent_o_q_table.policy")
+    ):
+        """
+        symmetric (bool): A CSV Q-table was trained with symmetry. Binary
+        Q-tables record this themselves.
+        fp (Path): The computer player's compiled policy (.policy) or Q-table
+        """
         self.game = TicTacToe()
-        self.computer_player = QLearningAgent()
-        self.computer_player.load(Path("saves/agent_o_q_table.csv"))
+        self.computer_player: Agent
+        if fp.suffix == ".policy":
+            self.computer_player = PolicyAgent()
+        else:
+            # Binary Q-tables are mapped into memory rather than parsed:
+            qtable = None
+            if binaryformat.is_binary(fp):
+                qtable = ArrayQTable()
+                symmetric = binaryformat.read(fp).symmetric
+            self.computer_player = QLearningAgent(qtable=qtable, symmetric=symmetric)
+        self.computer_player.load(fp)
         self.cli = CLI(game=self.game)
 
     def run(self):
@@ -58,7 +76,7 @@ class Play:
                 break
 
             # Computer player's turn:
-            start_state = self.game.board.as_str()
+            start_state = self.game.board.as_key()
             all_valid_moves = self.game.get_all_valid_moves()
             row, col = self.computer_player.select_action(start_state, all_valid_moves)
             self.cli.show_opponent_move(row, col)
@@ -77,7 +95,26 @@ class Play:
 
 
 def main():
-    play = Play()
+    parser = argparse.ArgumentParser(description="Play tic-tac-toe against the AI")
+    parser.add_argument(
+        "--symmetry",
+        action="store_true",
+        help="The CSV Q-table was trained with --symmetry",
+    )
+    saved = parser.add_mutually_exclusive_group()
+    saved.add_argument(
+        "--policy",
+        type=Path,
+        default=Path("saves/agent_o_q_table.policy"),
+        help="The O player's compiled policy. Default=saves/agent_o_q_table.policy",
+    )
+    saved.add_argument(
+        "--qtable",
+        type=Path,
+        help="Play the O player's saved Q-table instead of a compiled policy",
+    )
+    args = parser.parse_args()
+    play = Play(symmetric=args.symmetry, fp=args.qtable or args.policy)
     play.run()
 
 
@@ -1,2 +1,3 @@
 from src.agents.interface import Agent as Agent
+from src.agents.policyagent import PolicyAgent as PolicyAgent
 from src.agents.qlearningagent import QLearningAgent as QLearningAgent
@@ -1,33 +1,99 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
 
+import numpy as np
+
+from src.games import stateindex
+from src.persistence.interface import State
+
+# A move, as its (row, col) coordinates or its cell index (3 * row + col):
+Move = int | np.integer | tuple[int, int]
+
 
 class Agent(ABC):  # pragma: no cover
     """Defines the interfaces for any agent class"""
 
     @abstractmethod
     def select_action(
-        self, state: str, valid_moves: list[tuple[int, int]]
+        self, state: State, valid_moves: list[tuple[int, int]]
     ) -> tuple[int, int]:
         """
-        Choose an action given the current state and available actions.
+        Choose an action given the current state, as its base-3 key (see
+        src.games.statekey) or its string form, and the available actions.
         """
         pass
 
+    def select_actions(
+        self,
+        states: np.ndarray,
+        valid_mask: np.ndarray,
+        epsilon: float = 0.0,
+        rng: None | np.random.Generator = None,
+    ) -> np.ndarray:
+        """
+        Choose an action for each of a batch of states, given by their dense ids
+        (see src.games.stateindex), and an (n_states, 9) mask of the valid
+        actions. With probability epsilon, a random valid action is chosen
+        instead. Return the action indexes (3 * row + col).
+
+        By default, select_action() is called on each state in turn.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        actions = np.empty(len(states), dtype=np.intp)
+        for i, (idx, valid) in enumerate(zip(states.tolist(), valid_mask)):
+            valid_actions = np.flatnonzero(valid).tolist()
+            if epsilon > 0.0 and rng.random() < epsilon:
+                actions[i] = rng.choice(valid_actions)
+            else:
+                valid_moves = [divmod(action, 3) for action in valid_actions]
+                row, col = self.select_action(stateindex.KEYS[idx], valid_moves)
+                actions[i] = 3 * row + col
+        return actions
+
     @abstractmethod
     def update(
         self,
-        start_state: str,
-        action: tuple[int, int],
+        start_state: State,
+        action: Move,
         reward: float,
-        new_state: str,
+        new_state: State,
         done: bool = False,
     ):
         """
-        Update the agent's internal state based on an observed transition.
+        Update the agent's internal state based on an observed transition, with
+        states given by their keys (or string forms).
         """
         pass
 
+    def update_many(
+        self,
+        start_states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        new_states: np.ndarray,
+        dones: np.ndarray,
+    ):
+        """
+        Update the agent's internal state based on a batch of observed
+        transitions, with states given by their dense ids and actions by their
+        indexes. The result must be the same as calling update() on each
+        transition in turn, which is what happens by default.
+        """
+        for start_state, action, reward, new_state, done in zip(
+            start_states.tolist(),
+            actions.tolist(),
+            rewards.tolist(),
+            new_states.tolist(),
+            dones.tolist(),
+        ):
+            self.update(
+                stateindex.KEYS[start_state],
+                action,
+                reward,
+                stateindex.KEYS[new_state],
+                done,
+            )
+
     @abstractmethod
     def save(self, fp: Path):
         """
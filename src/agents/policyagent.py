@@ -0,0 +1,142 @@
+"""
+An agent that plays a fixed, precompiled policy: the action a trained agent's
+Q-table rates best in each state, stored as one byte per state (see
+src.games.stateindex), so that choosing a move is a single lookup.
+
+compile_policy() turns a Q-table into a policy, picking the same move that
+QLearningAgent.select_action() would. A compiled policy is saved as a small
+binary file:
+    header (12 bytes, little-endian):
+        magic       4s   b"QPOL"
+        version     u16  VERSION
+        (2 bytes of padding)
+        n_states    u32  stateindex.N_STATES when the file was written
+    actions (n_states x uint8):
+        the action index (3 * row + col) to play in each state, or NO_ACTION for
+        states with no empty cells
+"""
+
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from src.agents import Agent
+from src.agents.interface import Move
+from src.exceptions import FrozenPolicyError
+from src.games import stateindex
+from src.persistence import ArrayQTable, Persistence
+from src.persistence.interface import State, to_state_id
+
+MAGIC = b"QPOL"
+VERSION = 1
+NO_ACTION = 255
+
+_HEADER = struct.Struct("<4sH2xI")
+
+# The cells that are empty in every state:
+_VALID_MASK = (
+    (np.array(stateindex.X_BITS) | np.array(stateindex.O_BITS))[:, None]
+    & (1 << np.arange(9))
+) == 0
+
+
+def compile_policy(qtable: Persistence) -> np.ndarray:
+    """Find the best valid action in every state of a Q-table, with ties going to
+    the lowest action index, as with QLearningAgent.select_action()"""
+    scores = qtable.get_rows(np.arange(stateindex.N_STATES))
+    actions = np.argmax(np.where(_VALID_MASK, scores, -np.inf), axis=1)
+    return np.where(_VALID_MASK.any(axis=1), actions, NO_ACTION).astype(np.uint8)
+
+
+class PolicyAgent(Agent):
+    def __init__(self, policy: None | np.ndarray = None) -> None:
+        """
+        policy (np.ndarray): Action to play in each state, as returned by
+        compile_policy(). Default is to play the first empty cell.
+        """
+        self.policy = compile_policy(ArrayQTable()) if policy is None else policy
+        self.rng = np.random.default_rng()
+
+    def select_action(
+        self, state: State, valid_moves: list[tuple[int, int]]
+    ) -> tuple[int, int]:
+        """Select the move to play for a given state. Return the coordinates in
+        (row, col) form
+
+        If the policy's move isn't one of valid_moves, play the first valid move
+        instead, counting cells row by row."""
+        if not valid_moves:
+            raise RuntimeError("No valid moves")
+        row, col = divmod(int(self.policy[to_state_id(state)]), 3)
+        if (row, col) not in valid_moves:
+            row, col = min(valid_moves)
+        return row, col
+
+    def select_actions(
+        self,
+        states: np.ndarray,
+        valid_mask: np.ndarray,
+        epsilon: float = 0.0,
+        rng: None | np.random.Generator = None,
+    ) -> np.ndarray:
+        """Select the policy's action for each of a batch of states, or with
+        probability epsilon a random valid action"""
+        if not valid_mask.any(axis=1).all():
+            raise RuntimeError("No valid moves")
+        actions = self.policy[states].astype(np.intp)
+        if epsilon > 0.0:
+            rng = self.rng if rng is None else rng
+            explore = rng.random(len(states)) < epsilon
+            random_actions = np.argmax(
+                np.where(valid_mask, rng.random(valid_mask.shape), -np.inf), axis=1
+            )
+            actions = np.where(explore, random_actions, actions)
+        return actions
+
+    def update(
+        self,
+        start_state: State,
+        action: Move,
+        reward: float,
+        new_state: State,
+        done: bool = False,
+    ) -> None:
+        """A compiled policy can't learn"""
+        raise FrozenPolicyError("A compiled policy can't be trained")
+
+    def update_many(
+        self,
+        start_states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        new_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """A compiled policy can't learn"""
+        raise FrozenPolicyError("A compiled policy can't be trained")
+
+    def save(self, fp: Path) -> None:
+        """Save the policy to file"""
+        with Path(fp).open("wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, stateindex.N_STATES))
+            f.write(self.policy.astype(np.uint8).tobytes())
+
+    def load(self, fp: Path) -> None:
+        """Load a policy from file
+
+        Raise ValueError if the file is not a policy, or was written for a
+        different set of states."""
+        data = Path(fp).read_bytes()
+        magic, version, n_states = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{fp} is not a policy file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported policy file version: {version}")
+        if n_states != stateindex.N_STATES:
+            raise ValueError(
+                f"{fp} has {n_states} states, expected {stateindex.N_STATES}"
+            )
+        self.policy = np.frombuffer(
+            data, dtype=np.uint8, count=n_states, offset=_HEADER.size
+        )
@@ -1,7 +1,52 @@
+import math
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Self
+
+import numpy as np
 
 from src.agents import Agent
-from src.persistence import QTable
+from src.agents.interface import Move
+from src.games import stateindex, statekey
+from src.persistence import Persistence, QTable, SymmetricQTable, binaryformat
+from src.persistence.interface import State, to_key
+
+
+@dataclass
+class ValueChanges:
+    """Running totals of how much updates have changed Q-values. To measure the
+    changes over an interval, keep a copy of the totals at the start of it."""
+
+    count: int = 0
+    total: float = 0.0
+    # The largest change since take_max() was last called:
+    max: float = 0.0
+
+    def add(self, change: float) -> None:
+        """Count an update that changed a Q-value by change (either way)"""
+        change = abs(change)
+        self.count += 1
+        self.total += change
+        self.max = max(self.max, change)
+
+    def add_many(self, changes: np.ndarray) -> None:
+        """Count a batch of updates"""
+        if len(changes):
+            changes = np.abs(changes)
+            self.count += len(changes)
+            self.total += float(changes.sum())
+            self.max = max(self.max, float(changes.max()))
+
+    def mean_since(self, earlier: Self) -> float:
+        """Get the mean change of the updates counted since earlier, a copy of
+        these totals"""
+        count = self.count - earlier.count
+        return (self.total - earlier.total) / count if count else 0.0
+
+    def take_max(self) -> float:
+        """Get the largest change, and start looking for the largest again"""
+        largest, self.max = self.max, 0.0
+        return largest
 
 
 class QLearningAgent(Agent):
@@ -9,59 +54,315 @@ class QLearningAgent(Agent):
         self,
         alpha: float = 0.2,
         gamma: float = 0.9,
+        qtable: None | Persistence = None,
+        symmetric: bool = False,
+        cache_best: bool = True,
     ) -> None:
         """
         marker (str): Player's mark ("X" or "O")
         alpha (float): Learning rate. Default 0.05.
         gamma (float): Discount factor for future rewards. Default 0.9.
+        qtable (Persistence): Where to keep the Q-values. Default is an empty
+        QTable.
+        symmetric (bool): Share Q-values between rotations and reflections of the
+        board, by keeping only the canonical form of each state in the Q-table.
+        cache_best (bool): Keep the best value and action of each state, updated
+        as the agent changes its values, so that greedy moves and bootstrapping
+        don't scan every action. Turn off if anything else writes to the Q-table
+        while the agent is using it. Always off with symmetric, where an update
+        changes every rotation and reflection of the state. Default True.
         """
-        self.qtable = QTable()
+        self._cache_best = cache_best
+        self.qtable = QTable() if qtable is None else qtable
+        if symmetric:
+            self.qtable = SymmetricQTable(self.qtable)
         self.alpha = alpha
         self.gamma = gamma
+        self.rng = np.random.default_rng()
+        # How much the Q-values have been changed by updates:
+        self.changes = ValueChanges()
+
+    @property
+    def qtable(self) -> Persistence:
+        """The agent's Q-table. With cache_best, the agent keeps the best value
+        and action of the states it has looked at, and only keeps them up to
+        date through its own update() and update_many(). After writing to the
+        table any other way (such as qtable.update(), or into the values of an
+        ArrayQTable), call clear_cache(), or the agent may go on choosing moves
+        and bootstrapping from the old values. Setting the table clears the
+        cache too."""
+        return self._qtable
+
+    @qtable.setter
+    def qtable(self, qtable: Persistence) -> None:
+        self._qtable = qtable
+        self._caching = self._cache_best and not isinstance(qtable, SymmetricQTable)
+        # For each state looked at, keyed by state key, the best value of any
+        # action and the lowest action index with that value, then the same for
+        # just the actions on empty cells (the moves that can be played):
+        self._best: dict[int, tuple[float, int, float, int]] = {}
+
+    def clear_cache(self) -> None:
+        """Forget the cached best value and action of every state, after the
+        Q-table has been written to other than by this agent"""
+        self._best.clear()
 
     def select_action(
-        self, state: str, valid_moves: list[tuple[int, int]]
+        self, state: State, valid_moves: list[tuple[int, int]]
     ) -> tuple[int, int]:
-        """Select the best move to play for a given state. Return the coordinates
-        in (row, col) form"""
+        """Select the best move to play for a given state, out of valid_moves (some
+        or all of the empty cells). Ties go to the lowest action index. Return the
+        coordinates in (row, col) form"""
         if not valid_moves:
             raise RuntimeError("No valid moves")
-        all_action_values = self.qtable.get_values(state)
-        valid_moves_str = [f"{i}{j}" for i, j in valid_moves]
-        valid_action_values: dict[str, float] = {
-            k: v for k, v in all_action_values.items() if k in valid_moves_str
-        }
-        best_action = max(valid_action_values, key=lambda k: valid_action_values[k])
-        return int(best_action[0]), int(best_action[1])
+        if self._caching:
+            # The best move on an empty cell, unless the caller has ruled it out:
+            move = divmod(self._best_of(to_key(state))[3], 3)
+            if move in valid_moves:
+                return move
+        values = self.qtable.action_values(state)
+        actions = sorted(3 * row + col for row, col in valid_moves)
+        row, col = divmod(max(actions, key=values.__getitem__), 3)
+        return row, col
+
+    def select_actions(
+        self,
+        states: np.ndarray,
+        valid_mask: np.ndarray,
+        epsilon: float = 0.0,
+        rng: None | np.random.Generator = None,
+    ) -> np.ndarray:
+        """Select the best valid action for each of a batch of states, or with
+        probability epsilon a random valid action. Ties go to the lowest action
+        index, as with select_action().
+
+        Arguments:
+        states (np.ndarray): Dense ids of the states (see src.games.stateindex)
+        valid_mask (np.ndarray): (n_states, 9) array that is True for valid actions
+        epsilon (float): Probability of exploring. Default 0.0.
+        rng (np.random.Generator): Source of randomness. Default is the agent's.
+
+        Returns:
+        The action indexes (3 * row + col)
+        """
+        if not valid_mask.any(axis=1).all():
+            raise RuntimeError("No valid moves")
+        scores = self.qtable.get_rows(states)
+        if epsilon > 0.0:
+            rng = self.rng if rng is None else rng
+            explore = rng.random(len(states)) < epsilon
+            scores = np.where(explore[:, None], rng.random(scores.shape), scores)
+        return np.argmax(np.where(valid_mask, scores, -np.inf), axis=1)
 
     def update(
         self,
-        start_state: str,
-        action: tuple[int, int],
+        start_state: State,
+        action: Move,
         reward: float,
-        new_state: str,
+        new_state: State,
         done: bool = False,
     ) -> None:
         """Update the Q-Table based on the outcome of the action played
 
         Arguments:
-        start_state (str): String representation of state before the move was played
-        action (tuple[int, int]): Coordinates of move played (row, col)
+        start_state (State): Key (or string representation) of state before the
+        move was played
+        action (Move): Cell index (3 * row + col) or coordinates (row, col) of
+        move played
         reward (float): Reward received (can be zero)
-        new_state (str): String representation of state after the move was played
+        new_state (State): Key (or string representation) of state after the move
+        was played
         done (bool): Set to True if the game is over
         """
-        action_str = f"{action[0]}{action[1]}"
-        q = self.qtable.get_values(start_state, action_str)[action_str]
-        q_next_all = self.qtable.get_values(new_state)
-        max_future_reward = 0.0 if done else max(q_next_all.values())
+        action = 3 * action[0] + action[1] if isinstance(action, tuple) else int(action)
+        q = self.qtable.get_value(start_state, action)
+        if done:
+            max_future_reward = 0.0
+        elif self._caching:
+            new_key = to_key(new_state)
+            max_future_reward = (self._best.get(new_key) or self._best_of(new_key))[0]
+        else:
+            max_future_reward = self.qtable.max_value(new_state)
         q_next = (1 - self.alpha) * q + self.alpha * (
             reward + self.gamma * max_future_reward
         )
-        self.qtable.update(start_state, action_str, q_next)
+        self.qtable.update(start_state, action, q_next)
+        self.changes.add(q_next - q)
+        if self._caching:
+            start_key = to_key(start_state)
+            best = self._best.get(start_key)
+            # Nothing to do unless action was, or now ties or beats, a best one:
+            if best is not None and (
+                q_next >= best[0]
+                or q_next >= best[2]
+                or action == best[1]
+                or action == best[3]
+            ):
+                self._update_best(start_key, action, q_next, best)
+
+    def _best_of(self, key: int) -> tuple[float, int, float, int]:
+        """Get the best value of any action in a state and the lowest action
+        index with that value, then the same over the empty cells (-inf and -1
+        if there are none), scanning the state's actions if not cached"""
+        best = self._best.get(key)
+        if best is None:
+            values = self.qtable.action_values(key)
+            value = max(values)
+            moves = statekey.empty_cells(key)
+            move = max(moves, key=values.__getitem__, default=-1)
+            best = self._best[key] = (
+                value,
+                values.index(value),
+                values[move] if moves else -math.inf,
+                move,
+            )
+        return best
+
+    def _update_best(
+        self, key: int, action: int, value: float, best: tuple[float, int, float, int]
+    ) -> None:
+        """Keep the cached best of a state in step with a new value of action"""
+        best_value, best_action, move_value, move = best
+        if value > best_value or (value == best_value and action < best_action):
+            best_value, best_action = value, action
+        elif action == best_action and value < best_value:
+            # Another action may be best now, so scan again when next needed:
+            del self._best[key]
+            return
+        if key // statekey.WEIGHTS[action] % 3 == 0:
+            if value > move_value or (value == move_value and action < move):
+                move_value, move = value, action
+            elif action == move and value < move_value:
+                del self._best[key]
+                return
+        self._best[key] = (best_value, best_action, move_value, move)
+
+    def update_many(
+        self,
+        start_states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        new_states: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """Update the Q-Table based on a batch of transitions, with the same result
+        as calling update() on each of them in turn. If a (state, action) pair comes
+        up more than once, each update builds on the last, and a transition whose
+        new state was updated earlier in the batch bootstraps from the new values.
+
+        Arguments:
+        start_states (np.ndarray): Dense ids of the states before the moves
+        actions (np.ndarray): Indexes (3 * row + col) of the moves played
+        rewards (np.ndarray): Rewards received (can be zero)
+        new_states (np.ndarray): Dense ids of the states after the moves
+        dones (np.ndarray): True where the game is over
+        """
+        if self._caching:
+            for idx in set(start_states.tolist()):
+                self._best.pop(stateindex.KEYS[idx], None)
+        rows, cols = self.qtable.locate(start_states, actions)
+        next_rows, _ = self.qtable.locate(new_states, np.zeros_like(actions))
+        keys = rows.astype(np.int64) * 9 + cols
+
+        # Split the batch wherever a transition bootstraps from a row that was
+        # updated earlier in the same run, so that every run can be applied at once:
+        begin = 0
+        while begin < len(keys):
+            end = _independent_run_end(rows, next_rows, dones, begin)
+            run = slice(begin, end)
+            self._update_run(
+                start_states[run],
+                actions[run],
+                rewards[run],
+                new_states[run],
+                dones[run],
+                keys[run],
+            )
+            begin = end
+
+    def _update_run(
+        self,
+        start_states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        new_states: np.ndarray,
+        dones: np.ndarray,
+        keys: np.ndarray,
+    ) -> None:
+        """Apply a run of transitions that don't bootstrap from each other"""
+        n = len(keys)
+        q = self.qtable.get_rows(start_states)[np.arange(n), actions]
+        max_future_rewards = np.where(
+            dones, 0.0, self.qtable.get_rows(new_states).max(axis=1)
+        )
+        targets = rewards + self.gamma * max_future_rewards
+
+        # Group repeats of the same (state, action) pair, in order. Applying m
+        # updates in turn to a value q gives:
+        #   (1 - alpha)^m * q + sum_i alpha * (1 - alpha)^(m - 1 - i) * target_i
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(
+            np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+        )
+        sizes = np.diff(starts, append=n)
+        ranks = np.arange(n) - np.repeat(starts, sizes)
+        decay = 1 - self.alpha
+        weighted_targets = (
+            self.alpha * decay ** (np.repeat(sizes, sizes) - 1 - ranks) * targets[order]
+        )
+        first = order[starts]
+        q_next = decay**sizes * q[first] + np.add.reduceat(weighted_targets, starts)
+        self.qtable.update_many(start_states[first], actions[first], q_next)
+        # Repeats of a pair count as one update, by their combined change:
+        self.changes.add_many(q_next - q[first])
 
     def save(self, fp: Path):
         self.qtable.save(fp)
 
     def load(self, fp: Path):
+        symmetric = isinstance(self.qtable, SymmetricQTable)
+        if binaryformat.is_binary(fp) and binaryformat.read(fp).symmetric != symmetric:
+            raise ValueError(
+                f"{fp} was saved {'without' if symmetric else 'with'} symmetry"
+            )
         self.qtable.load(fp)
+        self.clear_cache()
+
+
+def _independent_run_end(
+    rows: np.ndarray, next_rows: np.ndarray, dones: np.ndarray, begin: int
+) -> int:
+    """Find the end of the longest run of transitions from begin in which no
+    transition bootstraps from a row that was updated earlier in the run"""
+    # Look for a conflict in a window that doubles until one is found, so that a
+    # batch split into many short runs isn't searched to the end for each:
+    size = 64
+    while True:
+        end = min(begin + size, len(rows))
+        conflict = _first_conflict(
+            rows[begin:end], next_rows[begin:end], dones[begin:end]
+        )
+        if conflict is not None:
+            return begin + conflict
+        if end == len(rows):
+            return end
+        size *= 2
+
+
+def _first_conflict(
+    rows: np.ndarray, next_rows: np.ndarray, dones: np.ndarray
+) -> None | int:
+    """Find the first transition that bootstraps from a row updated earlier in
+    the batch, if any"""
+    # Rows in order, each bootstrapping from a later row, can't conflict (as with
+    # transitions sorted by state id, which grows with each move):
+    if (rows[1:] >= rows[:-1]).all() and ((next_rows > rows) | dones).all():
+        return None
+    written, first_written = np.unique(rows, return_index=True)
+    pos = np.minimum(np.searchsorted(written, next_rows), len(written) - 1)
+    written_before = (written[pos] == next_rows) & (
+        first_written[pos] < np.arange(len(rows))
+    )
+    conflicts = np.flatnonzero(written_before & ~dones)
+    return int(conflicts[0]) if len(conflicts) else None
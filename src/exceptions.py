@@ -1,2 +1,7 @@
 class IllegalMoveError(Exception):
     """Raised when an illegal move is attempted"""
+
+
+class FrozenPolicyError(TypeError):
+    """Raised when an agent that can't learn, such as a compiled policy, is
+    trained"""
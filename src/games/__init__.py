@@ -1 +1,2 @@
 from src.games.tictactoe import TicTacToe as TicTacToe
+from src.games.vectortictactoe import VectorTicTacToe as VectorTicTacToe
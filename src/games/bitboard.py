@@ -0,0 +1,86 @@
+"""
+Bitboard helpers for tic-tac-toe. Each player's marks are stored as a 9-bit
+integer where bit ``3 * row + col`` is set if that player occupies the cell, e.g.
+the board below has X = 0b100010001 and O = 0b000000110:
+    X|O|O
+    -----
+     |X|
+    -----
+     | |X
+
+All of the lookup tables are computed once at import time, so the game engine
+only ever does a handful of integer operations per move.
+"""
+
+FULL_BOARD = 0b111_111_111
+
+# The 8 lines that win the game, in the same order that TicTacToe has always
+# checked them (rows, columns, then diagonals):
+WIN_MASKS: tuple[int, ...] = (
+    0b000_000_111,  # top row
+    0b000_111_000,  # middle row
+    0b111_000_000,  # bottom row
+    0b001_001_001,  # left column
+    0b010_010_010,  # middle column
+    0b100_100_100,  # right column
+    0b100_010_001,  # Diagonal #1
+    0b001_010_100,  # Diagonal #2
+)
+
+ALL_LINES = (1 << len(WIN_MASKS)) - 1
+
+# For each cell index, the indexes (into WIN_MASKS) of the lines passing through it:
+LINES_THROUGH: tuple[tuple[int, ...], ...] = tuple(
+    tuple(i for i, mask in enumerate(WIN_MASKS) if mask & (1 << idx))
+    for idx in range(9)
+)
+
+# For each 9-bit occupancy mask, the (row, col) coordinates of the empty cells:
+EMPTY_CELLS: tuple[tuple[tuple[int, int], ...], ...] = tuple(
+    tuple(divmod(idx, 3) for idx in range(9) if not occupied & (1 << idx))
+    for occupied in range(FULL_BOARD + 1)
+)
+
+
+def has_won(bits: int) -> bool:
+    """True if the player owning these bits has completed a line"""
+    for mask in WIN_MASKS:
+        if bits & mask == mask:
+            return True
+    return False
+
+
+def as_str(x_bits: int, o_bits: int) -> str:
+    """Represent the board as a string, e.g. X-O---OOX"""
+    return "".join(
+        "X" if x_bits & (1 << idx) else "O" if o_bits & (1 << idx) else "-"
+        for idx in range(9)
+    )
+
+
+def evaluate(
+    x_bits: int, o_bits: int, lines: tuple[int, ...], open_lines: int
+) -> tuple[bool, None | str, int]:
+    """
+    Check the given lines (indexes into WIN_MASKS) for a winner, and strike off
+    any line that holds both an X and an O since nobody can win on it anymore.
+
+    Arguments:
+    x_bits (int): Cells occupied by X
+    o_bits (int): Cells occupied by O
+    lines (tuple[int, ...]): Lines to check
+    open_lines (int): Bitmask of lines that could still be won before this check
+
+    Returns:
+    A (complete, winner, open_lines) tuple. The game is complete if somebody won,
+    or if no line can be won by either player.
+    """
+    for line in lines:
+        mask = WIN_MASKS[line]
+        if x_bits & mask == mask:
+            return True, "X", open_lines
+        if o_bits & mask == mask:
+            return True, "O", open_lines
+        if x_bits & mask and o_bits & mask:
+            open_lines &= ~(1 << line)
+    return open_lines == 0, None, open_lines
@@ -0,0 +1,107 @@
+"""
+An exact solver for tic-tac-toe: negamax search over bitboards (see
+src.games.bitboard), with a transposition table so that every position is only
+searched once. Solving the whole game from the empty board visits each of the
+reachable positions once, and takes a few milliseconds.
+
+Values are from the point of view of the player whose turn it is:
+    WIN (1)    they can force a win
+    DRAW (0)   both players can force at least a draw
+    LOSS (-1)  their opponent can force a win (or has already won)
+Under perfect play, the empty board is a draw.
+
+solve() gives the value of every state in src.games.stateindex, and of every
+action in every state, as arrays indexed by state id.
+"""
+
+from functools import cache
+
+import numpy as np
+
+from src.games import bitboard, stateindex
+
+WIN, DRAW, LOSS = 1, 0, -1
+
+# The value given to actions that can't be played in ACTION_VALUES:
+INVALID = -2
+
+_ALL_LINE_IDXS = tuple(range(len(bitboard.WIN_MASKS)))
+
+
+class Solver:
+    def __init__(self) -> None:
+        # Transposition table of the value of every position searched so far,
+        # keyed by (x_bits << 9 | o_bits):
+        self.table: dict[int, int] = {}
+
+    def value(self, x_bits: int, o_bits: int) -> int:
+        """Get the value of a position for the player whose turn it is"""
+        key = x_bits << 9 | o_bits
+        result = self.table.get(key)
+        if result is not None:
+            return result
+
+        x_to_move = x_bits.bit_count() == o_bits.bit_count()
+        # The player who has just moved is the only one who can have won:
+        if bitboard.has_won(o_bits if x_to_move else x_bits):
+            result = LOSS
+        elif x_bits | o_bits == bitboard.FULL_BOARD:
+            result = DRAW
+        else:
+            result = max(self._child_values(x_bits, o_bits, x_to_move).values())
+        self.table[key] = result
+        return result
+
+    def action_values(self, x_bits: int, o_bits: int) -> dict[int, int]:
+        """Get the value of playing each empty cell (3 * row + col) for the
+        player whose turn it is"""
+        x_to_move = x_bits.bit_count() == o_bits.bit_count()
+        return self._child_values(x_bits, o_bits, x_to_move)
+
+    def _child_values(
+        self, x_bits: int, o_bits: int, x_to_move: bool
+    ) -> dict[int, int]:
+        occupied = x_bits | o_bits
+        values = {}
+        for idx in range(9):
+            bit = 1 << idx
+            if occupied & bit:
+                continue
+            if x_to_move:
+                values[idx] = -self.value(x_bits | bit, o_bits)
+            else:
+                values[idx] = -self.value(x_bits, o_bits | bit)
+        return values
+
+
+@cache
+def solve() -> tuple[np.ndarray, np.ndarray]:
+    """
+    Solve every reachable state. Computed once, on the first call.
+
+    Returns:
+    The value of each state, as an array indexed by state id, and the value of
+    each action in each state, as an (N_STATES, 9) array with INVALID for
+    actions that can't be played (including every action once the game is over)
+    """
+    solver = Solver()
+    solver.value(0, 0)
+    values = np.empty(stateindex.N_STATES, dtype=np.int8)
+    action_values = np.full((stateindex.N_STATES, 9), INVALID, dtype=np.int8)
+    for idx, (x_bits, o_bits) in enumerate(zip(stateindex.X_BITS, stateindex.O_BITS)):
+        values[idx] = solver.value(x_bits, o_bits)
+        if not _is_over(x_bits, o_bits):
+            for action, value in solver.action_values(x_bits, o_bits).items():
+                action_values[idx, action] = value
+    values.flags.writeable = False
+    action_values.flags.writeable = False
+    return values, action_values
+
+
+def _is_over(x_bits: int, o_bits: int) -> bool:
+    """True if somebody has won, or no line can be won by either player, as in
+    the game itself"""
+    complete, _, _ = bitboard.evaluate(
+        x_bits, o_bits, _ALL_LINE_IDXS, bitboard.ALL_LINES
+    )
+    return complete
@@ -0,0 +1,72 @@
+"""
+The whole game of tic-tac-toe as a graph over the dense state ids of
+src.games.stateindex: for every state, the state that each action leads to,
+whether the game is over, who won and whose turn it is. The graph is small
+(N_STATES x 9 successors), so it is built once and anything that needs to walk
+the game, such as value iteration, can do so with array lookups.
+
+Players are given by the integer codes of src.games.vectortictactoe (EMPTY, X
+and O).
+"""
+
+from dataclasses import dataclass
+from functools import cache
+
+import numpy as np
+
+from src.games import bitboard, stateindex
+from src.games.vectortictactoe import EMPTY, O, X
+
+# The successor given to actions that can't be played:
+NO_STATE = -1
+
+_ALL_LINE_IDXS = tuple(range(len(bitboard.WIN_MASKS)))
+
+
+@dataclass(frozen=True)
+class StateGraph:
+    # (N_STATES, 9) id of the state after each action, or NO_STATE if the cell
+    # is taken or the game is over:
+    next_ids: np.ndarray
+    # True for states where the game is over:
+    terminal: np.ndarray
+    # The winner in each state (EMPTY if nobody has won, yet or at all):
+    winner: np.ndarray
+    # The player whose turn it is in each state:
+    to_move: np.ndarray
+
+    @property
+    def legal(self) -> np.ndarray:
+        """(N_STATES, 9) array that is True for the actions that can be played"""
+        return self.next_ids != NO_STATE
+
+
+@cache
+def build() -> StateGraph:
+    """Build the state graph. Computed once, on the first call, and read-only."""
+    next_ids = np.full((stateindex.N_STATES, 9), NO_STATE, dtype=np.int32)
+    terminal = np.zeros(stateindex.N_STATES, dtype=np.bool_)
+    winner = np.full(stateindex.N_STATES, EMPTY, dtype=np.int8)
+    to_move = np.full(stateindex.N_STATES, X, dtype=np.int8)
+    for idx, (x_bits, o_bits) in enumerate(zip(stateindex.X_BITS, stateindex.O_BITS)):
+        complete, won_by, _ = bitboard.evaluate(
+            x_bits, o_bits, _ALL_LINE_IDXS, bitboard.ALL_LINES
+        )
+        x_to_move = x_bits.bit_count() == o_bits.bit_count()
+        to_move[idx] = X if x_to_move else O
+        if complete:
+            terminal[idx] = True
+            winner[idx] = {"X": X, "O": O, None: EMPTY}[won_by]
+            continue
+        occupied = x_bits | o_bits
+        for action in range(9):
+            bit = 1 << action
+            if occupied & bit:
+                continue
+            if x_to_move:
+                next_ids[idx, action] = stateindex.bits_id(x_bits | bit, o_bits)
+            else:
+                next_ids[idx, action] = stateindex.bits_id(x_bits, o_bits | bit)
+    for array in (next_ids, terminal, winner, to_move):
+        array.flags.writeable = False
+    return StateGraph(next_ids, terminal, winner, to_move)
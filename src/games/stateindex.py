@@ -0,0 +1,103 @@
+"""
+A dense index of every tic-tac-toe position that can be reached by playing
+TicTacToe from an empty board, X first. Each position is given an integer id in
+the range [0, N_STATES), in order of the number of marks on the board, so the
+empty board is always id 0.
+
+The positions are enumerated once when this module is first imported (it takes
+a few milliseconds), after which encoding and decoding between a board, its
+string form (as from Board.as_str()), its base-3 key (see src.games.statekey)
+and its id are all single lookups. Terminal
+positions are included, since they show up as the "new state" of the final
+transition of every episode.
+
+Anything keyed by state can then be stored in a plain list or array of length
+N_STATES instead of a dict of strings.
+"""
+
+from src.games import bitboard, statekey
+from src.games.tictactoe import Board
+
+
+def _enumerate() -> list[tuple[int, int]]:
+    """Walk the game tree breadth-first, returning the (x_bits, o_bits) of every
+    distinct position in the order in which they were first reached"""
+    positions = [(0, 0)]
+    seen = {0}
+    frontier = [(0, 0, bitboard.ALL_LINES)]
+    while frontier:
+        next_frontier = []
+        for x_bits, o_bits, open_lines in frontier:
+            x_to_move = x_bits.bit_count() == o_bits.bit_count()
+            for idx in range(9):
+                bit = 1 << idx
+                if (x_bits | o_bits) & bit:
+                    continue
+                new_x = x_bits | bit if x_to_move else x_bits
+                new_o = o_bits if x_to_move else o_bits | bit
+                complete, _, new_open = bitboard.evaluate(
+                    new_x, new_o, bitboard.LINES_THROUGH[idx], open_lines
+                )
+                key = new_x << 9 | new_o
+                if key in seen:
+                    continue
+                seen.add(key)
+                positions.append((new_x, new_o))
+                if not complete:
+                    next_frontier.append((new_x, new_o, new_open))
+        frontier = next_frontier
+    return positions
+
+
+_POSITIONS = _enumerate()
+
+N_STATES: int = len(_POSITIONS)
+
+# Decoding tables, indexed by state id:
+X_BITS: tuple[int, ...] = tuple(x for x, _ in _POSITIONS)
+O_BITS: tuple[int, ...] = tuple(o for _, o in _POSITIONS)
+STATES: tuple[str, ...] = tuple(bitboard.as_str(x, o) for x, o in _POSITIONS)
+KEYS: tuple[int, ...] = tuple(statekey.from_bits(x, o) for x, o in _POSITIONS)
+
+# Encoding tables:
+_ID_BY_BITS: dict[int, int] = {x << 9 | o: i for i, (x, o) in enumerate(_POSITIONS)}
+_ID_BY_STR: dict[str, int] = {state: i for i, state in enumerate(STATES)}
+_ID_BY_KEY: dict[int, int] = {key: i for i, key in enumerate(KEYS)}
+
+
+def state_id(state: str) -> int:
+    """Get the id of a state from its string representation, e.g. X-O---OOX.
+    Raise KeyError if the state can't be reached in a game."""
+    return _ID_BY_STR[state]
+
+
+def key_id(key: int) -> int:
+    """Get the id of a state from its base-3 key. Raise KeyError if the state
+    can't be reached in a game."""
+    return _ID_BY_KEY[key]
+
+
+def bits_id(x_bits: int, o_bits: int) -> int:
+    """Get the id of a state from its bitboards. Raise KeyError if the state
+    can't be reached in a game."""
+    return _ID_BY_BITS[x_bits << 9 | o_bits]
+
+
+def board_id(board: Board) -> int:
+    """Get the id of the state of a board. Raise KeyError if the state can't be
+    reached in a game."""
+    return _ID_BY_BITS[board.x_bits << 9 | board.o_bits]
+
+
+def state_str(idx: int) -> str:
+    """Get the string representation of a state from its id"""
+    return STATES[idx]
+
+
+def to_board(idx: int) -> Board:
+    """Create a new board set up in the state with the given id"""
+    board = Board()
+    for cell_idx, symbol in enumerate(STATES[idx]):
+        if symbol != "-":
+            board.cells[cell_idx].set(symbol)
+    return board
@@ -0,0 +1,79 @@
+"""
+Integer keys for tic-tac-toe states: the board read as a 9-digit number in base
+3, where cell ``3 * row + col`` is the digit with weight ``3 ** (3 * row + col)``,
+and each digit is 0 for an empty cell, 1 for X and 2 for O, e.g.
+    X|O|        = 1 * 3**0 + 2 * 3**1 + 1 * 3**4
+    -----       = 88
+     |X|
+    -----
+     | |
+
+Every board has a key in [0, 3**9), with the empty board at 0. Playing a move
+just adds the marker's digit times the cell's weight, so the game can keep the
+key up to date as it goes, and a key is as cheap to hash and compare as any
+other small int. Strings (as from Board.as_str()) are only needed to show a
+state to a person, or to read and write CSV files.
+
+Actions go with them as cell indexes, 3 * row + col (0-8).
+"""
+
+N_KEYS = 3**9
+
+# The weight of each cell index, and the digit of each marker:
+WEIGHTS: tuple[int, ...] = tuple(3**idx for idx in range(9))
+DIGITS: dict[None | str, int] = {None: 0, "X": 1, "O": 2}
+
+_SYMBOLS = "-XO"
+
+# Conversions done so far, both ways:
+_KEY_BY_STR: dict[str, int] = {}
+_STR_BY_KEY: dict[int, str] = {}
+_EMPTY_BY_KEY: dict[int, tuple[int, ...]] = {}
+
+
+def from_str(state: str) -> int:
+    """Get the key of a state from its string representation, e.g. X-O---OOX"""
+    key = _KEY_BY_STR.get(state)
+    if key is None:
+        if len(state) != 9 or any(symbol not in _SYMBOLS for symbol in state):
+            raise ValueError(f"Not a state: {state!r}")
+        key = _KEY_BY_STR[state] = sum(
+            _SYMBOLS.index(symbol) * weight for symbol, weight in zip(state, WEIGHTS)
+        )
+    return key
+
+
+def to_str(key: int) -> str:
+    """Get the string representation of a state from its key"""
+    state = _STR_BY_KEY.get(key)
+    if state is None:
+        if not 0 <= key < N_KEYS:
+            raise ValueError(f"Not a state key: {key}")
+        state = _STR_BY_KEY[key] = "".join(
+            _SYMBOLS[key // weight % 3] for weight in WEIGHTS
+        )
+    return state
+
+
+def from_bits(x_bits: int, o_bits: int) -> int:
+    """Get the key of a state from its bitboards (see src.games.bitboard)"""
+    key = 0
+    for idx, weight in enumerate(WEIGHTS):
+        bit = 1 << idx
+        if x_bits & bit:
+            key += weight
+        elif o_bits & bit:
+            key += 2 * weight
+    return key
+
+
+def empty_cells(key: int) -> tuple[int, ...]:
+    """Get the indexes (3 * row + col) of the empty cells of a state, in order"""
+    cells = _EMPTY_BY_KEY.get(key)
+    if cells is None:
+        if not 0 <= key < N_KEYS:
+            raise ValueError(f"Not a state key: {key}")
+        cells = _EMPTY_BY_KEY[key] = tuple(
+            idx for idx, weight in enumerate(WEIGHTS) if key // weight % 3 == 0
+        )
+    return cells
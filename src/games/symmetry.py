@@ -0,0 +1,78 @@
+"""
+The 8 symmetries of the tic-tac-toe board (the dihedral group D4: 4 rotations,
+each with and without a reflection). Positions that are rotations or reflections
+of each other are equivalent, so a Q-table only needs a row for one of them: the
+canonical form, which is the lexicographically smallest of its 8 variants.
+
+Each transform is a mapping of cell indexes (3 * row + col) to the cell index
+that the mark moves to. Actions are cell indexes too, so the same mapping moves
+an action along with the board, and INVERSE maps it back again.
+"""
+
+from src.games import stateindex
+
+
+def _cell_map(fn) -> tuple[int, ...]:
+    return tuple(3 * r + c for r, c in (fn(*divmod(idx, 3)) for idx in range(9)))
+
+
+CELL_MAPS: tuple[tuple[int, ...], ...] = (
+    _cell_map(lambda r, c: (r, c)),  # identity
+    _cell_map(lambda r, c: (c, 2 - r)),  # rotate 90 degrees clockwise
+    _cell_map(lambda r, c: (2 - r, 2 - c)),  # rotate 180 degrees
+    _cell_map(lambda r, c: (2 - c, r)),  # rotate 270 degrees clockwise
+    _cell_map(lambda r, c: (r, 2 - c)),  # reflect left-right
+    _cell_map(lambda r, c: (2 - r, c)),  # reflect top-bottom
+    _cell_map(lambda r, c: (c, r)),  # reflect on main diagonal
+    _cell_map(lambda r, c: (2 - c, 2 - r)),  # reflect on anti-diagonal
+)
+
+# The transform that undoes each transform:
+INVERSE: tuple[int, ...] = tuple(
+    next(
+        j
+        for j, other in enumerate(CELL_MAPS)
+        if all(other[fwd[idx]] == idx for idx in range(9))
+    )
+    for fwd in CELL_MAPS
+)
+
+
+def transform(state: str, t: int) -> str:
+    """Apply transform t to a state string, e.g. X-O---OOX"""
+    cell_map = CELL_MAPS[t]
+    symbols = [""] * 9
+    for idx, symbol in enumerate(state):
+        symbols[cell_map[idx]] = symbol
+    return "".join(symbols)
+
+
+def _canonicalize(state: str) -> tuple[str, int]:
+    variants = [transform(state, t) for t in range(len(CELL_MAPS))]
+    canonical = min(variants)
+    return canonical, variants.index(canonical)
+
+
+# Every reachable state is canonicalized once up front:
+_CANONICAL: dict[str, tuple[str, int]] = {
+    state: _canonicalize(state) for state in stateindex.STATES
+}
+
+# The same, by state id:
+CANONICAL_IDS: tuple[int, ...] = tuple(
+    stateindex.state_id(_CANONICAL[state][0]) for state in stateindex.STATES
+)
+TRANSFORMS: tuple[int, ...] = tuple(_CANONICAL[state][1] for state in stateindex.STATES)
+
+
+def canonicalize(state: str) -> tuple[str, int]:
+    """Get the canonical form of a state, and the transform that turns the
+    state into it. Actions in the state map to the canonical form with
+    CELL_MAPS[t], and back again with CELL_MAPS[INVERSE[t]]."""
+    result = _CANONICAL.get(state)
+    return _canonicalize(state) if result is None else result
+
+
+def is_canonical(state: str) -> bool:
+    """True if the state is its own canonical form"""
+    return canonicalize(state)[0] == state
@@ -0,0 +1,102 @@
+"""
+A game of tic-tac-toe driven by the transition table of src.games.transitions.
+The whole game is a single state id: playing a move looks up the next id, and
+whether the game is over and who won, so there are no Cell objects to update,
+no strings to build and no lines to check.
+
+TableTicTacToe plays by the same rules as TicTacToe, with the same methods that
+a training episode uses, except that the state is read with as_key() or as_str()
+rather than board.as_key() or board.as_str(). Players must take turns, X first.
+"""
+
+from functools import cache
+
+from src.exceptions import IllegalMoveError
+from src.games import bitboard, stateindex, transitions
+from src.games.vectortictactoe import EMPTY, O, X
+
+_WINNERS: dict[int, None | str] = {EMPTY: None, X: "X", O: "O"}
+
+# The (row, col) of the empty cells in each state, indexed by state id:
+_VALID_MOVES: tuple[tuple[tuple[int, int], ...], ...] = tuple(
+    bitboard.EMPTY_CELLS[x_bits | o_bits]
+    for x_bits, o_bits in zip(stateindex.X_BITS, stateindex.O_BITS)
+)
+
+
+@cache
+def _as_lists(
+    table: transitions.TransitionTable,
+) -> tuple[list[list[int]], list[list[bool]], list[list[int]]]:
+    """Convert a table to nested lists, once, since they index faster than NumPy
+    arrays one element at a time"""
+    return table.next_ids.tolist(), table.terminal.tolist(), table.winner.tolist()
+
+
+class TableTicTacToe:
+    def __init__(self, table: None | transitions.TransitionTable = None) -> None:
+        """
+        table (TransitionTable): The transitions to play by. Default is the table
+        cached at transitions.DEFAULT_CACHE.
+        """
+        table = transitions.load() if table is None else table
+        self._next_ids, self._terminal, self._winner = _as_lists(table)
+        self.state_id = 0
+        self.complete = False
+        self.winner: None | str = None
+        self._to_move = "X"
+
+    def reset(self) -> None:
+        """Start a new game"""
+        self.state_id = 0
+        self.complete = False
+        self.winner = None
+        self._to_move = "X"
+
+    def as_str(self) -> str:
+        """Represent the game board as a string, e.g. X-O---OOX"""
+        return stateindex.STATES[self.state_id]
+
+    def as_key(self) -> int:
+        """Represent the game board as a base-3 integer key (see
+        src.games.statekey)"""
+        return stateindex.KEYS[self.state_id]
+
+    def get_all_valid_moves(self) -> list[tuple[int, int]]:
+        """Return a list of all valid game moves in as a (row, col) tuple"""
+        if self.complete:
+            return []
+        return list(_VALID_MOVES[self.state_id])
+
+    def play_move(self, marker: str, row: int, col: int) -> None:
+        """
+        Place the marker ("X" or "O") in the coordinates denoted by the row and
+        column indexes. Top left is [0, 0].
+
+        Raise ValueError for unrecognised marker or invalid coordinates.
+
+        Raise IllegalMoveError if an illegal move is attempted, including a
+        marker played out of turn.
+        """
+        if self.complete:
+            raise IllegalMoveError("Game is over")
+        if marker not in ["X", "O"]:
+            raise ValueError(f"Unrecognised marker: {marker}")
+        if row < 0 or row > 2 or col < 0 or col > 2:
+            raise ValueError(f"Move coordinates out of bounds: ({row}, {col})")
+        if marker != self._to_move:
+            raise IllegalMoveError(f"It is {self._to_move}'s turn")
+        action = 3 * row + col
+        next_id = self._next_ids[self.state_id][action]
+        if next_id < 0:
+            raise IllegalMoveError(
+                "Attempted to place a marker in a cell that is not empty"
+            )
+        self.complete = self._terminal[self.state_id][action]
+        self.winner = _WINNERS[self._winner[self.state_id][action]]
+        self.state_id = next_id
+        self._to_move = "O" if marker == "X" else "X"
+
+    def is_over(self) -> bool:
+        """True if the game is over false if still in play"""
+        return self.complete
@@ -1,6 +1,15 @@
+from __future__ import annotations
+
 from dataclasses import dataclass, field
 
 from src.exceptions import IllegalMoveError
+from src.games import bitboard, statekey
+
+# Cache of string representations, keyed by (x_bits << 9 | o_bits):
+_STR_CACHE: dict[int, str] = {}
+
+# Every line index, for when the whole board needs to be checked:
+_ALL_LINE_IDXS = tuple(range(len(bitboard.WIN_MASKS)))
 
 
 @dataclass
@@ -13,6 +22,15 @@ class Cell:
     row: int
     col: int
     marker: None | str = None
+    board: None | Board = field(default=None, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+        # Keep the owning board's bitboards in step with the marker:
+        if name == "marker":
+            board = getattr(self, "board", None)
+            if board is not None:
+                board.sync_cell(self)
 
     def __repr__(self):
         return f"<Cell - row: {self.row}, col:{self.col}, marker: {self.marker}>"
@@ -39,6 +57,19 @@ class Board:
             Cell(row=row, col=col) for row in range(3) for col in range(3)
         ]
     )
+    # Bitboards of the cells occupied by each player (see src.games.bitboard):
+    x_bits: int = field(default=0, init=False)
+    o_bits: int = field(default=0, init=False)
+    # The base-3 key of the board (see src.games.statekey):
+    key: int = field(default=0, init=False)
+    # Incremented every time a marker changes, so that the game can tell if
+    # the board was edited behind its back:
+    version: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        for cell in self.cells:
+            cell.board = self
+            self.sync_cell(cell)
 
     def __str__(self):
         """Print the game board in human-readable way"""
@@ -52,8 +83,32 @@ class Board:
 
     def as_str(self):
         """Represent the game board as a string, e.g. X-O---OOX"""
-        symbols = ["-" if cell.marker is None else cell.marker for cell in self.cells]
-        return "".join(symbols)
+        key = self.x_bits << 9 | self.o_bits
+        result = _STR_CACHE.get(key)
+        if result is None:
+            result = _STR_CACHE[key] = bitboard.as_str(self.x_bits, self.o_bits)
+        return result
+
+    def as_key(self) -> int:
+        """Represent the game board as a base-3 integer key (see
+        src.games.statekey)"""
+        return self.key
+
+    def sync_cell(self, cell: Cell) -> None:
+        """Update the bitboards and key after a cell's marker has changed"""
+        idx = 3 * cell.row + cell.col
+        bit = 1 << idx
+        old_digit = 1 if self.x_bits & bit else 2 if self.o_bits & bit else 0
+        self.key += (
+            statekey.DIGITS.get(cell.marker, 0) - old_digit
+        ) * statekey.WEIGHTS[idx]
+        self.x_bits = (
+            (self.x_bits | bit) if cell.marker == "X" else (self.x_bits & ~bit)
+        )
+        self.o_bits = (
+            (self.o_bits | bit) if cell.marker == "O" else (self.o_bits & ~bit)
+        )
+        self.version += 1
 
     def get_cell(self, row: int, col: int) -> Cell:
         """Retrieve a specific cell by it's row and column index"""
@@ -68,13 +123,26 @@ class TicTacToe:
         self.board = Board()
         self.complete: bool = False
         self.winner: None | str = None
+        # Lines that could still be won by either player, and the board version
+        # that `complete`, `winner` and `_open_lines` were last checked against:
+        self._open_lines: int = bitboard.ALL_LINES
+        self._checked_version: int = self.board.version
+        # The moves played through play_move(), for undo_move(): the cell index
+        # of each move, and `_open_lines` from before it. Preallocated, so that
+        # playing and undoing moves doesn't allocate anything:
+        self._moves: list[int] = [0] * 9
+        self._open_before: list[int] = [0] * 9
+        self._n_moves: int = 0
+
+    @property
+    def n_moves(self) -> int:
+        """Number of moves that can be undone"""
+        self._check_history()
+        return self._n_moves
 
     def get_all_valid_moves(self):
         """Return a list of all valid game moves in as a (row, col) tuple"""
-        result = [
-            (cell.row, cell.col) for cell in self.board.cells if cell.marker is None
-        ]
-        return result
+        return list(bitboard.EMPTY_CELLS[self.board.x_bits | self.board.o_bits])
 
     def play_move(
         self,
@@ -102,46 +170,110 @@ class TicTacToe:
                 "Attempted to place a marker in a cell that is not empty"
             )
 
+        self._check_history()
+        idx = 3 * row + col
+        self._moves[self._n_moves] = idx
+        self._open_before[self._n_moves] = self._open_lines
+        self._n_moves += 1
+
         cell.set(marker)
 
+        # Only the lines through the new marker can have changed:
+        self.complete, self.winner, self._open_lines = bitboard.evaluate(
+            self.board.x_bits,
+            self.board.o_bits,
+            bitboard.LINES_THROUGH[idx],
+            self._open_lines,
+        )
+        self._checked_version = self.board.version
+
+    def undo_move(self) -> None:
+        """
+        Take back the last move played through play_move(), restoring the game
+        to how it was before it.
+
+        Raise IllegalMoveError if there is no move to undo.
+        """
+        self._check_history()
+        if self._n_moves == 0:
+            raise IllegalMoveError("No moves to undo")
+        self._n_moves -= 1
+        self.board.cells[self._moves[self._n_moves]].marker = None
+        # A move can only be played while the game is in play:
+        self.complete = False
+        self.winner = None
+        self._open_lines = self._open_before[self._n_moves]
+        self._checked_version = self.board.version
+
+    def reset(self) -> None:
+        """Clear the board, to start a new game"""
+        for cell in self.board.cells:
+            if cell.marker is not None:
+                cell.marker = None
+        self.complete = False
+        self.winner = None
+        self._open_lines = bitboard.ALL_LINES
+        self._checked_version = self.board.version
+        self._n_moves = 0
+
+    def copy(self) -> TicTacToe:
+        """Make an independent copy of the game, including the moves that can be
+        undone"""
+        game = TicTacToe()
+        for cell, source in zip(game.board.cells, self.board.cells):
+            if source.marker is not None:
+                cell.marker = source.marker
+        game.complete = self.complete
+        game.winner = self.winner
+        game._open_lines = self._open_lines
+        game._checked_version = (
+            game.board.version
+            if self._checked_version == self.board.version
+            else game.board.version - 1
+        )
+        game._moves[:] = self._moves
+        game._open_before[:] = self._open_before
+        game._n_moves = self._n_moves
+        return game
+
+    def _check_history(self) -> None:
+        """Forget the moves played so far if the board has been edited directly
+        since, as they can no longer be undone"""
+        if self.board.version != self._checked_version:
+            self._n_moves = 0
+
     def is_over(self) -> bool:
         """True if the game is over false if still in play"""
 
         if self.complete:
             return True
 
-        winning_combos = (
-            ((0, 0), (0, 1), (0, 2)),  # top row
-            ((1, 0), (1, 1), (1, 2)),  # middle row
-            ((2, 0), (2, 1), (2, 2)),  # bottom row
-            ((0, 0), (1, 0), (2, 0)),  # left column
-            ((0, 1), (1, 1), (2, 1)),  # middle column
-            ((0, 2), (1, 2), (2, 2)),  # right column
-            ((0, 0), (1, 1), (2, 2)),  # Diagonal #1
-            ((2, 0), (1, 1), (0, 2)),  # Diagonal #2
-        )
+        # Moves played through play_move() keep the result up to date. If the
+        # board was edited directly since, every line has to be checked again:
+        if self.board.version != self._checked_version:
+            self.complete, self.winner, self._open_lines = bitboard.evaluate(
+                self.board.x_bits,
+                self.board.o_bits,
+                _ALL_LINE_IDXS,
+                bitboard.ALL_LINES,
+            )
+            self._checked_version = self.board.version
+            # ...and the moves played before the edit can't be undone:
+            self._n_moves = 0
+
+        return self.complete
 
-        win_possible: bool = False
-        for combo in winning_combos:
-            cells = [self.board.get_cell(*c) for c in combo]
-            markers = [c.marker for c in cells]
-            # Check if either player has won using this combo:
-            for marker in ["X", "O"]:
-                if all(m == marker for m in markers):
-                    self.complete = True
-                    self.winner = marker
-                    return True
-            # Check if either player could still win using this combo:
-            if ("X" not in markers) or ("O" not in markers):
-                win_possible = True
-
-        # TODO: Optimise this. Run selected checks after marker is placed,
-        # depending on where. No point checking all rows/cols if placed marker
-        # cannot win on those.
-
-        if not win_possible:
-            self.complete = True
-            self.winner = None
-            return True
 
-        return False
+def count_positions(game: TicTacToe, marker: str = "X") -> int:
+    """Count the positions in the game tree below game, with marker to play,
+    playing and taking back each move in place"""
+    if game.is_over():
+        return 1
+    nodes = 1
+    other = "O" if marker == "X" else "X"
+    for idx, cell in enumerate(game.board.cells):
+        if cell.marker is None:
+            game.play_move(marker, *divmod(idx, 3))
+            nodes += count_positions(game, other)
+            game.undo_move()
+    return nodes
@@ -0,0 +1,103 @@
+"""
+A precomputed transition table for tic-tac-toe: for every state id (see
+src.games.stateindex) and action (3 * row + col), the id of the state the action
+leads to, whether that ends the game and who won. Playing a move is then three
+lookups, instead of updating Cell objects and checking lines.
+
+The table is built from src.games.stategraph the first time it is needed and
+cached to disk as a NumPy .npz file, so later runs just read it back. A cache
+that can't be read, or was built for a different set of states, is rebuilt.
+
+Winners are given by the integer codes of src.games.vectortictactoe (EMPTY, X
+and O).
+"""
+
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+
+import numpy as np
+
+from src.games import stategraph, stateindex
+from src.games.vectortictactoe import EMPTY
+
+DEFAULT_CACHE = Path(__file__).parents[2] / "saves" / "transitions.npz"
+
+# Bumped whenever the layout of the cached file changes:
+_VERSION = 1
+
+# What reading a missing, corrupt or outdated cache can raise:
+_UNREADABLE = (OSError, KeyError, ValueError)
+
+
+@dataclass(frozen=True, eq=False)
+class TransitionTable:
+    # (N_STATES, 9) arrays, indexed by [state_id, action]. next_ids is
+    # stategraph.NO_STATE for actions that can't be played:
+    next_ids: np.ndarray
+    terminal: np.ndarray
+    winner: np.ndarray
+
+
+def build() -> TransitionTable:
+    """Build the transition table from the state graph"""
+    graph = stategraph.build()
+    # Invalid actions are looked up at state 0 (in play, no winner) and then
+    # cleared:
+    after = np.where(graph.legal, graph.next_ids, 0)
+    return TransitionTable(
+        next_ids=graph.next_ids.copy(),
+        terminal=graph.terminal[after] & graph.legal,
+        winner=np.where(graph.legal, graph.winner[after], EMPTY).astype(np.int8),
+    )
+
+
+@cache
+def load(fp: Path = DEFAULT_CACHE) -> TransitionTable:
+    """Read the transition table cached at fp, building and caching it first if
+    need be. Read once per file, on the first call."""
+    fp = Path(fp)
+    try:
+        with np.load(fp) as cached:
+            if (
+                int(cached["version"]) == _VERSION
+                and cached["next_ids"].shape == (stateindex.N_STATES, 9)
+                and np.array_equal(cached["states"], _state_keys())
+            ):
+                return TransitionTable(
+                    cached["next_ids"], cached["terminal"], cached["winner"]
+                )
+    except _UNREADABLE:
+        pass
+    table = build()
+    try:
+        save(table, fp)
+    except OSError:
+        # The cache only saves time, so carry on without it:
+        pass
+    return table
+
+
+def save(table: TransitionTable, fp: Path) -> None:
+    """Write the table to fp, replacing it in one go so that a reader never sees
+    half a file"""
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    tmp = fp.with_name(fp.name + ".tmp")
+    with tmp.open("wb") as f:
+        np.savez(
+            f,
+            version=_VERSION,
+            states=_state_keys(),
+            next_ids=table.next_ids,
+            terminal=table.terminal,
+            winner=table.winner,
+        )
+    tmp.replace(fp)
+
+
+def _state_keys() -> np.ndarray:
+    """The (x_bits << 9 | o_bits) of every state, in id order, to check that a
+    cached table was built for the same state ids"""
+    return np.array(stateindex.X_BITS, dtype=np.int32) << 9 | np.array(
+        stateindex.O_BITS, dtype=np.int32
+    )
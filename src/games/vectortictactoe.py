@@ -0,0 +1,97 @@
+"""
+Many games of tic-tac-toe played in lockstep. Every board is a pair of
+bitboards (see src.games.bitboard) held in NumPy arrays, so each step plays one
+move on every board at once, and finished boards are set up for a new game
+straight away.
+
+Players are represented by integer codes rather than "X" and "O" strings:
+    EMPTY (0): no player / no winner
+    X (1)
+    O (2)
+"""
+
+import numpy as np
+
+from src.exceptions import IllegalMoveError
+from src.games import bitboard, stateindex
+
+EMPTY, X, O = 0, 1, 2
+
+_WIN_MASKS = np.array(bitboard.WIN_MASKS, dtype=np.uint16)
+_CELL_BITS = (1 << np.arange(9)).astype(np.uint16)
+
+# The dense state id of every (x_bits << 9 | o_bits) pair, or -1 if the state
+# can't be reached in a game:
+_ID_BY_BITS = np.full(1 << 18, -1, dtype=np.int32)
+_ID_BY_BITS[
+    np.array(stateindex.X_BITS, dtype=np.int32) << 9
+    | np.array(stateindex.O_BITS, dtype=np.int32)
+] = np.arange(stateindex.N_STATES, dtype=np.int32)
+
+
+class VectorTicTacToe:
+    def __init__(self, n_boards: int) -> None:
+        """
+        n_boards (int): Number of games to play at once
+        """
+        self.n_boards = n_boards
+        self.x_bits = np.zeros(n_boards, dtype=np.uint16)
+        self.o_bits = np.zeros(n_boards, dtype=np.uint16)
+        # The player whose turn it is on each board (X or O):
+        self.to_move = np.full(n_boards, X, dtype=np.int8)
+        # The dense state id (see src.games.stateindex) of each board:
+        self.state_ids = np.zeros(n_boards, dtype=np.int32)
+
+    def reset(self) -> np.ndarray:
+        """Start a new game on every board. Return the state ids."""
+        self.x_bits.fill(0)
+        self.o_bits.fill(0)
+        self.to_move.fill(X)
+        self.state_ids.fill(0)
+        return self.state_ids
+
+    def valid_mask(self) -> np.ndarray:
+        """Get an (n_boards, 9) array that is True for every empty cell"""
+        return ((self.x_bits | self.o_bits)[:, None] & _CELL_BITS) == 0
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Play one move on every board, for whichever player's turn it is. Boards
+        where the game is over are reset, ready for the next step.
+
+        Arguments:
+        actions (np.ndarray): Cell index (3 * row + col) to play on each board
+
+        Returns:
+        A (state_ids, dones, winners) tuple of arrays. state_ids are the states
+        after the moves were played (before any boards were reset), dones are
+        True for boards where the game is over, and winners are X, O or EMPTY
+        (for games that are still in play or were drawn).
+
+        Raise IllegalMoveError if any of the cells is not empty.
+        """
+        bits = _CELL_BITS[actions]
+        if ((self.x_bits | self.o_bits) & bits).any():
+            raise IllegalMoveError(
+                "Attempted to place a marker in a cell that is not empty"
+            )
+        x_moved = self.to_move == X
+        x_bits = np.where(x_moved, self.x_bits | bits, self.x_bits)
+        o_bits = np.where(x_moved, self.o_bits, self.o_bits | bits)
+
+        x_lines = x_bits[:, None] & _WIN_MASKS
+        o_lines = o_bits[:, None] & _WIN_MASKS
+        x_won = (x_lines == _WIN_MASKS).any(axis=1)
+        o_won = (o_lines == _WIN_MASKS).any(axis=1)
+        # Nobody can win if every line holds both an X and an O:
+        blocked = ((x_lines != 0) & (o_lines != 0)).all(axis=1)
+
+        winners = np.where(x_won, X, np.where(o_won, O, EMPTY)).astype(np.int8)
+        dones = x_won | o_won | blocked
+        state_ids = _ID_BY_BITS[x_bits.astype(np.int32) << 9 | o_bits]
+
+        self.x_bits = np.where(dones, 0, x_bits).astype(np.uint16)
+        self.o_bits = np.where(dones, 0, o_bits).astype(np.uint16)
+        self.to_move = np.where(dones, X, X + O - self.to_move).astype(np.int8)
+        self.state_ids = np.where(dones, 0, state_ids).astype(np.int32)
+        return state_ids, dones, winners
@@ -1,2 +1,5 @@
+from src.persistence.arrayqtable import ArrayQTable as ArrayQTable
 from src.persistence.interface import Persistence as Persistence
 from src.persistence.qtable import QTable as QTable
+from src.persistence.sharedqtable import SharedQTable as SharedQTable
+from src.persistence.symmetric import SymmetricQTable as SymmetricQTable
@@ -0,0 +1,135 @@
+"""
+A Q Table backed by a single NumPy array. There is one row for every reachable
+game state (see src.games.stateindex) and one column for every action, in the
+same order as the columns of the CSV file:
+    "00", "01", "02", "10", "11", "12", "20", "21", "22"
+
+The whole table is allocated up front, so its memory footprint is fixed
+(N_STATES x 9 float64s, about 390 kB) and looking up the values of a state is
+just an index into the array. States that have been updated are flagged, so
+that saving produces the same CSV file as QTable.
+
+Tables are saved in the binary format of src.persistence.binaryformat with a
+row for each visited state only, as QTable saves them, and loading one copies
+those rows into place without parsing anything. A file that holds a row for
+every state, in order, is just mapped into memory, copy-on-write: nothing is
+copied until a value is updated.
+"""
+
+import csv
+from pathlib import Path
+
+import numpy as np
+
+from src.games import stateindex
+from src.persistence import binaryformat
+from src.persistence.interface import (
+    ACTION_IDXS,
+    ACTIONS,
+    Action,
+    Persistence,
+    State,
+    to_action,
+    to_state_id,
+)
+
+
+class ArrayQTable(Persistence):
+    def __init__(self) -> None:
+        self.values = np.zeros((stateindex.N_STATES, len(ACTIONS)), dtype=np.float64)
+        self.visited = np.zeros(stateindex.N_STATES, dtype=np.bool_)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory taken up by the table"""
+        return self.values.nbytes + self.visited.nbytes
+
+    def row(self, state: State) -> np.ndarray:
+        """Get the values of all actions in a state, as a view into the table"""
+        return self.values[to_state_id(state)]
+
+    def n_states(self) -> int:
+        """Get the number of states that have been updated"""
+        return int(self.visited.sum())
+
+    def update(self, state: State, action: Action, value: float) -> None:
+        """Update the value of an action for a given state"""
+        idx = to_state_id(state)
+        self.values[idx, to_action(action)] = value
+        self.visited[idx] = True
+
+    def get_values(
+        self, state: State, action: None | Action = None
+    ) -> dict[str, float]:
+        """Get the value of a particular action in a particular state. If no
+        action is provided, return the values of all actions."""
+        row = self.values[to_state_id(state)]
+        if action is None:
+            return dict(zip(ACTIONS, row.tolist()))
+        idx = to_action(action)
+        return {ACTIONS[idx]: float(row[idx])}
+
+    def get_value(self, state: State, action: Action) -> float:
+        """Get the value of a particular action in a particular state"""
+        return self.values[to_state_id(state), to_action(action)]
+
+    def action_values(self, state: State) -> list[float]:
+        """Get the values of all actions in a particular state, indexed by
+        action"""
+        return self.values[to_state_id(state)].tolist()
+
+    def max_value(self, state: State) -> float:
+        """Get the highest value of any action in a particular state"""
+        return self.values[to_state_id(state)].max()
+
+    def get_rows(self, state_ids: np.ndarray) -> np.ndarray:
+        """Get the values of all actions for a batch of states, given by their
+        dense ids"""
+        return self.values[state_ids]
+
+    def update_many(
+        self, state_ids: np.ndarray, actions: np.ndarray, values: np.ndarray
+    ) -> None:
+        """Set the values of a batch of (state, action) pairs"""
+        self.values[state_ids, actions] = values
+        self.visited[state_ids] = True
+
+    def save(self, fp: Path) -> None:
+        """Save Q-Table to file for later use, in the same format as QTable"""
+        if binaryformat.is_binary(fp):
+            state_ids = np.flatnonzero(self.visited)
+            state_rows = np.full(stateindex.N_STATES, -1, dtype=np.int32)
+            state_rows[state_ids] = np.arange(len(state_ids))
+            binaryformat.write(fp, state_rows, self.values[state_ids])
+            return
+        with Path(fp).open("w") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(["state", *ACTIONS])
+            for idx in np.flatnonzero(self.visited).tolist():
+                writer.writerow([stateindex.STATES[idx], *self.values[idx].tolist()])
+
+    def load(self, fp: Path) -> None:
+        """Load a Q-Table from a file saved by QTable or ArrayQTable"""
+        if binaryformat.is_binary(fp):
+            qfile = binaryformat.read(fp, mode="c")
+            state_ids = np.flatnonzero(qfile.state_rows >= 0)
+            rows = qfile.state_rows[state_ids]
+            if qfile.values.shape == self.values.shape and (rows == state_ids).all():
+                self.values = qfile.values.astype(np.float64, copy=False)
+                self.visited = qfile.state_rows >= 0
+            else:
+                self.values = np.zeros_like(self.values)
+                self.values[state_ids] = qfile.values[rows]
+                self.visited = np.zeros_like(self.visited)
+                self.visited[state_ids] = True
+            return
+        self.values.fill(0.0)
+        self.visited.fill(False)
+        with Path(fp).open(newline="") as csvfile:
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                idx = stateindex.state_id(row.pop("state"))
+                for action, value in row.items():
+                    if value:
+                        self.values[idx, ACTION_IDXS[action]] = float(value)
+                self.visited[idx] = True
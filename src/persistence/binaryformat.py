@@ -0,0 +1,122 @@
+"""
+A binary file format for Q-tables, which can be memory-mapped instead of parsed.
+Files with the SUFFIX extension are saved in this format, and anything else is
+saved as CSV.
+
+A file is laid out as:
+    header (32 bytes, little-endian):
+        magic       4s   b"QTAB"
+        version     u16  VERSION
+        flags       u16  SYMMETRIC if the states are canonical (see
+                         src.games.symmetry)
+        n_states    u32  stateindex.N_STATES when the file was written
+        n_rows      u32  number of rows in the value matrix
+        dtype       8s   NumPy dtype of the values, e.g. b"<f8"
+        (zero padding)
+    state rows (n_states x int32):
+        the row of the value matrix holding each dense state id (see
+        src.games.stateindex), or -1 for states that aren't in the table
+    value matrix (n_rows x 9 x dtype):
+        one row per state, with columns in the order of ACTIONS
+
+Both sections start on an 8-byte boundary, so they can be mapped straight into
+NumPy arrays.
+"""
+
+import struct
+from pathlib import Path
+from typing import Literal, NamedTuple
+
+import numpy as np
+
+from src.games import stateindex
+from src.persistence.interface import ACTIONS
+
+SUFFIX = ".qtab"
+MAGIC = b"QTAB"
+VERSION = 1
+SYMMETRIC = 0x1
+
+_HEADER = struct.Struct("<4sHHII8s")
+HEADER_SIZE = 32
+
+
+class QTableFile(NamedTuple):
+    symmetric: bool
+    state_rows: np.ndarray
+    values: np.ndarray
+
+
+def is_binary(fp: Path) -> bool:
+    """Whether a Q-table should be saved to / loaded from fp in this format"""
+    return Path(fp).suffix == SUFFIX
+
+
+def write(
+    fp: Path, state_rows: np.ndarray, values: np.ndarray, symmetric: bool = False
+) -> None:
+    """
+    Write a Q-table to file.
+
+    Arguments:
+    fp (Path): File to write
+    state_rows (np.ndarray): Row of values for each dense state id, or -1
+    values (np.ndarray): (n_rows, 9) array of Q-values
+    symmetric (bool): Whether the states are canonical
+    """
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        SYMMETRIC if symmetric else 0,
+        stateindex.N_STATES,
+        len(values),
+        values.dtype.newbyteorder("<").str.encode(),
+    )
+    with Path(fp).open("wb") as f:
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(np.asarray(state_rows, dtype="<i4").tobytes())
+        f.write(np.asarray(values, dtype=values.dtype.newbyteorder("<")).tobytes())
+
+
+def read(fp: Path, mode: Literal["r", "c"] = "r") -> QTableFile:
+    """
+    Map a Q-table file into memory, without reading it.
+
+    Arguments:
+    fp (Path): File to read
+    mode (str): np.memmap mode. "r" for read-only arrays, or "c" for arrays
+    that can be written to without changing the file.
+
+    Raise ValueError if the file is not a Q-table, or was written for a
+    different set of states.
+    """
+    with Path(fp).open("rb") as f:
+        magic, version, flags, n_states, n_rows, dtype = _HEADER.unpack(
+            f.read(_HEADER.size)
+        )
+    if magic != MAGIC:
+        raise ValueError(f"{fp} is not a Q-table file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported Q-table file version: {version}")
+    if n_states != stateindex.N_STATES:
+        raise ValueError(f"{fp} has {n_states} states, expected {stateindex.N_STATES}")
+
+    state_rows = np.memmap(
+        fp, dtype="<i4", mode=mode, offset=HEADER_SIZE, shape=n_states
+    )
+    values = np.memmap(
+        fp,
+        dtype=np.dtype(dtype.rstrip(b"\0").decode()),
+        mode=mode,
+        offset=HEADER_SIZE + state_rows.nbytes,
+        shape=(n_rows, len(ACTIONS)),
+    )
+    return QTableFile(bool(flags & SYMMETRIC), state_rows, values)
+
+
+def mark_symmetric(fp: Path) -> None:
+    """Flag the states in an existing file as canonical"""
+    with Path(fp).open("r+b") as f:
+        magic, version, flags, *rest = _HEADER.unpack(f.read(_HEADER.size))
+        f.seek(0)
+        f.write(_HEADER.pack(magic, version, flags | SYMMETRIC, *rest))
@@ -1,22 +1,100 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
 
+import numpy as np
+
+from src.games import stateindex, statekey
+
+# Every action, in the order of the columns of a Q-table:
+ACTIONS: tuple[str, ...] = ("00", "01", "02", "10", "11", "12", "20", "21", "22")
+ACTION_IDXS: dict[str, int] = {action: i for i, action in enumerate(ACTIONS)}
+
+# States are given by their base-3 keys (see src.games.statekey), and actions by
+# their cell indexes (3 * row + col), as Python or NumPy integers. Their string
+# forms, e.g. "X-O---OOX" and "12", are accepted too, for callers at the edges
+# that already have strings:
+State = int | np.integer | str
+Action = int | np.integer | str
+
+
+def to_key(state: State) -> int:
+    """Get the key of a state given by its key or string form"""
+    return statekey.from_str(state) if isinstance(state, str) else int(state)
+
+
+def to_state_id(state: State) -> int:
+    """Get the dense id (see src.games.stateindex) of a state given by its key or
+    string form. Raise KeyError if the state can't be reached in a game."""
+    if isinstance(state, str):
+        return stateindex.state_id(state)
+    return stateindex.key_id(int(state))
+
+
+def to_action(action: Action) -> int:
+    """Get the index of an action given by its index or string form"""
+    return ACTION_IDXS[action] if isinstance(action, str) else int(action)
+
 
 class Persistence(ABC):  # pragma: no cover
     """Defines the interface for any persistence class"""
 
     @abstractmethod
-    def get_values(self, state: str, action: None | str = None) -> dict[str, float]:
-        """Get the values of actions associated with a given state. If a specific action
-        is provided, return that specific action in the value, otherwise return the
-        value of all actions"""
+    def get_values(
+        self, state: State, action: None | Action = None
+    ) -> dict[str, float]:
+        """Get the values of actions associated with a given state, keyed by the
+        string form of the action. If a specific action is provided, return that
+        specific action in the value, otherwise return the value of all actions"""
         pass
 
+    def get_value(self, state: State, action: Action) -> float:
+        """Get the value of a single action in a given state"""
+        return self.action_values(state)[to_action(action)]
+
+    def action_values(self, state: State) -> list[float]:
+        """Get the values of all actions in a given state, indexed by action"""
+        values = self.get_values(state)
+        return [values[action] for action in ACTIONS]
+
+    def max_value(self, state: State) -> float:
+        """Get the highest value of any action in a given state"""
+        return max(self.action_values(state))
+
+    def get_rows(self, state_ids: np.ndarray) -> np.ndarray:
+        """Get the values of all actions for a batch of states, given by their
+        dense ids (see src.games.stateindex), as an (n_states, 9) array with
+        columns in the order of ACTIONS"""
+        return np.array(
+            [self.action_values(stateindex.KEYS[idx]) for idx in state_ids.tolist()],
+            dtype=np.float64,
+        ).reshape(-1, len(ACTIONS))
+
     @abstractmethod
-    def update(self, state: str, action: str, value: float) -> None:
+    def n_states(self) -> int:
+        """Get the number of states that have been stored in the table"""
+
+    @abstractmethod
+    def update(self, state: State, action: Action, value: float) -> None:
         """Add a state, action and value to the agnet's persistent memory"""
         pass
 
+    def update_many(
+        self, state_ids: np.ndarray, actions: np.ndarray, values: np.ndarray
+    ) -> None:
+        """Set the values of a batch of (state, action) pairs, given by dense
+        state ids and action indexes. Each pair must appear only once."""
+        for idx, action, value in zip(
+            state_ids.tolist(), actions.tolist(), values.tolist()
+        ):
+            self.update(stateindex.KEYS[idx], action, value)
+
+    def locate(
+        self, state_ids: np.ndarray, actions: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Get the row and column where each (state, action) pair is stored. Two
+        pairs share a value if, and only if, they are stored in the same place."""
+        return state_ids, actions
+
     @abstractmethod
     def save(self, fp: Path):
         """The path to which to save the agent for later loading"""
@@ -1,5 +1,9 @@
 """
-A class to manage a Q Table. States are represented by the string of the flattened
+A class to manage a Q Table. States are keyed by their base-3 integer keys (see
+src.games.statekey), and each state has a row of 9 action values, indexed by
+the action's cell index (3 * row + col).
+
+In files, and to people, states are represented by the string of the flattened
 matrix for the tic-tac-toe table, with pieces represented by "X", "O" or "-", e.g.
 one hame state might be "X-X-O-O--", and the corresponding board would look like
 this:
@@ -10,66 +14,106 @@ this:
     O| |
 Similarly, the available actions are represented by the string with numerical
 indices of the column and row. E.g. "11" is the centre of the board, "10" is the
-middle of the top row, etc.
+middle of the top row, etc. Either form can be passed to the table's methods.
 
 Actions are float values.
+
+Tables are saved as CSV files, or in the binary format of
+src.persistence.binaryformat if the file name ends in binaryformat.SUFFIX.
 """
 
 import csv
-from collections import OrderedDict
-from copy import deepcopy
 from pathlib import Path
 
-from src.persistence import Persistence
+import numpy as np
 
-default = {
-    "00": 0.0,
-    "01": 0.0,
-    "02": 0.0,
-    "10": 0.0,
-    "11": 0.0,
-    "12": 0.0,
-    "20": 0.0,
-    "21": 0.0,
-    "22": 0.0,
-}
+from src.games import stateindex, statekey
+from src.persistence import Persistence, binaryformat
+from src.persistence.interface import ACTIONS, Action, State, to_action, to_key
+
+# The values of a state that hasn't been updated:
+_DEFAULT_ROW: tuple[float, ...] = (0.0,) * len(ACTIONS)
 
 
 class QTable(Persistence):
     def __init__(self) -> None:
-        self.table: dict[str, dict[str, float]] = OrderedDict()
+        self.table: dict[int, list[float]] = {}
+
+    def n_states(self) -> int:
+        """Get the number of states that have been stored in the table"""
+        return len(self.table)
 
-    def update(self, state: str, action: str, value: float) -> None:
+    def update(self, state: State, action: Action, value: float) -> None:
         """Update the value of an action for a given state"""
-        row = self.table.get(state, deepcopy(default))
-        row[action] = value
-        self.table[state] = row
+        key = to_key(state)
+        row = self.table.get(key)
+        if row is None:
+            row = self.table[key] = list(_DEFAULT_ROW)
+        row[to_action(action)] = value
 
-    def get_values(self, state: str, action: None | str = None) -> dict[str, float]:
+    def get_values(
+        self, state: State, action: None | Action = None
+    ) -> dict[str, float]:
         """Get the value of a particular action in a particular state. If no
         action is provided, return the values of all actions."""
-        all_state_values = self.table.get(state, deepcopy(default))
+        row = self.table.get(to_key(state), _DEFAULT_ROW)
         if action is None:
-            return default | all_state_values
-        else:
-            val = all_state_values.get(action, 0.0)
-            return {action: val}
+            return dict(zip(ACTIONS, row))
+        idx = to_action(action)
+        return {ACTIONS[idx]: row[idx]}
+
+    def get_value(self, state: State, action: Action) -> float:
+        """Get the value of a particular action in a particular state"""
+        return self.table.get(to_key(state), _DEFAULT_ROW)[to_action(action)]
+
+    def action_values(self, state: State) -> list[float]:
+        """Get the values of all actions in a particular state, indexed by
+        action"""
+        return list(self.table.get(to_key(state), _DEFAULT_ROW))
+
+    def max_value(self, state: State) -> float:
+        """Get the highest value of any action in a particular state"""
+        row = self.table.get(to_key(state))
+        return 0.0 if row is None else max(row)
 
     def save(self, fp: Path) -> None:
         """Save Q-Table to file for later use"""
+        if binaryformat.is_binary(fp):
+            state_rows = np.full(stateindex.N_STATES, -1, dtype=np.int32)
+            state_rows[[stateindex.key_id(key) for key in self.table]] = np.arange(
+                len(self.table)
+            )
+            values = np.array(list(self.table.values()), dtype=np.float64).reshape(
+                -1, len(ACTIONS)
+            )
+            binaryformat.write(fp, state_rows, values)
+            return
         with Path(fp).open("w") as csvfile:
-            fieldnames = ["state", "00", "01", "02", "10", "11", "12", "20", "21", "22"]
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for state, actions in self.table.items():
-                row = {"state": state} | actions
-                writer.writerow(row)
+            writer = csv.writer(csvfile)
+            writer.writerow(["state", *ACTIONS])
+            for key, row in self.table.items():
+                writer.writerow([statekey.to_str(key), *row])
 
     def load(self, fp: Path) -> None:
         """Load a Q-Table from a file"""
+        if binaryformat.is_binary(fp):
+            qfile = binaryformat.read(fp)
+            state_ids = np.flatnonzero(qfile.state_rows >= 0)
+            rows = qfile.state_rows[state_ids]
+            order = np.argsort(rows)
+            self.table = {
+                stateindex.KEYS[idx]: values
+                for idx, values in zip(
+                    state_ids[order].tolist(), qfile.values[rows[order]].tolist()
+                )
+            }
+            return
         with Path(fp).open(newline="") as csvfile:
             reader = csv.DictReader(csvfile)
-            self.table = OrderedDict()
+            self.table = {}
             for row in reader:
-                state = row.pop("state")
-                self.table[state] = {k: float(v) if v else 0.0 for k, v in row.items()}
+                key = statekey.from_str(row.pop("state"))
+                self.table[key] = [
+                    float(value) if (value := row.get(action)) else 0.0
+                    for action in ACTIONS
+                ]
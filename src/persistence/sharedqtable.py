@@ -0,0 +1,97 @@
+"""
+An ArrayQTable whose values live in a block of shared memory, so that several
+processes can train one table at once. Every process reads and writes the same
+array in place, without locks ("Hogwild" training): updates from different
+processes may occasionally overwrite each other, but Q-learning is robust to
+that, and nothing has to be copied or merged between processes.
+
+The process that creates the table owns the block. Other processes attach to it
+by name, and a SharedQTable that is pickled (e.g. to be sent to a worker in a
+ProcessPoolExecutor) is attached again when it is unpickled. Every process must
+close() the table when it is done with it, and the owner must also unlink() it
+to free the memory.
+
+    with SharedQTable() as qtable:            # in the parent
+        ...
+    with SharedQTable.attach(name) as qtable:   # in a worker
+        ...
+"""
+
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+
+from src.games import stateindex
+from src.persistence.arrayqtable import ArrayQTable
+from src.persistence.interface import ACTIONS
+
+_VALUES_SHAPE = (stateindex.N_STATES, len(ACTIONS))
+_VALUES_NBYTES = stateindex.N_STATES * len(ACTIONS) * np.dtype(np.float64).itemsize
+
+
+class SharedQTable(ArrayQTable):
+    def __init__(self, name: None | str = None) -> None:
+        """
+        name (str): Name of an existing table to attach to. Default is to create
+        a new, empty table, owned by this process.
+        """
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(
+                create=True, size=_VALUES_NBYTES + stateindex.N_STATES
+            )
+        else:
+            # Only the owner should unlink the block, so don't let the resource
+            # tracker clean it up when this process exits:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        self.values = np.ndarray(_VALUES_SHAPE, dtype=np.float64, buffer=self.shm.buf)
+        self.visited = np.ndarray(
+            stateindex.N_STATES,
+            dtype=np.bool_,
+            buffer=self.shm.buf,
+            offset=_VALUES_NBYTES,
+        )
+        if self.owner:
+            self.values.fill(0.0)
+            self.visited.fill(False)
+
+    def load(self, fp: Path) -> None:
+        """Load a Q-Table from a file, into the shared memory"""
+        loaded = ArrayQTable()
+        loaded.load(fp)
+        self.values[:] = loaded.values
+        self.visited[:] = loaded.visited
+
+    @classmethod
+    def attach(cls, name: str) -> Self:
+        """Attach to a table created by another process"""
+        return cls(name)
+
+    @property
+    def name(self) -> str:
+        """Name that other processes can attach to the table by"""
+        return self.shm.name
+
+    def close(self) -> None:
+        """Detach this process from the table. The table can't be used after
+        this."""
+        # The arrays must be released before the block can be closed:
+        del self.values, self.visited
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory, once every process has closed the table"""
+        self.shm.unlink()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+        if self.owner:
+            self.unlink()
+
+    def __reduce__(self):
+        return (self.attach, (self.name,))
@@ -0,0 +1,129 @@
+"""
+A wrapper around any other Q-table that stores every state in its canonical
+form (see src.games.symmetry). The 8 rotations and reflections of a position
+share one row, so the table is up to 8 times smaller, and whatever is learned
+in one orientation is immediately known in all of them.
+
+Actions are mapped onto the canonical board before every read and write, so
+callers never see the canonical form.
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from src.games import stateindex, statekey
+from src.games.symmetry import CANONICAL_IDS, CELL_MAPS, TRANSFORMS, canonicalize
+from src.persistence import binaryformat
+from src.persistence.interface import (
+    ACTIONS,
+    Action,
+    Persistence,
+    State,
+    to_action,
+    to_key,
+)
+
+# The key of the canonical form of every state, and the transform that turns the
+# state into it, keyed by the state's key:
+_CANONICAL: dict[int, tuple[int, int]] = {
+    key: (stateindex.KEYS[CANONICAL_IDS[idx]], TRANSFORMS[idx])
+    for idx, key in enumerate(stateindex.KEYS)
+}
+
+# The same, as arrays for batches of states given by their dense ids:
+_CANONICAL_IDS = np.array(CANONICAL_IDS, dtype=np.intp)
+_TRANSFORMS = np.array(TRANSFORMS, dtype=np.intp)
+_CELL_MAPS = np.array(CELL_MAPS, dtype=np.intp)
+
+
+class SymmetricQTable(Persistence):
+    def __init__(self, inner: Persistence) -> None:
+        """
+        inner (Persistence): The table holding the canonical states
+        """
+        self.inner = inner
+
+    def n_states(self) -> int:
+        """Get the number of canonical states that have been stored"""
+        return self.inner.n_states()
+
+    def update(self, state: State, action: Action, value: float) -> None:
+        """Update the value of an action for a given state"""
+        canonical, t = _canonicalize(state)
+        self.inner.update(canonical, CELL_MAPS[t][to_action(action)], value)
+
+    def get_values(
+        self, state: State, action: None | Action = None
+    ) -> dict[str, float]:
+        """Get the value of a particular action in a particular state. If no
+        action is provided, return the values of all actions."""
+        if action is not None:
+            idx = to_action(action)
+            return {ACTIONS[idx]: self.get_value(state, idx)}
+        return dict(zip(ACTIONS, self.action_values(state)))
+
+    def get_value(self, state: State, action: Action) -> float:
+        """Get the value of a particular action in a particular state"""
+        canonical, t = _canonicalize(state)
+        return self.inner.get_value(canonical, CELL_MAPS[t][to_action(action)])
+
+    def action_values(self, state: State) -> list[float]:
+        """Get the values of all actions in a particular state, indexed by
+        action"""
+        canonical, t = _canonicalize(state)
+        canonical_values = self.inner.action_values(canonical)
+        return [canonical_values[idx] for idx in CELL_MAPS[t]]
+
+    def max_value(self, state: State) -> float:
+        """Get the highest value of any action in a particular state"""
+        return self.inner.max_value(_canonicalize(state)[0])
+
+    def get_rows(self, state_ids: np.ndarray) -> np.ndarray:
+        """Get the values of all actions for a batch of states, given by their
+        dense ids"""
+        rows = self.inner.get_rows(_CANONICAL_IDS[state_ids])
+        return np.take_along_axis(rows, _CELL_MAPS[_TRANSFORMS[state_ids]], axis=1)
+
+    def update_many(
+        self, state_ids: np.ndarray, actions: np.ndarray, values: np.ndarray
+    ) -> None:
+        """Set the values of a batch of (state, action) pairs"""
+        self.inner.update_many(*self._to_canonical(state_ids, actions), values)
+
+    def locate(
+        self, state_ids: np.ndarray, actions: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Get the row and column where each (state, action) pair is stored"""
+        return self.inner.locate(*self._to_canonical(state_ids, actions))
+
+    def _to_canonical(
+        self, state_ids: np.ndarray, actions: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Map states and actions onto the canonical board"""
+        return (
+            _CANONICAL_IDS[state_ids],
+            _CELL_MAPS[_TRANSFORMS[state_ids], actions],
+        )
+
+    def save(self, fp: Path) -> None:
+        """Save the canonical Q-Table to file for later use"""
+        self.inner.save(fp)
+        if binaryformat.is_binary(fp):
+            binaryformat.mark_symmetric(fp)
+
+    def load(self, fp: Path) -> None:
+        """Load a canonical Q-Table from a file"""
+        self.inner.load(fp)
+
+
+def _canonicalize(state: State) -> tuple[int, int]:
+    """Get the key of the canonical form of a state given by its key or string
+    form, and the transform that turns the state into it"""
+    key = to_key(state)
+    result = _CANONICAL.get(key)
+    if result is None:
+        # A state that can't be reached in a game:
+        canonical, t = canonicalize(statekey.to_str(key))
+        result = statekey.from_str(canonical), t
+    return result
@@ -0,0 +1,3 @@
+from src.training.episode import play_episode as play_episode
+from src.training.parallel import train_parallel as train_parallel
+from src.training.stats import TrainingStats as TrainingStats
@@ -0,0 +1,165 @@
+"""
+Consumers of the transition stream of play_episode (see src.training.episode),
+to combine with, or use instead of, the Learner that trains the players as
+transitions arrive:
+
+    BatchedLearner      trains the players on their transitions every few
+                        episodes, in one update_many() call each
+    MetricsRecorder     records the results of the games in TrainingMetrics
+    TrajectoryRecorder  keeps the transitions of each episode
+    Evaluator           scores the players' greedy policies every few episodes
+
+Consumers are only called for what they are given, so leaving one out of the
+list turns it off for free.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.agents import Agent
+from src.persistence.interface import to_state_id
+from src.training.convergence import evaluate
+from src.training.episode import Consumer, Transition
+from src.training.metrics import TrainingMetrics
+
+
+class BatchedLearner(Consumer):
+    def __init__(self, player_x: Agent, player_o: Agent, every: int = 10) -> None:
+        """
+        player_x, player_o (Agent): The players to train
+        every (int): Episodes between updates. Until then, the players choose
+        their moves by the values they had at the last update. Default 10.
+        """
+        if every < 1:
+            raise ValueError(f"Episodes between updates must be at least 1: {every}")
+        self.players = {"X": player_x, "O": player_o}
+        self.every = every
+        self.episodes = 0
+        # Each player's transitions since the last update, as (state id, action,
+        # reward, next state id, done):
+        self._pending: dict[str, list[tuple[int, int, float, int, bool]]] = {
+            "X": [],
+            "O": [],
+        }
+
+    def consume(self, transition: Transition) -> None:
+        """Keep the transition for the next update"""
+        self._pending[transition.player].append(
+            (
+                to_state_id(transition.state),
+                transition.action,
+                transition.reward,
+                to_state_id(transition.next_state),
+                transition.done,
+            )
+        )
+
+    def end_episode(self, winner: None | str, alpha: float) -> None:
+        """Train the players if it's time to"""
+        self.episodes += 1
+        if self.episodes % self.every == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """Train the players on the transitions they haven't been trained on yet,
+        in the order they were played"""
+        for marker, pending in self._pending.items():
+            if not pending:
+                continue
+            state_ids, actions, rewards, next_ids, dones = (
+                np.array(column) for column in zip(*pending)
+            )
+            self.players[marker].update_many(
+                state_ids.astype(np.int32),
+                actions.astype(np.intp),
+                rewards.astype(np.float64),
+                next_ids.astype(np.int32),
+                dones.astype(np.bool_),
+            )
+            pending.clear()
+
+
+class MetricsRecorder(Consumer):
+    def __init__(self, metrics: TrainingMetrics) -> None:
+        """
+        metrics (TrainingMetrics): Where to record the results of the games
+        """
+        self.metrics = metrics
+
+    def end_episode(self, winner: None | str, alpha: float) -> None:
+        """Record the result of the game"""
+        self.metrics.record(winner, alpha)
+
+
+class TrajectoryRecorder(Consumer):
+    def __init__(self, limit: None | int = None) -> None:
+        """
+        limit (int): Keep only the transitions of this many of the latest
+        episodes. Default is to keep every episode.
+        """
+        self.limit = limit
+        # The transitions of each episode, in the order they came, and who won:
+        self.trajectories: list[list[Transition]] = []
+        self.winners: list[None | str] = []
+        self._current: list[Transition] = []
+
+    def consume(self, transition: Transition) -> None:
+        """Add the transition to the episode's trajectory"""
+        self._current.append(transition)
+
+    def end_episode(self, winner: None | str, alpha: float) -> None:
+        """Keep the episode's trajectory"""
+        self.trajectories.append(self._current)
+        self.winners.append(winner)
+        self._current = []
+        if self.limit is not None and len(self.trajectories) > self.limit:
+            del self.trajectories[: -self.limit]
+            del self.winners[: -self.limit]
+
+
+@dataclass
+class Score:
+    episode: int
+    # Fraction of the evaluation games that each player's greedy policy didn't
+    # lose against an opponent who moves at random:
+    x: float
+    o: float
+
+
+class Evaluator(Consumer):
+    def __init__(
+        self,
+        player_x: Agent,
+        player_o: Agent,
+        every: int = 1000,
+        n_games: int = 100,
+        seed: int = 0,
+    ) -> None:
+        """
+        player_x, player_o (Agent): The players to evaluate
+        every (int): Episodes between evaluations. Default 1000.
+        n_games (int): Games each player plays against a random opponent at
+        every evaluation. Default 100.
+        seed (int): Seed for the opponent's moves, which are the same at every
+        evaluation. Default 0.
+        """
+        self.player_x = player_x
+        self.player_o = player_o
+        self.every = every
+        self.n_games = n_games
+        self.seed = seed
+        self.episodes = 0
+        self.scores: list[Score] = []
+
+    def end_episode(self, winner: None | str, alpha: float) -> None:
+        """Evaluate the players if it's time to"""
+        self.episodes += 1
+        if self.episodes % self.every == 0:
+            self.scores.append(
+                Score(
+                    self.episodes,
+                    evaluate(self.player_x, "X", self.n_games, self.seed),
+                    evaluate(self.player_o, "O", self.n_games, self.seed),
+                )
+            )
@@ -0,0 +1,158 @@
+"""
+Early stopping for self-play training: rather than playing a fixed number of
+episodes, training is checked every `check_every` episodes and stops once it has
+converged.
+
+At each check, ConvergenceMonitor measures the rolling Q-delta: the mean
+absolute change that the players' updates made to a Q-value since the last
+check (the larger of the two players'). Optionally, each player's greedy policy
+also plays a fixed set of games against an opponent who moves at random, and
+is scored on the fraction of those games it didn't lose. The same random moves
+are used at every check, so a change in score comes from a change in policy.
+
+While training is making progress, the Q-delta falls and the score rises.
+Training has converged once it has plateaued: `patience` checks in a row without
+the Q-delta falling more than `tolerance` below its lowest so far, or the score
+rising more than `eval_tolerance` above its highest. (With any exploration at
+all, the Q-delta never reaches zero, as random moves keep revising values.)
+
+AdaptiveExploration goes with it: the exploration rate starts high and is cut
+at every check where the Q-delta didn't grow, so it follows how quickly the
+agents are learning instead of a schedule fixed by the number of episodes.
+Training should only be stopped once the rate has settled at its minimum.
+"""
+
+import random
+from copy import copy
+from dataclasses import dataclass
+
+from src.agents import Agent, QLearningAgent
+from src.games import TicTacToe
+
+
+@dataclass
+class Check:
+    episode: int
+    q_delta: float
+    # Mean fraction of evaluation games not lost by the two players, or None if
+    # they weren't evaluated:
+    score: None | float = None
+
+
+def evaluate(agent: Agent, marker: str, n_games: int, seed: int = 0) -> float:
+    """Play the agent's greedy policy as marker against an opponent who moves at
+    random, and return the fraction of n_games that the agent didn't lose. The
+    opponent makes the same moves for the same seed."""
+    rng = random.Random(seed)
+    not_lost = 0
+    for _ in range(n_games):
+        game = TicTacToe()
+        to_play = "X"
+        while not game.is_over():
+            valid_moves = game.get_all_valid_moves()
+            if to_play == marker:
+                row, col = agent.select_action(game.board.as_key(), valid_moves)
+            else:
+                row, col = rng.choice(valid_moves)
+            game.play_move(to_play, row, col)
+            to_play = "O" if to_play == "X" else "X"
+        not_lost += game.winner in (None, marker)
+    return not_lost / n_games if n_games else 1.0
+
+
+class ConvergenceMonitor:
+    def __init__(
+        self,
+        player_x: QLearningAgent,
+        player_o: QLearningAgent,
+        check_every: int = 1000,
+        tolerance: float = 1e-3,
+        patience: int = 5,
+        eval_games: int = 0,
+        eval_tolerance: float = 0.01,
+        seed: int = 0,
+    ) -> None:
+        """
+        player_x, player_o (QLearningAgent): The players being trained
+        check_every (int): Episodes between checks. Default 1000.
+        tolerance (float): How far the rolling Q-delta must fall below its lowest
+        so far to count as progress. Default 1e-3.
+        patience (int): Number of checks in a row without progress after which
+        training has converged. Default 5.
+        eval_games (int): Games each player plays against a random opponent at
+        every check. Default 0 (no evaluation).
+        eval_tolerance (float): How far the evaluation score must rise above its
+        highest so far to count as progress. Default 0.01.
+        seed (int): Seed for the random opponent's moves. Default 0.
+        """
+        self.players = (player_x, player_o)
+        self.check_every = check_every
+        self.tolerance = tolerance
+        self.patience = patience
+        self.eval_games = eval_games
+        self.eval_tolerance = eval_tolerance
+        self.seed = seed
+        self.history: list[Check] = []
+        # Number of checks since training last made progress:
+        self.stale = 0
+        self._best_q_delta = float("inf")
+        self._best_score = float("-inf")
+        self._changes = [copy(player.changes) for player in self.players]
+
+    def check(self, episode: int) -> bool:
+        """Measure the players after the given number of episodes. Return True if
+        training has converged."""
+        q_delta = max(
+            player.changes.mean_since(earlier)
+            for player, earlier in zip(self.players, self._changes)
+        )
+        self._changes = [copy(player.changes) for player in self.players]
+        score = None
+        if self.eval_games:
+            player_x, player_o = self.players
+            score = (
+                evaluate(player_x, "X", self.eval_games, self.seed)
+                + evaluate(player_o, "O", self.eval_games, self.seed)
+            ) / 2
+        self.history.append(Check(episode, q_delta, score))
+
+        progress = False
+        if q_delta < self._best_q_delta - self.tolerance:
+            self._best_q_delta = q_delta
+            progress = True
+        if score is not None and score > self._best_score + self.eval_tolerance:
+            self._best_score = score
+            progress = True
+        self.stale = 0 if progress else self.stale + 1
+        return self.converged()
+
+    def converged(self) -> bool:
+        """True if the last patience checks have made no progress"""
+        return self.stale >= self.patience
+
+
+class AdaptiveExploration:
+    def __init__(
+        self, start: float = 1.0, decay: float = 0.8, minimum: float = 0.01
+    ) -> None:
+        """
+        start (float): Exploration rate to begin with. Default 1.0.
+        decay (float): Factor the rate is cut by at each check. Default 0.8.
+        minimum (float): Lowest exploration rate. Default 0.01.
+        """
+        self.epsilon = start
+        self.decay = decay
+        self.minimum = minimum
+        self._last_q_delta = float("inf")
+
+    @property
+    def settled(self) -> bool:
+        """True once the exploration rate has been cut to its minimum"""
+        return self.epsilon <= self.minimum
+
+    def update(self, q_delta: float) -> None:
+        """Cut the exploration rate, unless the Q-delta has grown since the last
+        update (the agents are still finding out about new moves)"""
+        if q_delta <= self._last_q_delta:
+            self.epsilon = max(self.minimum, self.epsilon * self.decay)
+        self._last_q_delta = q_delta
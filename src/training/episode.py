@@ -0,0 +1,257 @@
+"""
+Self-play episodes as a stream of transitions.
+
+episode_transitions() plays a game between two agents and yields a Transition
+for every update that a player should learn from, in order, without training
+anyone itself. Each transition is handed to a list of Consumers before the game
+goes on, so a Learner that updates the players as transitions arrive trains
+them exactly as if the updates were made inside the game loop.
+
+play_episode() plays an episode through a list of consumers, by default a
+single Learner. Others (see src.training.consumers) record metrics, keep
+trajectories, evaluate the players or learn in batches, and any number of them
+can share the same stream of experience, so nothing has to be replayed.
+"""
+
+import random
+from collections.abc import Generator, Sequence
+from dataclasses import dataclass
+from time import perf_counter
+
+from src.agents import Agent
+from src.games import TicTacToe
+from src.games.tabletictactoe import TableTicTacToe
+from src.training.stats import TrainingStats
+
+# The games that an episode can be played on: TicTacToe, or TableTicTacToe which
+# plays the same game by looking up a precomputed transition table:
+BACKENDS = ("object", "table")
+
+
+@dataclass(slots=True)
+class Transition:
+    # The player to learn from the transition ("X" or "O"):
+    player: str
+    # States are given by their base-3 keys, and the action by its cell index
+    # (see src.games.statekey):
+    state: int
+    action: int
+    reward: float
+    next_state: int
+    done: bool
+
+
+class Consumer:
+    """Does something with the transitions of episodes. Both methods do nothing
+    unless overridden."""
+
+    def consume(self, transition: Transition) -> None:
+        """Handle a transition, before the game goes on"""
+
+    def end_episode(self, winner: None | str, alpha: float) -> None:
+        """Handle the end of an episode, won by winner ("X", "O" or None for a
+        draw) and played with exploration rate alpha"""
+
+
+class Learner(Consumer):
+    def __init__(self, player_x: Agent, player_o: Agent) -> None:
+        """
+        player_x, player_o (Agent): The players to train on their transitions
+        as they arrive
+        """
+        self.players = {"X": player_x, "O": player_o}
+        self._updates = {"X": player_x.update, "O": player_o.update}
+
+    def consume(self, transition: Transition) -> None:
+        """Train the transition's player on it"""
+        self._updates[transition.player](
+            transition.state,
+            transition.action,
+            transition.reward,
+            transition.next_state,
+            transition.done,
+        )
+
+
+def episode_transitions(
+    alpha: float,
+    player_x: Agent,
+    player_o: Agent,
+    stats: None | TrainingStats = None,
+    backend: str = "object",
+    rng: None | random.Random = None,
+) -> Generator[Transition, None, None | str]:
+    """
+    Alternate between each player starting with X until the game is over,
+    yielding a transition for each player to learn from as soon as it is known.
+
+    Arguments:
+    alpha (float): probability of choosing a random action instead of following
+    the policy.
+    stats (TrainingStats): Where to count the episode, and the time spent
+    selecting moves and playing them.
+    backend (str): The game to play on, one of BACKENDS. Both play the same
+    games, so the transitions are the same. Default "object".
+    rng (random.Random): Source of randomness for exploring. Default is the
+    random module's.
+
+    Returns:
+    The marker of the winner ("X" or "O") or None if the game ends in a draw,
+    as the value of the StopIteration.
+    """
+    draw = random.random if rng is None else rng.random
+    choose = random.choice if rng is None else rng.choice
+
+    # The "new state" for the markov chain isn't after the player plays their
+    # move, but rather after the opponent plays their following move (unless
+    # the game is terminal). So we need to keep track of the previous states.
+    # States are passed around as their base-3 keys, and actions as cell indexes
+    # (see src.games.statekey):
+    prev_marker: None | str = None
+    prev_state: None | int = None
+    prev_action: None | int = None
+
+    # Seconds spent selecting and playing, and the number of moves:
+    select_time = step_time = 0.0
+    plies = 0
+
+    game: TicTacToe | TableTicTacToe
+    if backend == "object":
+        game = TicTacToe()
+        observe = game.board.as_key
+    elif backend == "table":
+        game = TableTicTacToe()
+        observe = game.as_key
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    while not game.is_over():
+        for marker, player in [("X", player_x), ("O", player_o)]:
+            started = perf_counter()
+
+            # Observe the state:
+            start_state = observe()
+            all_valid_moves = game.get_all_valid_moves()
+
+            # Decide between exploration or exploitation:
+            if draw() > alpha:
+                row, col = player.select_action(start_state, all_valid_moves)
+            else:
+                row, col = choose(all_valid_moves)
+            selected = perf_counter()
+
+            # Apply selected move:
+            game.play_move(marker=marker, row=row, col=col)
+            done = game.is_over()
+            stepped = perf_counter()
+            select_time += selected - started
+            step_time += stepped - selected
+            plies += 1
+
+            # Determine reward if any
+            if done:
+                # Train this player. Assign reward if it won, else mild punishment
+                # if it's a draw (can't lose on your own round)
+                yield Transition(
+                    marker,
+                    start_state,
+                    3 * row + col,
+                    1 if game.winner == marker else -0.2,
+                    observe(),
+                    True,
+                )
+                # Train opponent player with bigger punishment if they lost, and
+                # mild punishment if it's a draw (opponent can't win since it's not
+                # their turn):
+                if (
+                    (prev_marker is not None)
+                    and (prev_state is not None)
+                    and (prev_action) is not None
+                ):
+                    yield Transition(
+                        prev_marker,
+                        prev_state,
+                        prev_action,
+                        -0.2 if game.winner is None else -1,
+                        observe(),
+                        True,
+                    )
+
+                # End episode immediately (don't let other player have a go)
+                break
+            else:
+                # Train the OPPONENT on their move, now that this player has
+                # replied:
+                if (
+                    (prev_marker is not None)
+                    and (prev_state is not None)
+                    and (prev_action) is not None
+                ):
+                    yield Transition(
+                        prev_marker,
+                        prev_state,
+                        prev_action,
+                        0,  # always zero for non-terminal states
+                        observe(),
+                        False,
+                    )
+
+                # Save for next training round:
+                prev_marker = marker
+                prev_state = start_state
+                prev_action = 3 * row + col
+
+    if stats is not None:
+        stats.add(select_time, step_time, 0.0, plies)
+        stats.episodes += 1
+    return game.winner
+
+
+def play_episode(
+    alpha: float,
+    player_x: Agent,
+    player_o: Agent,
+    stats: None | TrainingStats = None,
+    backend: str = "object",
+    consumers: None | Sequence[Consumer] = None,
+    rng: None | random.Random = None,
+) -> None | str:
+    """
+    Alternate between each player starting with X until the game is over,
+    handing each transition to the consumers as it comes.
+
+    Arguments:
+    alpha (float): probability of choosing a random action instead of following
+    the policy.
+    stats (TrainingStats): Where to count the episode, and the time spent
+    selecting moves, playing them and consuming the transitions (as updating).
+    backend (str): The game to play on, one of BACKENDS. Both play the same
+    games, so the players are trained the same way. Default "object".
+    consumers (Sequence[Consumer]): What to do with the transitions, in order.
+    Default is a Learner that trains both players.
+    rng (random.Random): Source of randomness for exploring. Default is the
+    random module's.
+
+    Returns:
+    The marker of the winner ("X" or "O") or None if the game ends in a draw.
+    """
+    if consumers is None:
+        consumers = [Learner(player_x, player_o)]
+    consumes = [consumer.consume for consumer in consumers]
+    transitions = episode_transitions(alpha, player_x, player_o, stats, backend, rng)
+    update_time = 0.0
+    while True:
+        try:
+            transition = next(transitions)
+        except StopIteration as stop:
+            winner = stop.value
+            break
+        started = perf_counter()
+        for consume in consumes:
+            consume(transition)
+        update_time += perf_counter() - started
+    for consumer in consumers:
+        consumer.end_episode(winner, alpha)
+    if stats is not None:
+        stats.seconds["update"] += update_time
+    return winner
@@ -0,0 +1,242 @@
+"""
+A stream of training metrics, recorded every `every` episodes. Each record
+holds, for the episodes since the last one:
+    episode              total number of episodes played so far
+    elapsed              seconds since training started
+    episodes_per_second  over the interval
+    epsilon              the exploration rate (probability of a random move)
+    x, o                 for each player:
+        alpha            learning rate
+        win, draw, loss  fraction of the interval's games with each result
+        mean_q_change    mean absolute change made to a Q-value by an update
+        max_q_change     largest absolute change made by an update
+        new_states       states added to the player's Q-table
+        states           states in the player's Q-table
+
+Records are appended to a JSON Lines file, one object per line, and can also be
+exported as a Prometheus text file (overwritten with the latest values every
+time) for a node exporter's textfile collector to pick up. The files are written
+by a background thread, so the training loop only has to count results and hand
+each record over. The JSON Lines file is opened before the thread starts, so a
+bad path fails straight away, and any error that stops the thread later on is
+raised by the next call to write() or close().
+"""
+
+import json
+import queue
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from copy import copy
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+
+from src.agents import QLearningAgent
+from src.games.vectortictactoe import EMPTY, O, X
+
+_RESULTS = ("win", "draw", "loss")
+
+# Gauges exported to Prometheus, with their help text:
+_GAUGES = {
+    "episode": "Episodes played",
+    "episodes_per_second": "Episodes played per second",
+    "epsilon": "Probability of a random move",
+    "alpha": "Learning rate",
+    "win": "Fraction of recent games won",
+    "draw": "Fraction of recent games drawn",
+    "loss": "Fraction of recent games lost",
+    "mean_q_change": "Mean absolute change made to a Q-value by an update",
+    "max_q_change": "Largest absolute change made to a Q-value by an update",
+    "new_states": "States added to the Q-table since the last record",
+    "states": "States in the Q-table",
+}
+
+
+class MetricsWriter:
+    def __init__(self, fp: Path, prometheus: None | Path = None) -> None:
+        """
+        fp (Path): JSON Lines file to append the records to
+        prometheus (Path): Text file to export the latest record to, in the
+        Prometheus exposition format
+        """
+        self.fp = Path(fp)
+        self.prometheus = prometheus
+        self._file = self.fp.open("a")
+        self._error: None | Exception = None
+        self._queue: queue.Queue[None | dict] = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, record: dict) -> None:
+        """Queue a record to be written. Raise the error that stopped the writer
+        thread, if any."""
+        self._raise_error()
+        self._queue.put(record)
+
+    def close(self) -> None:
+        """Write any queued records and stop the writer thread. Raise the error
+        that stopped it, if any."""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def _run(self) -> None:
+        # Any error stops the thread, so keep it for the training loop to see:
+        try:
+            self._write_records()
+        except Exception as error:  # noqa: BLE001
+            self._error = error
+
+    def _write_records(self) -> None:
+        unexported = None
+        with self._file as f:
+            while (record := self._queue.get()) is not None:
+                f.write(json.dumps(record) + "\n")
+                unexported = record
+                # Only flush and export the latest of any records that have
+                # piled up:
+                if self._queue.empty():
+                    f.flush()
+                    self._export(unexported)
+                    unexported = None
+        self._export(unexported)
+
+    def _export(self, record: None | dict) -> None:
+        if self.prometheus is not None and record is not None:
+            _write_prometheus(self.prometheus, record)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _write_prometheus(fp: Path, record: dict) -> None:
+    """Replace fp with the values in record, so readers never see half a file"""
+    lines = []
+    for name, help_text in _GAUGES.items():
+        metric = f"tictactoe_training_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        if name in record:
+            lines.append(f"{metric} {record[name]}")
+        else:
+            lines += [
+                f'{metric}{{player="{player}"}} {record[player][name]}'
+                for player in ["x", "o"]
+            ]
+    tmp = fp.with_name(fp.name + ".tmp")
+    tmp.write_text("\n".join(lines) + "\n")
+    tmp.replace(fp)
+
+
+class TrainingMetrics:
+    def __init__(
+        self,
+        writer: MetricsWriter,
+        player_x: QLearningAgent,
+        player_o: QLearningAgent,
+        every: int = 1000,
+    ) -> None:
+        """
+        writer (MetricsWriter): Where to send the records
+        player_x, player_o (QLearningAgent): The players being trained
+        every (int): Number of episodes between records. Default 1000.
+        """
+        self.writer = writer
+        self.players = {"x": player_x, "o": player_o}
+        self.every = every
+        self.episodes = 0
+        self.epsilon = 1.0
+        # Results of the games since the last record, keyed by winner:
+        self.results: dict[None | str, int] = {"X": 0, "O": 0, None: 0}
+        self._started = self._last_time = time.perf_counter()
+        self._last_episodes = 0
+        self._states = {side: 0 for side in self.players}
+        self._changes = {}
+        for side, player in self.players.items():
+            player.changes.take_max()
+            self._changes[side] = copy(player.changes)
+
+    def record(self, winner: None | str, epsilon: float) -> None:
+        """Count the result of an episode, played with exploration rate epsilon"""
+        self.results[winner] += 1
+        self.episodes += 1
+        self.epsilon = epsilon
+        if self.episodes - self._last_episodes >= self.every:
+            self.emit()
+
+    def record_many(self, winners: np.ndarray, epsilon: float) -> None:
+        """Count the results of a batch of episodes, with winners given by the
+        player codes of src.games.vectortictactoe"""
+        for winner, code in [("X", X), ("O", O), (None, EMPTY)]:
+            self.results[winner] += int(np.count_nonzero(winners == code))
+        self.episodes += len(winners)
+        self.epsilon = epsilon
+        if self.episodes - self._last_episodes >= self.every:
+            self.emit()
+
+    def emit(self) -> None:
+        """Send a record for the episodes since the last one, if there were
+        any"""
+        n_episodes = self.episodes - self._last_episodes
+        if n_episodes == 0:
+            return
+        now = time.perf_counter()
+        record: dict = {
+            "episode": self.episodes,
+            "elapsed": now - self._started,
+            "episodes_per_second": n_episodes / max(now - self._last_time, 1e-9),
+            "epsilon": self.epsilon,
+        }
+        for side, player in self.players.items():
+            wins = self.results[side.upper()]
+            losses = self.results["O" if side == "x" else "X"]
+            draws = self.results[None]
+            states = player.qtable.n_states()
+            record[side] = {
+                "alpha": player.alpha,
+                **{
+                    result: count / n_episodes
+                    for result, count in zip(_RESULTS, [wins, draws, losses])
+                },
+                "mean_q_change": player.changes.mean_since(self._changes[side]),
+                "max_q_change": player.changes.take_max(),
+                "new_states": states - self._states[side],
+                "states": states,
+            }
+            self._states[side] = states
+            self._changes[side] = copy(player.changes)
+        self.writer.write(record)
+
+        self.results = dict.fromkeys(self.results, 0)
+        self._last_time = now
+        self._last_episodes = self.episodes
+
+
+@contextmanager
+def metrics_stream(
+    fp: None | Path,
+    player_x: QLearningAgent,
+    player_o: QLearningAgent,
+    every: int = 1000,
+    prometheus: None | Path = None,
+) -> Iterator[None | TrainingMetrics]:
+    """Record metrics for the body of the with statement to fp (and prometheus),
+    including a last record for any episodes left over at the end. Nothing is
+    recorded if fp is None."""
+    if fp is None:
+        yield None
+        return
+    with MetricsWriter(fp, prometheus) as writer:
+        metrics = TrainingMetrics(writer, player_x, player_o, every)
+        yield metrics
+        metrics.emit()
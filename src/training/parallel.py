@@ -0,0 +1,227 @@
+"""
+Self-play training spread over a pool of worker processes.
+
+Training runs in rounds. At the start of each round every worker is sent a copy
+of both players' Q-tables, plays sync_interval episodes against its own copies,
+and sends back how much each Q-value changed. The changes from all workers are
+then merged into the shared tables, either by averaging them ("mean") or by
+adding them all up ("sum"), before the next round starts.
+
+With the "hogwild" merge, the workers instead share both players' Q-tables in
+shared memory (see src.persistence.sharedqtable) and update them in place,
+without locks, so every worker sees the others' updates as soon as they are
+made and nothing needs to be merged. Rounds then only serve to report progress.
+
+Episode indexes are dealt out to the workers in turn, so the exploration rate
+decays on the same global schedule as a single-process run, however many
+workers there are.
+"""
+
+import random
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+
+import numpy as np
+
+from src.agents import QLearningAgent
+from src.persistence import ArrayQTable
+from src.persistence.sharedqtable import SharedQTable
+from src.training.episode import play_episode
+
+MERGES = ("mean", "sum", "hogwild")
+
+
+def _make_agent(
+    values: np.ndarray,
+    visited: np.ndarray,
+    alpha: float,
+    gamma: float,
+    symmetric: bool,
+) -> QLearningAgent:
+    qtable = ArrayQTable()
+    qtable.values[:] = values
+    qtable.visited[:] = visited
+    return QLearningAgent(alpha=alpha, gamma=gamma, qtable=qtable, symmetric=symmetric)
+
+
+def _storage(agent: QLearningAgent) -> ArrayQTable:
+    """The ArrayQTable that an agent keeps its values in, behind any
+    SymmetricQTable"""
+    qtable = getattr(agent.qtable, "inner", agent.qtable)
+    if not isinstance(qtable, ArrayQTable):
+        raise TypeError(f"Can't train a {type(qtable).__name__} in parallel")
+    return qtable
+
+
+def train_worker(
+    tables: tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    episode_idxs: range,
+    n_episodes: int,
+    alpha: float,
+    gamma: float,
+    symmetric: bool,
+    seed: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Play one worker's share of a round.
+
+    Arguments:
+    tables: X's values and visited flags, then O's, at the start of the round
+    episode_idxs (range): Global indexes of the episodes to play, which set the
+    exploration rate
+    n_episodes (int): Total number of episodes in the training run
+    alpha, gamma, symmetric: As for QLearningAgent
+    seed (int): Seed for this worker's random moves
+
+    Returns:
+    The change in X's values and the states X visited, then the same for O
+    """
+    random.seed(seed)
+    x_values, x_visited, o_values, o_visited = tables
+    player_x = _make_agent(x_values, x_visited, alpha, gamma, symmetric)
+    player_o = _make_agent(o_values, o_visited, alpha, gamma, symmetric)
+    for episode_idx in episode_idxs:
+        play_episode(
+            1.0 - episode_idx / n_episodes, player_x=player_x, player_o=player_o
+        )
+    x_table, o_table = _storage(player_x), _storage(player_o)
+    return (
+        x_table.values - x_values,
+        x_table.visited,
+        o_table.values - o_values,
+        o_table.visited,
+    )
+
+
+def hogwild_worker(
+    names: tuple[str, str],
+    episode_idxs: range,
+    n_episodes: int,
+    alpha: float,
+    gamma: float,
+    symmetric: bool,
+    seed: int,
+) -> None:
+    """
+    Play one worker's share of a round, updating shared Q-tables in place.
+
+    Arguments:
+    names: Names of X's and O's SharedQTables
+    The rest are as for train_worker
+    """
+    random.seed(seed)
+    with (
+        SharedQTable.attach(names[0]) as x_table,
+        SharedQTable.attach(names[1]) as o_table,
+    ):
+        # Other workers write to the same tables, so nothing can be cached:
+        player_x = QLearningAgent(
+            alpha, gamma, qtable=x_table, symmetric=symmetric, cache_best=False
+        )
+        player_o = QLearningAgent(
+            alpha, gamma, qtable=o_table, symmetric=symmetric, cache_best=False
+        )
+        for episode_idx in episode_idxs:
+            play_episode(
+                1.0 - episode_idx / n_episodes, player_x=player_x, player_o=player_o
+            )
+
+
+def train_parallel(
+    n_episodes: int,
+    n_workers: int,
+    sync_interval: int = 1000,
+    merge: str = "mean",
+    alpha: float = 0.2,
+    gamma: float = 0.9,
+    symmetric: bool = False,
+    seed: None | int = None,
+    executor: None | Executor = None,
+    progress=None,
+) -> tuple[QLearningAgent, QLearningAgent]:
+    """
+    Train a pair of agents on n_episodes of self-play, spread over n_workers
+    processes which merge their Q-tables every sync_interval episodes each.
+
+    Arguments:
+    n_episodes (int): Total number of episodes to play
+    n_workers (int): Number of worker processes
+    sync_interval (int): Episodes each worker plays between merges
+    merge (str): "mean" to average the workers' changes, "sum" to add them up,
+    or "hogwild" to have the workers update shared tables in place
+    alpha, gamma, symmetric: As for QLearningAgent
+    seed (int): Seed for the workers' random moves. Default is random.
+    executor (Executor): Pool to run the workers in. Default is a new
+    ProcessPoolExecutor with n_workers processes.
+    progress: Optional tqdm-like object, updated as episodes complete
+
+    Returns:
+    The trained (player_x, player_o) agents
+    """
+    if merge not in MERGES:
+        raise ValueError(f"Unrecognised merge: {merge}")
+    seed = random.randrange(2**32) if seed is None else seed
+
+    player_x = QLearningAgent(alpha, gamma, qtable=ArrayQTable(), symmetric=symmetric)
+    player_o = QLearningAgent(alpha, gamma, qtable=ArrayQTable(), symmetric=symmetric)
+    x_table, o_table = _storage(player_x), _storage(player_o)
+
+    with ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(ProcessPoolExecutor(n_workers))
+        shared = None
+        if merge == "hogwild":
+            shared = (
+                stack.enter_context(SharedQTable()),
+                stack.enter_context(SharedQTable()),
+            )
+
+        round_size = n_workers * sync_interval
+        for round_idx, round_start in enumerate(range(0, n_episodes, round_size)):
+            round_end = min(round_start + round_size, n_episodes)
+            shares = [
+                (
+                    range(round_start + worker, round_end, n_workers),
+                    seed + round_idx * n_workers + worker,
+                )
+                for worker in range(n_workers)
+            ]
+            common = (n_episodes, alpha, gamma, symmetric)
+            if shared is not None:
+                names = (shared[0].name, shared[1].name)
+                futures = [
+                    executor.submit(hogwild_worker, names, idxs, *common, worker_seed)
+                    for idxs, worker_seed in shares
+                ]
+                for future in futures:
+                    future.result()
+            else:
+                tables = (
+                    x_table.values,
+                    x_table.visited,
+                    o_table.values,
+                    o_table.visited,
+                )
+                results = [
+                    future.result()
+                    for future in [
+                        executor.submit(
+                            train_worker, tables, idxs, *common, worker_seed
+                        )
+                        for idxs, worker_seed in shares
+                    ]
+                ]
+                scale = 1 / len(results) if merge == "mean" else 1.0
+                for table, delta_idx in [(x_table, 0), (o_table, 2)]:
+                    table.values += scale * sum(r[delta_idx] for r in results)
+                    table.visited |= np.logical_or.reduce(
+                        [r[delta_idx + 1] for r in results]
+                    )
+            if progress is not None:
+                progress.update(round_end - round_start)
+
+        if shared is not None:
+            for table, shared_table in zip((x_table, o_table), shared):
+                table.values[:] = shared_table.values
+                table.visited[:] = shared_table.visited
+    return player_x, player_o
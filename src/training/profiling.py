@@ -0,0 +1,115 @@
+"""
+Opt-in profiling of training runs, written to a file.
+
+Two profilers are available, both from the standard library:
+    cprofile  Deterministic profiling with cProfile. Every function call is
+              timed, which is exact but slows the run down several times over.
+              The output is the pstats report, sorted by time spent in each
+              function itself.
+    sampling  A background thread looks at the stack of the profiled thread
+              every `interval` seconds. Much cheaper, but statistical. The
+              output has one line per distinct stack, with the functions from
+              outermost to innermost separated by semicolons, followed by the
+              number of samples (the "folded" format read by flamegraph.pl and
+              speedscope).
+
+Only the thread (and process) that starts profiling is profiled.
+"""
+
+import cProfile
+import pstats
+import sys
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+from typing import Self
+
+PROFILERS = ("cprofile", "sampling")
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.001) -> None:
+        """
+        interval (float): Seconds between samples. Default 0.001. With the GIL,
+        samples can be further apart than this (see sys.setswitchinterval).
+        """
+        self.interval = interval
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self._target_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: None | threading.Thread = None
+
+    def start(self) -> None:
+        """Start sampling the calling thread"""
+        self._target_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_id)
+            if frame is not None:
+                self.samples[_stack(frame)] += 1
+
+    def write(self, fp: Path) -> None:
+        """Write the samples in folded format, most common stacks first"""
+        with Path(fp).open("w") as f:
+            f.writelines(
+                f"{';'.join(stack)} {count}\n"
+                for stack, count in self.samples.most_common()
+            )
+
+    def __enter__(self) -> Self:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def _stack(frame: None | FrameType) -> tuple[str, ...]:
+    """Name the functions on a stack, from outermost to innermost"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return tuple(reversed(names))
+
+
+@contextmanager
+def profiled(profiler: None | str, fp: Path) -> Iterator[None]:
+    """Profile the body of the with statement with one of PROFILERS, and write
+    the results to fp. Nothing is profiled if profiler is None."""
+    if profiler is None:
+        yield
+    elif profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with Path(fp).open("w") as f:
+                pstats.Stats(profile, stream=f).sort_stats("tottime").print_stats()
+    elif profiler == "sampling":
+        with SamplingProfiler() as sampler:
+            try:
+                yield
+            finally:
+                sampler.stop()
+                sampler.write(fp)
+    else:
+        raise ValueError(f"Unrecognised profiler: {profiler}")
@@ -0,0 +1,283 @@
+"""
+Experience replay: rather than learning from each transition once, as it is
+played, the players' transitions go into a ReplayBuffer and the players learn
+from minibatches drawn from it. Playing and learning are then separate steps,
+every game played is learned from many times over, and each minibatch is
+applied at once with update_many().
+
+A ReplayBuffer is a ring of fixed capacity, kept as preallocated NumPy columns
+(state id, action, reward, next state id and done), so once it is full each new
+transition overwrites the oldest. Minibatches are drawn uniformly, or in
+proportion to each transition's priority: the size of its last TD error (how
+far its Q-value was from its target), raised to priority_exponent, so that the
+transitions the player has yet to learn come up more often. New transitions get
+the highest priority seen so far, to be sure of being drawn at least once.
+
+The Q-values are updated without importance-sampling weights, as update_many()
+applies every transition with the same learning rate.
+
+ReplayWriter consumes the transitions of play_episode (see
+src.training.episode), storing them in the players' buffers instead of learning
+from them.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.agents import QLearningAgent
+from src.persistence.interface import to_state_id
+from src.training.episode import Consumer, Transition, play_episode
+from src.training.metrics import TrainingMetrics
+from src.training.stats import TrainingStats
+
+SAMPLINGS = ("uniform", "prioritized")
+
+# Added to every priority, so that every transition can still be drawn:
+_MIN_PRIORITY = 1e-3
+
+
+@dataclass
+class Batch:
+    # Positions of the transitions in the buffer, for update_priorities():
+    idxs: np.ndarray
+    state_ids: np.ndarray
+    actions: np.ndarray
+    rewards: np.ndarray
+    next_state_ids: np.ndarray
+    dones: np.ndarray
+
+
+class ReplayBuffer:
+    def __init__(
+        self,
+        capacity: int,
+        sampling: str = "uniform",
+        priority_exponent: float = 0.6,
+        rng: None | np.random.Generator = None,
+    ) -> None:
+        """
+        capacity (int): Number of transitions kept, the oldest being replaced
+        first once it is full
+        sampling (str): How to draw minibatches, one of SAMPLINGS. Default
+        "uniform".
+        priority_exponent (float): With prioritized sampling, transitions are
+        drawn in proportion to their priority raised to this power (0 is
+        uniform). Default 0.6.
+        rng (np.random.Generator): Source of randomness. Default is a new one.
+        """
+        if capacity < 1:
+            raise ValueError(f"Capacity must be at least 1: {capacity}")
+        if sampling not in SAMPLINGS:
+            raise ValueError(f"Unrecognised sampling: {sampling}")
+        self.capacity = capacity
+        self.sampling = sampling
+        self.priority_exponent = priority_exponent
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.state_ids = np.zeros(capacity, dtype=np.int32)
+        self.actions = np.zeros(capacity, dtype=np.intp)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_state_ids = np.zeros(capacity, dtype=np.int32)
+        self.dones = np.zeros(capacity, dtype=np.bool_)
+        self.priorities = np.zeros(capacity, dtype=np.float64)
+        self._max_priority = 1.0
+        # Where the next transition goes, and how many are stored:
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(
+        self,
+        state_id: int,
+        action: int,
+        reward: float,
+        next_state_id: int,
+        done: bool,
+    ) -> None:
+        """Store a transition, with states given by their dense ids (see
+        src.games.stateindex) and the action by its index (3 * row + col)"""
+        idx = self._next
+        self.state_ids[idx] = state_id
+        self.actions[idx] = action
+        self.rewards[idx] = reward
+        self.next_state_ids[idx] = next_state_id
+        self.dones[idx] = done
+        self.priorities[idx] = self._max_priority
+        self._next = (idx + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def add_many(
+        self,
+        state_ids: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        next_state_ids: np.ndarray,
+        dones: np.ndarray,
+    ) -> None:
+        """Store a batch of transitions, in order. If there are more than the
+        capacity, only the last ones are kept."""
+        n = len(state_ids)
+        # Positions in the ring, of which only the last capacity are written:
+        idxs = (self._next + np.arange(n)) % self.capacity
+        keep = slice(max(n - self.capacity, 0), n)
+        idxs = idxs[keep]
+        self.state_ids[idxs] = state_ids[keep]
+        self.actions[idxs] = actions[keep]
+        self.rewards[idxs] = rewards[keep]
+        self.next_state_ids[idxs] = next_state_ids[keep]
+        self.dones[idxs] = dones[keep]
+        self.priorities[idxs] = self._max_priority
+        self._next = (self._next + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def sample(self, batch_size: int) -> Batch:
+        """Draw a minibatch of batch_size transitions, with replacement"""
+        if not self._size:
+            raise RuntimeError("Can't sample from an empty buffer")
+        if self.sampling == "uniform":
+            idxs = self.rng.integers(0, self._size, size=batch_size)
+        else:
+            weights = np.cumsum(self.priorities[: self._size] ** self.priority_exponent)
+            idxs = np.searchsorted(
+                weights, self.rng.random(batch_size) * weights[-1], side="right"
+            )
+            # Rounding can put a draw just past the last weight:
+            idxs = np.minimum(idxs, self._size - 1)
+        return Batch(
+            idxs,
+            self.state_ids[idxs],
+            self.actions[idxs],
+            self.rewards[idxs],
+            self.next_state_ids[idxs],
+            self.dones[idxs],
+        )
+
+    def update_priorities(self, idxs: np.ndarray, td_errors: np.ndarray) -> None:
+        """Set the priorities of sampled transitions from their latest TD
+        errors"""
+        priorities = np.abs(td_errors) + _MIN_PRIORITY
+        self.priorities[idxs] = priorities
+        if len(priorities):
+            self._max_priority = max(self._max_priority, float(priorities.max()))
+
+
+class ReplayWriter(Consumer):
+    def __init__(self, buffer_x: ReplayBuffer, buffer_o: ReplayBuffer) -> None:
+        """
+        buffer_x, buffer_o (ReplayBuffer): Where to store each player's
+        transitions
+        """
+        self.buffers = {"X": buffer_x, "O": buffer_o}
+
+    def consume(self, transition: Transition) -> None:
+        """Store the transition in its player's buffer"""
+        self.buffers[transition.player].add(
+            to_state_id(transition.state),
+            transition.action,
+            transition.reward,
+            to_state_id(transition.next_state),
+            transition.done,
+        )
+
+
+def td_errors(agent: QLearningAgent, batch: Batch) -> np.ndarray:
+    """Get how far the agent's Q-value of each transition in a batch is from its
+    target, the reward plus the discounted value of the next state"""
+    q = agent.qtable.get_rows(batch.state_ids)[
+        np.arange(len(batch.idxs)), batch.actions
+    ]
+    max_future_rewards = np.where(
+        batch.dones, 0.0, agent.qtable.get_rows(batch.next_state_ids).max(axis=1)
+    )
+    return batch.rewards + agent.gamma * max_future_rewards - q
+
+
+def learn(agent: QLearningAgent, buffer: ReplayBuffer, batch_size: int) -> None:
+    """Train the agent on a minibatch drawn from the buffer"""
+    batch = buffer.sample(batch_size)
+    # Apply updates in order of the number of marks on the board, so that few
+    # transitions bootstrap from a state updated before them in the same batch:
+    order = np.argsort(batch.state_ids, kind="stable")
+    agent.update_many(
+        batch.state_ids[order],
+        batch.actions[order],
+        batch.rewards[order],
+        batch.next_state_ids[order],
+        batch.dones[order],
+    )
+    if buffer.sampling == "prioritized":
+        buffer.update_priorities(batch.idxs, td_errors(agent, batch))
+
+
+def train_replay(
+    n_episodes: int,
+    player_x: QLearningAgent,
+    player_o: QLearningAgent,
+    capacity: int = 10_000,
+    batch_size: int = 32,
+    batches_per_episode: int = 1,
+    sampling: str = "uniform",
+    rng: None | np.random.Generator = None,
+    stats: None | TrainingStats = None,
+    metrics: None | TrainingMetrics = None,
+    backend: str = "object",
+    progress=None,
+) -> tuple[ReplayBuffer, ReplayBuffer]:
+    """
+    Train both players on n_episodes games of self-play with experience replay.
+    After each game, each player is trained on batches_per_episode minibatches
+    drawn from their own buffer, once it holds at least batch_size transitions.
+    The exploration rate decays to zero as in play_episode training.
+
+    Arguments:
+    n_episodes (int): Number of episodes to play
+    player_x, player_o (QLearningAgent): The players to train
+    capacity (int): Transitions kept in each player's buffer. Default 10,000.
+    batch_size (int): Transitions in each minibatch. Default 32.
+    batches_per_episode (int): Minibatches each player learns from after each
+    episode. Default 1.
+    sampling (str): How to draw minibatches, one of SAMPLINGS. Default
+    "uniform".
+    rng (np.random.Generator): Source of randomness for sampling. Default is a
+    new one.
+    stats (TrainingStats): Where to count the episodes, with learning from the
+    buffers counted as updating.
+    metrics (TrainingMetrics): Where to record the results of the games
+    backend (str): The game to play on, one of episode.BACKENDS. Default
+    "object".
+    progress: Optional tqdm-like object, updated as episodes complete
+
+    Returns:
+    The players' (X, O) buffers
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    stats = TrainingStats() if stats is None else stats
+    buffers = (
+        ReplayBuffer(capacity, sampling, rng=rng),
+        ReplayBuffer(capacity, sampling, rng=rng),
+    )
+    # Learning from the buffers comes after each episode, so the players play
+    # without learning during it:
+    consumers = [ReplayWriter(*buffers)]
+    for episode_idx in range(n_episodes):
+        alpha = 1.0 - episode_idx / n_episodes  # Alpha decays to zero
+        winner = play_episode(
+            alpha,
+            player_x=player_x,
+            player_o=player_o,
+            stats=stats,
+            backend=backend,
+            consumers=consumers,
+        )
+        with stats.timed("update"):
+            for player, buffer in zip((player_x, player_o), buffers):
+                if len(buffer) >= batch_size:
+                    for _ in range(batches_per_episode):
+                        learn(player, buffer, batch_size)
+        if metrics is not None:
+            metrics.record(winner, alpha)
+        if progress is not None:
+            progress.update()
+    return buffers
@@ -0,0 +1,87 @@
+"""
+Counters and phase timers for training runs, cheap enough to leave on in
+production. The training loops add up the time spent in each phase of an
+episode locally, and hand the totals over once per episode (or batch), so
+keeping count costs a few perf_counter() calls per move.
+
+The phases are:
+    select  choosing actions (the agents' select_action/select_actions)
+    step    playing the chosen moves and checking if the games are over
+    update  training the agents on the transitions (update/update_many)
+    save    saving the trained agents
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from src.persistence import Persistence
+
+PHASES = ("select", "step", "update", "save")
+
+
+@dataclass
+class TrainingStats:
+    # Seconds spent in each of PHASES:
+    seconds: dict[str, float] = field(
+        default_factory=lambda: dict.fromkeys(PHASES, 0.0)
+    )
+    episodes: int = 0
+    plies: int = 0
+    # Number of states in each player's Q-table, keyed by marker:
+    states_discovered: dict[str, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+
+    def add(self, select: float, step: float, update: float, plies: int) -> None:
+        """Add the time spent in each phase of some moves"""
+        seconds = self.seconds
+        seconds["select"] += select
+        seconds["step"] += step
+        seconds["update"] += update
+        self.plies += plies
+
+    @contextmanager
+    def timed(self, phase: str) -> Iterator[None]:
+        """Add the time spent in the body of the with statement to a phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[phase] += time.perf_counter() - start
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the stats were created"""
+        return time.perf_counter() - self.started
+
+    @property
+    def episodes_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.episodes / elapsed if elapsed > 0 else 0.0
+
+    def count_states(self, **qtables: Persistence) -> None:
+        """Record the number of states in each player's Q-table, e.g.
+        count_states(X=player_x.qtable, O=player_o.qtable)"""
+        self.states_discovered = {
+            marker: qtable.n_states() for marker, qtable in qtables.items()
+        }
+
+    def summary(self) -> str:
+        """Describe the stats in a few lines of text"""
+        elapsed = self.elapsed
+        lines = [
+            (
+                f"{self.episodes:,} episodes, {self.plies:,} moves in {elapsed:.2f}s "
+                f"({self.episodes_per_second:,.0f} episodes/s)"
+            )
+        ]
+        for phase, seconds in self.seconds.items():
+            share = seconds / elapsed if elapsed > 0 else 0.0
+            lines.append(f"  {phase:8}{seconds:9.3f}s {share:6.1%}")
+        if self.states_discovered:
+            lines.append(
+                "States discovered: "
+                + ", ".join(f"{m} {n:,}" for m, n in self.states_discovered.items())
+            )
+        return "\n".join(lines)
@@ -0,0 +1,209 @@
+"""
+Self-play training spread over a pool of threads, for free-threaded builds of
+Python (such as python3.14t), where threads run Python code in parallel.
+
+Unlike the worker processes of src.training.parallel, the threads share both
+players' Q-tables in place: nothing is copied, merged or put in shared memory,
+and every thread sees the others' updates as soon as they are made. Each thread
+plays with its own pair of agents over the shared tables, and its own source of
+randomness.
+
+An update reads the value of a (state, action) pair and writes it back, so two
+threads updating the same state at once could lose one of the updates. Each
+update therefore holds a lock for its state, taken from a fixed set of
+StripedLocks: states are spread over the locks by their key, so threads only
+wait for each other when they update states that share a lock. Reading the
+value of the next state to bootstrap from takes no lock, and may see a value
+that is about to change, which Q-learning is robust to (as with "hogwild"
+training in src.training.parallel).
+
+With the GIL, threads take turns instead of running at once, so training is
+played on a single thread instead, unless told otherwise (the locks keep it
+correct either way).
+
+Episode indexes are dealt out to the threads in turn, so the exploration rate
+decays on the same global schedule as a single-threaded run, however many
+threads there are.
+"""
+
+import random
+import sys
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from src.agents import Agent, QLearningAgent
+from src.games import stateindex
+from src.games.symmetry import CANONICAL_IDS
+from src.persistence import ArrayQTable
+from src.training.episode import Learner, Transition, play_episode
+
+
+def gil_enabled() -> bool:
+    """Whether the interpreter runs one thread at a time"""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+class StripedLocks:
+    def __init__(self, n_stripes: int = 64, symmetric: bool = False) -> None:
+        """
+        n_stripes (int): Number of locks to spread the states over. Default 64.
+        symmetric (bool): Whether the states are stored in their canonical form
+        (see src.persistence.symmetric), so that every rotation and reflection
+        of a state must take the same lock. Default False.
+        """
+        if n_stripes < 1:
+            raise ValueError(f"Number of stripes must be at least 1: {n_stripes}")
+        self.locks = [threading.Lock() for _ in range(n_stripes)]
+        self.symmetric = symmetric
+
+    def for_state(self, key: int) -> threading.Lock:
+        """Get the lock for a state given by its key"""
+        if self.symmetric:
+            key = stateindex.KEYS[CANONICAL_IDS[stateindex.key_id(key)]]
+        return self.locks[key % len(self.locks)]
+
+
+class LockedLearner(Learner):
+    def __init__(
+        self,
+        player_x: Agent,
+        player_o: Agent,
+        locks_x: StripedLocks,
+        locks_o: StripedLocks,
+    ) -> None:
+        """
+        player_x, player_o (Agent): The players to train on their transitions
+        as they arrive
+        locks_x, locks_o (StripedLocks): Locks for the states of each player's
+        Q-table, shared by every learner that updates it
+        """
+        super().__init__(player_x, player_o)
+        self._locks = {"X": locks_x, "O": locks_o}
+
+    def consume(self, transition: Transition) -> None:
+        """Train the transition's player on it, holding the lock for its state"""
+        with self._locks[transition.player].for_state(transition.state):
+            super().consume(transition)
+
+
+def thread_worker(
+    qtables: tuple[ArrayQTable, ArrayQTable],
+    locks: tuple[StripedLocks, StripedLocks],
+    episode_idxs: range,
+    n_episodes: int,
+    alpha: float,
+    gamma: float,
+    symmetric: bool,
+    seed: int,
+    backend: str = "object",
+) -> None:
+    """
+    Play one thread's share of a round, updating the shared Q-tables in place.
+
+    Arguments:
+    qtables: X's and O's shared Q-tables
+    locks: The locks for the states of X's and O's Q-tables
+    episode_idxs (range): Global indexes of the episodes to play, which set the
+    exploration rate
+    n_episodes (int): Total number of episodes in the training run
+    alpha, gamma, symmetric: As for QLearningAgent
+    seed (int): Seed for this thread's random moves
+    backend (str): The game to play on, one of episode.BACKENDS
+    """
+    rng = random.Random(seed)
+    # Other threads write to the same tables, so nothing can be cached:
+    player_x = QLearningAgent(
+        alpha, gamma, qtable=qtables[0], symmetric=symmetric, cache_best=False
+    )
+    player_o = QLearningAgent(
+        alpha, gamma, qtable=qtables[1], symmetric=symmetric, cache_best=False
+    )
+    consumers = [LockedLearner(player_x, player_o, *locks)]
+    for episode_idx in episode_idxs:
+        play_episode(
+            1.0 - episode_idx / n_episodes,
+            player_x=player_x,
+            player_o=player_o,
+            backend=backend,
+            consumers=consumers,
+            rng=rng,
+        )
+
+
+def train_threaded(
+    n_episodes: int,
+    n_threads: int,
+    alpha: float = 0.2,
+    gamma: float = 0.9,
+    symmetric: bool = False,
+    n_stripes: int = 64,
+    report_every: int = 1000,
+    seed: None | int = None,
+    backend: str = "object",
+    fallback: bool = True,
+    progress=None,
+) -> tuple[QLearningAgent, QLearningAgent]:
+    """
+    Train a pair of agents on n_episodes of self-play, spread over n_threads
+    threads which share both players' Q-tables.
+
+    Arguments:
+    n_episodes (int): Total number of episodes to play
+    n_threads (int): Number of threads
+    alpha, gamma, symmetric: As for QLearningAgent
+    n_stripes (int): Number of locks for each player's states. Default 64.
+    report_every (int): Episodes each thread plays between progress updates.
+    Default 1000.
+    seed (int): Seed for the threads' random moves. Default is random.
+    backend (str): The game to play on, one of episode.BACKENDS. Default
+    "object".
+    fallback (bool): With the GIL, play on a single thread (and warn), as more
+    threads would only take turns. Default True.
+    progress: Optional tqdm-like object, updated as episodes complete
+
+    Returns:
+    The trained (player_x, player_o) agents
+    """
+    if n_threads < 1:
+        raise ValueError(f"Number of threads must be at least 1: {n_threads}")
+    if fallback and n_threads > 1 and gil_enabled():
+        warnings.warn(
+            "The GIL is enabled, so training on 1 thread instead of "
+            f"{n_threads}. Use a free-threaded build of Python to train on more.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        n_threads = 1
+    seed = random.randrange(2**32) if seed is None else seed
+
+    qtables = (ArrayQTable(), ArrayQTable())
+    locks = (StripedLocks(n_stripes, symmetric), StripedLocks(n_stripes, symmetric))
+    with ThreadPoolExecutor(n_threads) as executor:
+        round_size = n_threads * report_every
+        for round_idx, round_start in enumerate(range(0, n_episodes, round_size)):
+            round_end = min(round_start + round_size, n_episodes)
+            futures = [
+                executor.submit(
+                    thread_worker,
+                    qtables,
+                    locks,
+                    range(round_start + thread, round_end, n_threads),
+                    n_episodes,
+                    alpha,
+                    gamma,
+                    symmetric,
+                    seed + round_idx * n_threads + thread,
+                    backend,
+                )
+                for thread in range(n_threads)
+            ]
+            for future in futures:
+                future.result()
+            if progress is not None:
+                progress.update(round_end - round_start)
+
+    player_x = QLearningAgent(alpha, gamma, qtable=qtables[0], symmetric=symmetric)
+    player_o = QLearningAgent(alpha, gamma, qtable=qtables[1], symmetric=symmetric)
+    return player_x, player_o
@@ -0,0 +1,211 @@
+"""
+A binary file format for the transitions of self-play episodes, so that
+experience can be generated once and learned from any number of times, by
+players with other learning rates or discount factors, without playing the
+games again.
+
+TrajectoryWriter consumes the transitions of play_episode (see
+src.training.episode) and appends them to a file in chunks, so that writing
+costs one tuple per transition and a write() call every chunk_size of them.
+train_offline() maps files into memory and applies their transitions in the
+order they were played, a chunk at a time, which trains the players exactly as
+they would have been trained during the episodes (if the moves were the same).
+
+A file is laid out as:
+    header (16 bytes, little-endian):
+        magic        4s   b"TRAJ"
+        version      u16  VERSION
+        record_size  u16  RECORD.itemsize
+        (zero padding)
+    records (16 bytes each, little-endian), one for every transition:
+        reward      f8
+        state       u2  base-3 key of the state (see src.games.statekey)
+        next_state  u2  base-3 key of the state learned from
+        action      u1  cell index (3 * row + col)
+        player      u1  X or O of src.games.vectortictactoe
+        done        u1  1 if the game was over
+        (zero padding)
+
+States are stored by key, as they come, rather than by dense id, so recording
+doesn't look anything up.
+
+The number of records is given by the size of the file, and a record cut short
+(if writing was interrupted) is ignored.
+"""
+
+import struct
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Self
+
+import numpy as np
+
+from src.agents import QLearningAgent
+from src.games import stateindex, statekey
+from src.games.vectortictactoe import O, X
+from src.training.episode import Consumer, Transition
+from src.training.stats import TrainingStats
+
+MAGIC = b"TRAJ"
+VERSION = 1
+
+RECORD = np.dtype(
+    {
+        "names": ["reward", "state", "next_state", "action", "player", "done"],
+        "formats": ["<f8", "<u2", "<u2", "u1", "u1", "?"],
+        "offsets": [0, 8, 10, 12, 13, 14],
+        "itemsize": 16,
+    }
+)
+
+_HEADER = struct.Struct("<4sHH")
+HEADER_SIZE = 16
+
+_PLAYERS = {"X": X, "O": O}
+
+# Dense id of every state key, for update_many():
+_KEY_IDS = np.full(statekey.N_KEYS, -1, dtype=np.int32)
+_KEY_IDS[list(stateindex.KEYS)] = np.arange(stateindex.N_STATES, dtype=np.int32)
+
+
+class TrajectoryWriter(Consumer):
+    def __init__(self, fp: Path, chunk_size: int = 65_536) -> None:
+        """
+        fp (Path): File to write, replacing anything already there
+        chunk_size (int): Transitions held in memory between writes. Default
+        65,536 (1 MiB).
+        """
+        self.fp = Path(fp)
+        self.chunk_size = chunk_size
+        self.n_records = 0
+        self._pending: list[tuple[float, int, int, int, int, bool]] = []
+        self._file = self.fp.open("wb")
+        header = _HEADER.pack(MAGIC, VERSION, RECORD.itemsize)
+        self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+
+    def consume(self, transition: Transition) -> None:
+        """Hold the transition until the next write"""
+        self._pending.append(
+            (
+                transition.reward,
+                transition.state,
+                transition.next_state,
+                transition.action,
+                _PLAYERS[transition.player],
+                transition.done,
+            )
+        )
+
+    def end_episode(self, winner: None | str, alpha: float) -> None:
+        """Write the transitions held so far once there are enough of them, so
+        that episodes aren't split between writes"""
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write every transition held so far"""
+        if self._pending:
+            self._file.write(np.array(self._pending, dtype=RECORD).tobytes())
+            self.n_records += len(self._pending)
+            self._pending.clear()
+        self._file.flush()
+
+    def close(self) -> None:
+        """Write any transitions held and close the file"""
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read(fp: Path) -> np.ndarray:
+    """
+    Map the records of a trajectory file into memory, read-only, without
+    reading them.
+
+    Raise ValueError if the file is not a trajectory file.
+    """
+    fp = Path(fp)
+    with fp.open("rb") as f:
+        magic, version, record_size = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{fp} is not a trajectory file")
+    if version != VERSION or record_size != RECORD.itemsize:
+        raise ValueError(f"Unsupported trajectory file version: {version}")
+
+    n_records = (fp.stat().st_size - HEADER_SIZE) // RECORD.itemsize
+    if n_records == 0:
+        # An empty file can't be mapped:
+        return np.zeros(0, dtype=RECORD)
+    return np.memmap(fp, dtype=RECORD, mode="r", offset=HEADER_SIZE, shape=n_records)
+
+
+def train_offline(
+    fps: Sequence[Path],
+    player_x: QLearningAgent,
+    player_o: QLearningAgent,
+    chunk_size: int = 65_536,
+    batched: bool = False,
+    stats: None | TrainingStats = None,
+) -> int:
+    """
+    Train both players on the transitions recorded in trajectory files, in the
+    order they were written.
+
+    Arguments:
+    fps (Sequence[Path]): Files to learn from, one after the other
+    player_x, player_o (QLearningAgent): The players to train
+    chunk_size (int): Transitions read from the file at a time. Default 65,536.
+    batched (bool): Apply each chunk of a player's transitions with
+    update_many(), rather than calling update() on each of them. Both train the
+    players the same way (up to rounding), but as games bootstrap from states
+    updated in the games before them, update_many() has to split the chunk into
+    short runs, and is the slower of the two. Default False.
+    stats (TrainingStats): Where to count the episodes and moves replayed, and
+    the time spent, as updating
+
+    Returns:
+    The number of transitions learned from
+    """
+    stats = TrainingStats() if stats is None else stats
+    players = {X: player_x, O: player_o}
+    n_transitions = n_done = 0
+    for fp in fps:
+        records = read(fp)
+        for begin in range(0, len(records), chunk_size):
+            chunk = records[begin : begin + chunk_size]
+            with stats.timed("update"):
+                if batched:
+                    _update_many(players, chunk)
+                else:
+                    _update_each(players, chunk)
+            n_transitions += len(chunk)
+            n_done += int(np.count_nonzero(chunk["done"]))
+    # Every move is learned from once, and both players learn from the last
+    # state of each game:
+    stats.plies += n_transitions
+    stats.episodes += n_done // 2
+    return n_transitions
+
+
+def _update_many(players: dict[int, QLearningAgent], chunk: np.ndarray) -> None:
+    for code, player in players.items():
+        mine = chunk[chunk["player"] == code]
+        if len(mine):
+            player.update_many(
+                _KEY_IDS[mine["state"]],
+                mine["action"].astype(np.intp),
+                mine["reward"].astype(np.float64),
+                _KEY_IDS[mine["next_state"]],
+                mine["done"].astype(np.bool_),
+            )
+
+
+def _update_each(players: dict[int, QLearningAgent], chunk: np.ndarray) -> None:
+    for reward, state, next_state, action, code, done in chunk.tolist():
+        players[code].update(state, action, reward, next_state, done)
@@ -0,0 +1,109 @@
+"""
+Train both players without playing any episodes, by value iteration over the
+whole state graph (see src.games.stategraph).
+
+The Q-values follow the same rules as self-play training (play_episode): a
+player's move is scored on the state after their opponent's reply, with a
+reward of 1 for winning, -1 for losing, -0.2 for a draw and 0 while the game
+goes on, discounted by gamma. The opponent replies greedily, playing the best
+action by their own Q-values (ties going to the lowest action index), which is
+what self-play converges to as exploration decays to zero.
+
+Every sweep recomputes all of the Q-values at once from the previous sweep's.
+Values can only depend on states further into the game, so the values at the
+end of the game are exact after the first sweep, and the rest follow within a
+few more; the sweeps stop once nothing changes by more than the tolerance.
+
+Unlike the Q-table updates, the value of a state is the best of its valid
+actions only, rather than of all nine, so the Q-values are the exact fixed point
+of the rules and a reference for the episodic learner.
+"""
+
+import warnings
+
+import numpy as np
+
+from src.games import stategraph, stateindex
+from src.games.vectortictactoe import EMPTY, O, X
+from src.persistence import QTable
+
+# Rewards, as given by play_episode:
+WIN_REWARD = 1.0
+LOSS_REWARD = -1.0
+DRAW_REWARD = -0.2
+
+
+def value_iteration(
+    gamma: float = 0.9, tolerance: float = 1e-12, max_sweeps: int = 100
+) -> tuple[np.ndarray, int]:
+    """
+    Compute the Q-values of both players, for the player whose turn it is in
+    each state.
+
+    Arguments:
+    gamma (float): Discount factor for future rewards. Default 0.9.
+    tolerance (float): Stop once no value changes by more than this in a sweep.
+    Default 1e-12.
+    max_sweeps (int): Stop after this many sweeps even if the values are still
+    changing, with a RuntimeWarning. Default 100.
+
+    Returns:
+    An (N_STATES, 9) array of Q-values indexed by state id, with 0.0 for actions
+    that can't be played, and the number of sweeps it took.
+    """
+    graph = stategraph.build()
+    legal = graph.legal
+    # Successors of invalid actions are pointed at state 0 and masked out:
+    after_move = np.where(legal, graph.next_ids, 0)
+    # Reward for a move that ends the game (the mover can't lose on their turn):
+    ends_game = legal & graph.terminal[after_move]
+    final_rewards = np.where(graph.winner[after_move] == EMPTY, DRAW_REWARD, WIN_REWARD)
+
+    q = np.zeros((stateindex.N_STATES, 9), dtype=np.float64)
+    sweep = 0
+    for sweep in range(1, max_sweeps + 1):
+        # The opponent's greedy reply in the state after each move:
+        scores = np.where(legal, q, -np.inf)
+        replies = np.argmax(scores, axis=1)
+        after_reply = np.where(
+            legal[after_move, replies[after_move]],
+            graph.next_ids[after_move, replies[after_move]],
+            0,
+        )
+        reply_rewards = np.where(
+            graph.winner[after_reply] == EMPTY, DRAW_REWARD, LOSS_REWARD
+        )
+        best = np.where(legal.any(axis=1), scores.max(axis=1), 0.0)
+        q_next = np.where(
+            graph.terminal[after_reply],
+            reply_rewards,
+            gamma * best[after_reply],
+        )
+        q_next = np.where(ends_game, final_rewards, q_next)
+        q_next = np.where(legal, q_next, 0.0)
+
+        change = np.abs(q_next - q).max()
+        q = q_next
+        if change <= tolerance:
+            break
+    else:
+        warnings.warn(
+            f"Value iteration didn't converge in {max_sweeps} sweeps: values "
+            f"still changed by up to {change:.3g}",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+    return q, sweep
+
+
+def to_qtable(q: np.ndarray, marker: str) -> QTable:
+    """Put the Q-values of every state where it is marker's turn (and the game
+    isn't over) in a QTable, as saved by a player trained on episodes"""
+    if marker not in ["X", "O"]:
+        raise ValueError(f"Unrecognised marker: {marker}")
+    graph = stategraph.build()
+    player = X if marker == "X" else O
+    qtable = QTable()
+    for idx in np.flatnonzero((graph.to_move == player) & ~graph.terminal).tolist():
+        qtable.table[stateindex.KEYS[idx]] = q[idx].tolist()
+    return qtable
@@ -0,0 +1,109 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.games import stateindex
+from src.persistence import ArrayQTable, QTable, SymmetricQTable, binaryformat
+
+
+@pytest.fixture
+def qtable() -> ArrayQTable:
+    qtable = ArrayQTable()
+    qtable.update(state="---------", action="11", value=0.5)
+    qtable.update(state="X---O----", action="22", value=-0.25)
+    return qtable
+
+
+def test_layout(qtable: ArrayQTable, tmp_path: Path) -> None:
+    """Test that the sections of a file are where the header says they are"""
+    path = tmp_path / "qtable.qtab"
+    qtable.save(path)
+
+    data = path.read_bytes()
+    assert data[:4] == b"QTAB"
+    # A row of values for each of the two visited states only:
+    assert len(data) == binaryformat.HEADER_SIZE + stateindex.N_STATES * 4 + 2 * 9 * 8
+
+    qfile = binaryformat.read(path)
+    assert not qfile.symmetric
+    assert qfile.values.dtype == np.float64
+    assert qfile.state_rows[stateindex.state_id("X---O----")] >= 0
+    assert (qfile.state_rows >= 0).sum() == 2
+
+
+def test_array_load_maps_file(qtable: ArrayQTable, tmp_path: Path) -> None:
+    """Test that an ArrayQTable maps a file with a row for every state, and
+    that updating the loaded table doesn't change the file"""
+    path = tmp_path / "qtable.qtab"
+    state_rows = np.where(qtable.visited, np.arange(stateindex.N_STATES), -1)
+    binaryformat.write(path, state_rows, qtable.values)
+    data = path.read_bytes()
+
+    loaded = ArrayQTable()
+    loaded.load(path)
+    assert isinstance(loaded.values, np.memmap)
+    assert loaded.get_value("X---O----", "22") == -0.25
+
+    loaded.update(state="X---O----", action="22", value=1.0)
+    assert loaded.get_value("X---O----", "22") == 1.0
+    assert path.read_bytes() == data
+
+
+def test_load_compact_file(tmp_path: Path) -> None:
+    """Test that files holding only some of the states, in any order and with
+    any float type, can be loaded"""
+    path = tmp_path / "compact.qtab"
+    state_rows = np.full(stateindex.N_STATES, -1, dtype=np.int32)
+    state_rows[stateindex.state_id("----X----")] = 1
+    state_rows[stateindex.state_id("---------")] = 0
+    values = np.arange(18, dtype=np.float32).reshape(2, 9)
+    binaryformat.write(path, state_rows, values)
+
+    for loaded in [QTable(), ArrayQTable()]:
+        loaded.load(path)
+        assert loaded.get_value("---------", "01") == 1.0
+        assert loaded.get_value("----X----", "22") == 17.0
+        assert loaded.get_value("X---O----", "22") == 0.0
+    assert isinstance(loaded, ArrayQTable)
+    assert list(loaded.visited.nonzero()[0]) == [0, stateindex.state_id("----X----")]
+
+
+def test_symmetric_flag(tmp_path: Path) -> None:
+    """Test that symmetric tables are flagged as such, and that agents refuse to
+    load a file saved with the other setting"""
+    path = tmp_path / "qtable.qtab"
+    symmetric_agent = QLearningAgent(symmetric=True)
+    symmetric_agent.update(
+        start_state="X---O----", action=(2, 2), reward=1, new_state="X-O-O---X"
+    )
+    symmetric_agent.save(path)
+    assert binaryformat.read(path).symmetric
+    with pytest.raises(ValueError):
+        QLearningAgent().load(path)
+
+    loaded = QLearningAgent(symmetric=True)
+    loaded.load(path)
+    assert loaded.select_action("--X-O----", [(0, 0), (2, 0), (2, 2)]) == (2, 0)
+
+    QLearningAgent().save(path)
+    with pytest.raises(ValueError):
+        QLearningAgent(qtable=SymmetricQTable(ArrayQTable())).load(path)
+
+
+def test_bad_files(qtable: ArrayQTable, tmp_path: Path) -> None:
+    """Test that files which aren't Q-tables, or are for a different version or
+    set of states, are rejected"""
+    path = tmp_path / "qtable.qtab"
+    path.write_bytes(b"state,00,01,02,10,11,12,20,21,22\n".ljust(64))
+    with pytest.raises(ValueError, match="not a Q-table"):
+        binaryformat.read(path)
+
+    for offset, value in [(4, b"\x02\x00"), (8, b"\x01\x00\x00\x00")]:
+        qtable.save(path)
+        data = bytearray(path.read_bytes())
+        data[offset : offset + len(value)] = value
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError):
+            binaryformat.read(path)
@@ -0,0 +1,76 @@
+import pytest
+
+from src.games import bitboard
+
+
+def test_lines_through() -> None:
+    """Test that each cell knows which lines pass through it"""
+    assert bitboard.LINES_THROUGH[0] == (0, 3, 6)  # top row, left col, diagonal
+    assert bitboard.LINES_THROUGH[1] == (0, 4)  # top row, middle col
+    assert bitboard.LINES_THROUGH[4] == (1, 4, 6, 7)  # centre is on 4 lines
+    assert sum(len(lines) for lines in bitboard.LINES_THROUGH) == 24
+
+
+def test_empty_cells() -> None:
+    """Test that the empty cells are looked up from an occupancy mask"""
+    assert bitboard.EMPTY_CELLS[0] == tuple(
+        (row, col) for row in range(3) for col in range(3)
+    )
+    assert bitboard.EMPTY_CELLS[0b100_010_101] == (
+        (0, 1),
+        (1, 0),
+        (1, 2),
+        (2, 0),
+        (2, 1),
+    )
+    assert bitboard.EMPTY_CELLS[bitboard.FULL_BOARD] == ()
+
+
+@pytest.mark.parametrize(
+    "bits,expected",
+    [
+        (0b000_111_000, True),  # middle row
+        (0b010_010_010, True),  # middle column
+        (0b001_010_100, True),  # diagonal
+        (0b011_101_110, False),
+        (0, False),
+    ],
+)
+def test_has_won(bits, expected) -> None:
+    """Test that a completed line is recognised as a win"""
+    assert bitboard.has_won(bits) == expected
+
+
+def test_as_str() -> None:
+    """Test that bitboards are converted to the same string as Board.as_str()"""
+    assert bitboard.as_str(0b100_000_010, 0b000_100_000) == "-X---O--X"
+
+
+def test_evaluate_winner() -> None:
+    """Test that a win on one of the checked lines is reported"""
+    # O has the right column, X has two in the top row:
+    x_bits, o_bits = 0b000_000_011, 0b100_100_100
+    assert bitboard.evaluate(x_bits, o_bits, (0, 5), bitboard.ALL_LINES) == (
+        True,
+        "O",
+        bitboard.ALL_LINES & ~1,  # top row was struck off before the win was found
+    )
+
+
+def test_evaluate_only_checks_given_lines() -> None:
+    """Test that lines which weren't asked for are not checked"""
+    x_bits = 0b000_000_111  # X has won on the top row...
+    assert bitboard.evaluate(x_bits, 0, (1, 2), bitboard.ALL_LINES) == (
+        False,  # ...but only the middle and bottom rows were checked
+        None,
+        bitboard.ALL_LINES,
+    )
+
+
+def test_evaluate_draw() -> None:
+    """Test that the game is complete once the last open line is blocked"""
+    # X|O|X
+    # O|X|O
+    # O|X|O  <- all lines blocked
+    x_bits, o_bits = 0b010_101_101, 0b101_010_010
+    assert bitboard.evaluate(x_bits, o_bits, (2, 4), 0b10100) == (True, None, 0)
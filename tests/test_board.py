@@ -5,6 +5,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 import pytest
 
+from src.games import statekey
 from src.games.tictactoe import Board
 
 
@@ -61,3 +62,26 @@ def test_str(board: Board) -> None:
     board.cells[4].marker = "X"
     board.cells[8].marker = "O"
     assert str(board) == ("X| |O\n-----\n |X| \n-----\n | |O")
+
+
+def test_bitboards_follow_cells(board: Board) -> None:
+    """Test that the bitboards are kept in step with the cell markers"""
+    board.cells[0].marker = "X"
+    board.get_cell(1, 1).set("O")
+    assert (board.x_bits, board.o_bits) == (0b000_000_001, 0b000_010_000)
+
+    board.cells[0].marker = "O"  # <- Overwrite an X
+    board.cells[4].marker = None  # <- Clear an O
+    assert (board.x_bits, board.o_bits) == (0, 0b000_000_001)
+    assert board.as_str() == "O--------"
+
+
+def test_key_follows_cells(board: Board) -> None:
+    """Test that the base-3 key is kept in step with the cell markers"""
+    board.cells[0].marker = "X"
+    board.get_cell(1, 1).set("O")
+    assert board.as_key() == 1 + 2 * 3**4
+
+    board.cells[0].marker = "O"  # <- Overwrite an X
+    board.cells[4].marker = None  # <- Clear an O
+    assert board.as_key() == statekey.from_str("O--------") == 2
@@ -0,0 +1,99 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.persistence import ArrayQTable
+from src.training import play_episode
+from src.training.consumers import (
+    BatchedLearner,
+    Evaluator,
+    MetricsRecorder,
+    TrajectoryRecorder,
+)
+from src.training.convergence import evaluate
+from src.training.metrics import MetricsWriter, TrainingMetrics
+
+
+def test_batched_learner_matches_learner() -> None:
+    """Test that learning from the transitions in batches trains the players the
+    same as learning from each one as it comes, when the moves don't depend on
+    what the players have learned"""
+    random.seed(1)
+    player_x = QLearningAgent(qtable=ArrayQTable())
+    player_o = QLearningAgent(qtable=ArrayQTable())
+    for _ in range(30):
+        play_episode(1.0, player_x, player_o)
+
+    random.seed(1)
+    batched_x = QLearningAgent(qtable=ArrayQTable())
+    batched_o = QLearningAgent(qtable=ArrayQTable())
+    learner = BatchedLearner(batched_x, batched_o, every=7)
+    for episode_idx in range(30):
+        play_episode(1.0, batched_x, batched_o, consumers=[learner])
+        if episode_idx == 5:
+            assert batched_x.qtable.n_states() == 0  # <- not yet
+    learner.flush()
+
+    assert isinstance(batched_x.qtable, ArrayQTable)
+    assert isinstance(batched_o.qtable, ArrayQTable)
+    assert isinstance(player_x.qtable, ArrayQTable)
+    assert isinstance(player_o.qtable, ArrayQTable)
+    np.testing.assert_allclose(batched_x.qtable.values, player_x.qtable.values)
+    np.testing.assert_allclose(batched_o.qtable.values, player_o.qtable.values)
+
+
+def test_batched_learner_bad_every() -> None:
+    with pytest.raises(ValueError):
+        BatchedLearner(QLearningAgent(), QLearningAgent(), every=0)
+
+
+def test_metrics_recorder(tmp_path: Path) -> None:
+    """Test that the result and exploration rate of every game is recorded"""
+    player_x, player_o = QLearningAgent(), QLearningAgent()
+    with MetricsWriter(tmp_path / "metrics.jsonl") as writer:
+        metrics = TrainingMetrics(writer, player_x, player_o, every=1000)
+        recorder = MetricsRecorder(metrics)
+        random.seed(0)
+        winners = [
+            play_episode(0.5, player_x, player_o, consumers=[recorder])
+            for _ in range(40)
+        ]
+    assert metrics.episodes == 40
+    assert metrics.epsilon == 0.5
+    assert metrics.results == {
+        marker: winners.count(marker) for marker in ["X", "O", None]
+    }
+
+
+def test_trajectory_recorder() -> None:
+    """Test that the transitions of each episode are kept apart, up to the
+    limit"""
+    recorder = TrajectoryRecorder(limit=3)
+    random.seed(0)
+    winners = [
+        play_episode(1.0, QLearningAgent(), QLearningAgent(), consumers=[recorder])
+        for _ in range(5)
+    ]
+    assert recorder.winners == winners[-3:]
+    assert len(recorder.trajectories) == 3
+    for trajectory in recorder.trajectories:
+        # Every move is learned from once, the game ending on the last two:
+        assert [t.done for t in trajectory[-2:]] == [True, True]
+        assert not any(t.done for t in trajectory[:-2])
+        assert 5 <= len(trajectory) <= 9
+
+
+def test_evaluator() -> None:
+    """Test that the players are scored every few episodes, as evaluate() would
+    score them"""
+    player_x, player_o = QLearningAgent(), QLearningAgent()
+    evaluator = Evaluator(player_x, player_o, every=4, n_games=10, seed=2)
+    random.seed(0)
+    for _ in range(10):
+        play_episode(1.0, player_x, player_o, consumers=[evaluator])
+    assert [score.episode for score in evaluator.scores] == [4, 8]
+    assert evaluator.scores[-1].x == evaluate(player_x, "X", 10, seed=2)
+    assert evaluator.scores[-1].o == evaluate(player_o, "O", 10, seed=2)
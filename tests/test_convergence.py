@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from src.agents import PolicyAgent, QLearningAgent
+from src.training import play_episode
+from src.training.convergence import (
+    AdaptiveExploration,
+    ConvergenceMonitor,
+    evaluate,
+)
+
+
+def test_evaluate() -> None:
+    """Test that the score is the fraction of games not lost, and that the
+    opponent plays the same moves for the same seed"""
+    agent = PolicyAgent()  # <- plays the first empty cell
+    score = evaluate(agent, "X", 200, seed=1)
+    assert 0.0 < score < 1.0
+    assert evaluate(agent, "X", 200, seed=1) == score
+    assert evaluate(agent, "O", 0) == 1.0
+
+
+def test_monitor_q_delta() -> None:
+    """Test that each check measures the mean change since the last one"""
+    player_x, player_o = QLearningAgent(alpha=0.5), QLearningAgent(alpha=0.5)
+    monitor = ConvergenceMonitor(player_x, player_o, tolerance=0.01, patience=2)
+
+    player_x.update("---------", (0, 0), 1.0, "X--------", done=True)  # 0 -> 0.5
+    player_o.update("X--------", (1, 1), 0.4, "X---O----", done=True)  # 0 -> 0.2
+    assert not monitor.check(1)
+    player_o.update("X--------", (1, 1), 0.2, "X---O----", done=True)  # -> 0.2
+    assert not monitor.check(2)
+    assert not monitor.check(3)
+
+    assert [check.q_delta for check in monitor.history] == [0.5, 0.0, 0.0]
+    assert monitor.stale == 1
+
+
+def test_monitor_plateau() -> None:
+    """Test that training has converged after patience checks without
+    progress"""
+    monitor = ConvergenceMonitor(QLearningAgent(), QLearningAgent(), patience=3)
+    for q_delta, converged in [
+        (0.05, False),
+        (0.03, False),
+        (0.0295, False),  # <- not enough progress
+        (0.031, False),
+        (0.04, True),
+    ]:
+        monitor.players[0].changes.add(q_delta)
+        assert monitor.check(0) == converged
+
+
+def test_monitor_evaluation() -> None:
+    """Test that an improving score counts as progress"""
+    random.seed(0)
+    player_x, player_o = QLearningAgent(), QLearningAgent()
+    monitor = ConvergenceMonitor(
+        player_x, player_o, patience=1, eval_games=50, eval_tolerance=0.0
+    )
+    assert not monitor.check(0)
+    first = monitor.history[0].score
+    assert first is not None
+    for _ in range(2000):
+        play_episode(0.5, player_x, player_o)
+    monitor.check(2000)
+    last = monitor.history[-1].score
+    assert last is not None
+    assert last > first
+
+
+def test_adaptive_exploration() -> None:
+    """Test that exploration is only cut while the Q-delta isn't growing"""
+    exploration = AdaptiveExploration(start=1.0, decay=0.5, minimum=0.2)
+    exploration.update(0.1)
+    assert exploration.epsilon == 0.5
+    exploration.update(0.2)
+    assert exploration.epsilon == 0.5
+    exploration.update(0.1)
+    assert exploration.epsilon == 0.25
+    assert not exploration.settled
+    exploration.update(0.1)
+    assert exploration.epsilon == pytest.approx(0.2)
+    assert exploration.settled
@@ -0,0 +1,228 @@
+import json
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.agents import Agent, QLearningAgent
+from src.games import stateindex, statekey
+from src.persistence import QTable
+from src.training import TrainingStats, play_episode
+from src.training.episode import BACKENDS, Consumer, Learner, episode_transitions
+
+
+class ScriptedAgent(Agent):
+    """Plays a fixed sequence of moves and records the updates it receives"""
+
+    def __init__(self, moves: list[tuple[int, int]]) -> None:
+        self.moves = list(moves)
+        self.updates: list[tuple] = []
+
+    def select_action(self, state, valid_moves):
+        move = self.moves.pop(0)
+        assert move in valid_moves
+        return move
+
+    def update(self, start_state, action, reward, new_state, done=False):
+        # Episodes pass states by key and actions by index, recorded here in
+        # their readable forms:
+        assert isinstance(start_state, int) and isinstance(new_state, int)
+        assert isinstance(action, int)
+        self.updates.append(
+            (
+                statekey.to_str(start_state),
+                divmod(action, 3),
+                reward,
+                statekey.to_str(new_state),
+                done,
+            )
+        )
+
+    def save(self, fp: Path):
+        fp.write_text(json.dumps(self.moves))
+
+    def load(self, fp: Path):
+        self.moves = [tuple(move) for move in json.loads(fp.read_text())]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_play_episode_x_wins(backend: str) -> None:
+    """Test that each player is trained on the state after their opponent's
+    reply, and on the final state when the game ends"""
+    player_x = ScriptedAgent([(0, 0), (0, 1), (0, 2)])
+    player_o = ScriptedAgent([(1, 1), (2, 2)])
+
+    winner = play_episode(0.0, player_x=player_x, player_o=player_o, backend=backend)
+
+    assert winner == "X"
+    assert player_x.updates == [
+        ("---------", (0, 0), 0, "X---O----", False),
+        ("X---O----", (0, 1), 0, "XX--O---O", False),
+        ("XX--O---O", (0, 2), 1, "XXX-O---O", True),
+    ]
+    assert player_o.updates == [
+        ("X--------", (1, 1), 0, "XX--O----", False),
+        ("XX--O----", (2, 2), -1, "XXX-O---O", True),
+    ]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_play_episode_draw(backend: str) -> None:
+    """Test that both players are mildly punished for a draw"""
+    # X|O|X
+    # X|O|O
+    # O|X|      <- nobody can win after O's last move
+    player_x = ScriptedAgent([(0, 0), (0, 2), (1, 0), (2, 1)])
+    player_o = ScriptedAgent([(0, 1), (1, 1), (1, 2), (2, 0)])
+
+    assert play_episode(0.0, player_x, player_o, backend=backend) is None
+    assert player_o.updates[-1] == ("XOXXOO-X-", (2, 0), -0.2, "XOXXOOOX-", True)
+    assert player_x.updates[-1] == ("XOXXOO---", (2, 1), -0.2, "XOXXOOOX-", True)
+
+
+def test_default_batch_methods() -> None:
+    """Test that an agent without batched methods of its own plays and learns a
+    batch one state at a time"""
+    agent = ScriptedAgent([(1, 1), (0, 2)])
+    states = np.array(
+        [stateindex.state_id("X--------"), stateindex.state_id("---------")]
+    )
+    valid_mask = np.ones((2, 9), dtype=np.bool_)
+    valid_mask[0, 0] = False
+    assert agent.select_actions(states, valid_mask).tolist() == [4, 2]
+
+    agent.update_many(
+        start_states=states,
+        actions=np.array([4, 2]),
+        rewards=np.array([0.0, 1.0]),
+        new_states=np.array([stateindex.state_id("X---O-X--")] * 2),
+        dones=np.array([False, True]),
+    )
+    assert agent.updates == [
+        ("X--------", (1, 1), 0.0, "X---O-X--", False),
+        ("---------", (0, 2), 1.0, "X---O-X--", True),
+    ]
+
+
+def test_play_episode_explore() -> None:
+    """Test that random moves are played when alpha is 1"""
+    random.seed(0)
+    player_x = QLearningAgent()
+    player_o = QLearningAgent()
+    winners = [play_episode(1.0, player_x, player_o) for _ in range(200)]
+    assert set(winners) == {"X", "O", None}
+    assert player_x.qtable.n_states() > 100
+    assert player_o.qtable.n_states() > 100
+
+
+def test_play_episode_backends_match() -> None:
+    """Test that players are trained the same way on every backend"""
+    trained = []
+    for backend in BACKENDS:
+        random.seed(0)
+        player_x = QLearningAgent()
+        player_o = QLearningAgent()
+        winners = [
+            play_episode(1.0 - i / 300, player_x, player_o, backend=backend)
+            for i in range(300)
+        ]
+        assert isinstance(player_x.qtable, QTable)
+        assert isinstance(player_o.qtable, QTable)
+        trained.append((winners, player_x.qtable.table, player_o.qtable.table))
+    assert all(result == trained[0] for result in trained[1:])
+
+
+def test_play_episode_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        play_episode(0.0, QLearningAgent(), QLearningAgent(), backend="rust")
+
+
+def test_play_episode_stats() -> None:
+    """Test that the episode, its moves and the time spent in each phase are
+    counted"""
+    stats = TrainingStats()
+    player_x = ScriptedAgent([(0, 0), (0, 1), (0, 2)])
+    player_o = ScriptedAgent([(1, 1), (2, 2)])
+
+    play_episode(0.0, player_x=player_x, player_o=player_o, stats=stats)
+
+    assert stats.episodes == 1
+    assert stats.plies == 5
+    assert all(stats.seconds[phase] > 0 for phase in ["select", "step", "update"])
+    assert stats.seconds["save"] == 0.0
+
+
+def test_episode_transitions() -> None:
+    """Test that transitions come in the order the players are trained on them,
+    without training anyone, and that the winner is returned at the end"""
+    player_x = ScriptedAgent([(0, 0), (0, 1), (0, 2)])
+    player_o = ScriptedAgent([(1, 1), (2, 2)])
+    transitions = episode_transitions(0.0, player_x, player_o)
+
+    received = []
+    with pytest.raises(StopIteration) as stop:
+        while True:
+            received.append(next(transitions))
+    assert stop.value.value == "X"
+    assert player_x.updates == player_o.updates == []
+    assert [(t.player, t.action, t.reward, t.done) for t in received] == [
+        ("X", 0, 0, False),
+        ("O", 4, 0, False),
+        ("X", 1, 0, False),
+        ("X", 2, 1, True),
+        ("O", 8, -1, True),
+    ]
+    assert statekey.to_str(received[-1].next_state) == "XXX-O---O"
+
+
+class Collector(Consumer):
+    def __init__(self) -> None:
+        self.transitions: list = []
+        self.winners: list = []
+
+    def consume(self, transition):
+        self.transitions.append(transition)
+
+    def end_episode(self, winner, alpha):
+        self.winners.append((winner, alpha))
+
+
+def test_play_episode_consumers() -> None:
+    """Test that every consumer gets every transition, and the end of the
+    episode, and that players are only trained by a Learner"""
+    player_x = ScriptedAgent([(0, 0), (0, 1), (0, 2)])
+    player_o = ScriptedAgent([(1, 1), (2, 2)])
+    first, second = Collector(), Collector()
+
+    play_episode(0.0, player_x, player_o, consumers=[first, second])
+
+    assert len(first.transitions) == 5
+    assert first.transitions == second.transitions
+    assert first.winners == second.winners == [("X", 0.0)]
+    assert player_x.updates == player_o.updates == []
+
+
+def test_learners_share_transitions() -> None:
+    """Test that two pairs of players learning from the same episodes are
+    trained as if each pair had played them"""
+    random.seed(0)
+    player_x, player_o = QLearningAgent(), QLearningAgent()
+    for _ in range(50):
+        play_episode(1.0, player_x, player_o)
+
+    random.seed(0)
+    shared_x, shared_o = QLearningAgent(), QLearningAgent()
+    other_x, other_o = QLearningAgent(), QLearningAgent()
+    learners = [Learner(shared_x, shared_o), Learner(other_x, other_o)]
+    for _ in range(50):
+        play_episode(1.0, shared_x, shared_o, consumers=learners)
+
+    assert isinstance(player_x.qtable, QTable)
+    assert isinstance(player_o.qtable, QTable)
+    for player in (shared_x, other_x):
+        assert isinstance(player.qtable, QTable)
+        assert player.qtable.table == player_x.qtable.table
+    for player in (shared_o, other_o):
+        assert isinstance(player.qtable, QTable)
+        assert player.qtable.table == player_o.qtable.table
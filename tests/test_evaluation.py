@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from src.agents import PolicyAgent, QLearningAgent
+from src.games import stateindex
+from src.games.solver import INVALID, solve
+from src.training.evaluation import evaluate_agent, evaluate_policy, losing_fraction
+
+
+def optimal_policy() -> np.ndarray:
+    """The first of the best actions in every state"""
+    _, action_values = solve()
+    policy = np.argmax(action_values, axis=1).astype(np.uint8)
+    policy[(action_values == INVALID).all(axis=1)] = 255
+    return policy
+
+
+@pytest.mark.parametrize("marker", ["X", "O"])
+def test_optimal_policy(marker: str) -> None:
+    """Test that perfect play can't be exploited"""
+    result = evaluate_policy(optimal_policy(), marker)
+    assert result.exploitability == 0
+    assert result.optimal_fraction == 1.0
+    assert result.losing_states == []
+    assert 0 < result.n_positions < stateindex.N_STATES
+
+
+def test_first_empty_cell() -> None:
+    """Test that always playing the first empty cell as O can be beaten"""
+    result = evaluate_agent(PolicyAgent(), "O")
+    assert result.exploitability == 1
+    assert result.optimal_fraction < 1.0
+    # X opens in the centre, O plays the corner, then X takes the opposite
+    # corner and O fills in the top row, letting X fork:
+    assert "O---X---X" in result.losing_states
+
+
+def test_faced_positions() -> None:
+    """Test that X faces every position its policy leads to, against every
+    reply"""
+    result = evaluate_policy(optimal_policy(), "X")
+    # The empty board, then one position for each of O's 8 replies:
+    first_two_moves = 1 + 8
+    assert result.n_positions > first_two_moves
+
+
+@pytest.mark.parametrize("marker", ["X", "O"])
+def test_losing_fraction(marker: str) -> None:
+    """Test that perfect play never loses to a random opponent, and the
+    first-empty-cell policy sometimes does"""
+    assert losing_fraction(PolicyAgent(optimal_policy()), marker) == 0.0
+    assert 0.0 < losing_fraction(PolicyAgent(), marker) < 1.0
+
+
+def test_evaluate_agent_qtable() -> None:
+    """Test that an untrained agent plays like the first-empty-cell policy"""
+    untrained = evaluate_agent(QLearningAgent(), "X")
+    assert untrained == evaluate_agent(PolicyAgent(), "X")
+
+
+def test_evaluate_errors() -> None:
+    with pytest.raises(ValueError):
+        evaluate_policy(optimal_policy(), "Z")
+    policy = optimal_policy()
+    policy[0] = 8
+    policy[stateindex.state_id("O-------X")] = 8  # <- occupied
+    with pytest.raises(ValueError):
+        evaluate_policy(policy, "X")
+    with pytest.raises(TypeError):
+        evaluate_agent(object(), "X")  # type: ignore[arg-type]
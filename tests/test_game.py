@@ -1,11 +1,12 @@
 import os
 import sys
+import tracemalloc
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import pytest
 
-from src.games.tictactoe import IllegalMoveError, TicTacToe
+from src.games.tictactoe import IllegalMoveError, TicTacToe, count_positions
 
 
 @pytest.fixture
@@ -206,3 +207,149 @@ def test_game_over_cached(game: TicTacToe) -> None:
 
     assert game.is_over()
     assert game.winner == "X"
+
+
+@pytest.mark.parametrize(
+    "moves,winner",
+    [
+        ([(1, 1), (0, 0), (0, 2), (2, 0), (1, 0), (2, 2), (1, 2)], "X"),  # middle row
+        ([(0, 0), (1, 1), (0, 1), (0, 2), (2, 2), (2, 0)], "O"),  # diagonal
+    ],
+)
+def test_play_move_detects_winner(game: TicTacToe, moves, winner) -> None:
+    """Check that the winner is picked up as soon as the winning move is played"""
+    marker = "X"
+    for i, (row, col) in enumerate(moves):
+        assert not game.is_over(), f"Game over early, after {i} moves"
+        game.play_move(marker, row, col)
+        marker = "O" if marker == "X" else "X"
+
+    assert game.complete
+    assert game.is_over()
+    assert game.winner == winner
+
+
+def test_play_move_detects_early_draw(game: TicTacToe) -> None:
+    """Check that the game ends as soon as nobody can win, even if there are
+    still empty cells"""
+    # X|O|X
+    # X|O|O
+    # O|X|
+    moves = [(0, 0), (0, 1), (0, 2), (1, 1), (1, 0), (1, 2), (2, 1), (2, 0)]
+    marker = "X"
+    for row, col in moves:
+        game.play_move(marker, row, col)
+        marker = "O" if marker == "X" else "X"
+
+    assert game.get_all_valid_moves() == [(2, 2)]
+    assert game.is_over()
+    assert game.winner is None
+
+
+def test_game_over_after_board_edited(game: TicTacToe) -> None:
+    """Check that editing the board directly after moves have been played is
+    still picked up by game.is_over()"""
+    game.play_move("X", 0, 0)
+    game.play_move("O", 1, 1)
+    assert not game.is_over()
+
+    game.board.cells[1].marker = "X"
+    game.board.cells[2].marker = "X"
+
+    assert game.is_over()
+    assert game.winner == "X"
+
+
+def test_undo_move(game: TicTacToe) -> None:
+    """Check that undoing moves restores the board and the result, including
+    after a winning move"""
+    for marker, row, col in [("X", 0, 0), ("O", 1, 0), ("X", 0, 1), ("O", 1, 1)]:
+        game.play_move(marker, row, col)
+    before = game.board.as_str()
+    game.play_move("X", 0, 2)
+    assert game.is_over() and game.winner == "X"
+
+    game.undo_move()
+    assert game.board.as_str() == before
+    assert not game.is_over()
+    assert game.winner is None
+    assert game.n_moves == 4
+
+    # The game plays on the same as before the undo:
+    game.play_move("X", 2, 2)
+    game.play_move("O", 1, 2)
+    assert game.is_over() and game.winner == "O"
+
+    for _ in range(game.n_moves):
+        game.undo_move()
+    assert game.board.as_str() == "---------"
+    with pytest.raises(IllegalMoveError):
+        game.undo_move()
+
+
+def test_undo_move_after_board_edited(game: TicTacToe) -> None:
+    """Check that moves played before the board was edited directly can't be
+    undone"""
+    game.play_move("X", 0, 0)
+    game.board.cells[4].marker = "O"
+    assert game.n_moves == 0
+    with pytest.raises(IllegalMoveError):
+        game.undo_move()
+
+
+def test_reset(game: TicTacToe) -> None:
+    """Check that reset clears the board and the result"""
+    for marker, row, col in [("X", 0, 0), ("O", 1, 0), ("X", 0, 1), ("O", 1, 1)]:
+        game.play_move(marker, row, col)
+    game.play_move("X", 0, 2)
+
+    game.reset()
+    assert game.board.as_str() == "---------"
+    assert not game.is_over()
+    assert game.winner is None
+    assert game.n_moves == 0
+    assert len(game.get_all_valid_moves()) == 9
+
+
+def test_copy(game: TicTacToe) -> None:
+    """Check that a copy plays on independently of the original"""
+    game.play_move("X", 0, 0)
+    game.play_move("O", 1, 1)
+    copied = game.copy()
+    assert copied.board.as_str() == game.board.as_str()
+    assert copied.n_moves == 2
+
+    copied.play_move("X", 2, 2)
+    copied.undo_move()
+    copied.undo_move()
+    assert copied.board.as_str() == "X--------"
+    assert game.board.as_str() == "X---O----"
+    assert game.n_moves == 2
+
+
+def _traced_search(game: TicTacToe, marker: str) -> tuple[int, int, int]:
+    """Count the positions below game, and return the count with the memory
+    still in use afterwards and the peak in use during the search, in bytes"""
+    count_positions(game, marker)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    nodes = count_positions(game, marker)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return nodes, after - before, peak - before
+
+
+def test_search_does_not_allocate(game: TicTacToe) -> None:
+    """Check that playing and undoing moves over a game tree leaves no memory
+    behind, and that the peak doesn't grow with the number of positions"""
+    game.play_move("X", 1, 1)
+    small_game = game.copy()
+    small_game.play_move("O", 0, 0)
+    small_game.play_move("X", 0, 1)
+
+    nodes, retained, peak = _traced_search(game, "O")
+    small_nodes, _, small_peak = _traced_search(small_game, "O")
+    assert nodes > 50 * small_nodes > 1000
+    assert retained < 1000
+    # Only the frames of the deeper search add to the peak:
+    assert peak < small_peak + 1000
@@ -0,0 +1,100 @@
+import json
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.games.vectortictactoe import EMPTY, O, X
+from src.persistence import QTable
+from src.training import play_episode
+from src.training.metrics import MetricsWriter, TrainingMetrics, metrics_stream
+
+
+def read_records(fp: Path) -> list[dict]:
+    return [json.loads(line) for line in fp.read_text().splitlines()]
+
+
+def test_metrics_stream(tmp_path: Path) -> None:
+    """Test that a record is written every few episodes, and for the leftover
+    episodes at the end"""
+    random.seed(0)
+    fp = tmp_path / "metrics.jsonl"
+    player_x, player_o = QLearningAgent(), QLearningAgent()
+
+    with metrics_stream(fp, player_x, player_o, every=40) as metrics:
+        assert metrics is not None
+        for _ in range(100):
+            metrics.record(play_episode(1.0, player_x, player_o), 1.0)
+
+    records = read_records(fp)
+    assert [r["episode"] for r in records] == [40, 80, 100]
+    for r in records:
+        assert r["epsilon"] == 1.0
+        assert r["x"]["win"] == r["o"]["loss"]
+        assert r["x"]["draw"] == r["o"]["draw"]
+        for side in ["x", "o"]:
+            assert sum(r[side][k] for k in ["win", "draw", "loss"]) == 1.0
+            assert 0 < r[side]["mean_q_change"] <= r[side]["max_q_change"]
+    assert isinstance(player_x.qtable, QTable)
+    assert isinstance(player_o.qtable, QTable)
+    assert sum(r["x"]["new_states"] for r in records) == len(player_x.qtable.table)
+    assert records[-1]["o"]["states"] == len(player_o.qtable.table)
+
+
+def test_metrics_stream_off() -> None:
+    """Test that nothing is recorded without a file"""
+    with metrics_stream(None, QLearningAgent(), QLearningAgent()) as metrics:
+        assert metrics is None
+
+
+def test_record_many(tmp_path: Path) -> None:
+    """Test that results given by player codes are counted"""
+    fp = tmp_path / "metrics.jsonl"
+    with MetricsWriter(fp) as writer:
+        metrics = TrainingMetrics(writer, QLearningAgent(), QLearningAgent(), 8)
+        metrics.record_many(np.array([X, X, O, EMPTY]), 0.5)
+        metrics.record_many(np.array([X, X, X, EMPTY]), 0.25)
+
+    [record] = read_records(fp)
+    assert record["episode"] == 8
+    assert record["epsilon"] == 0.25
+    assert record["x"]["win"] == 5 / 8
+    assert record["x"]["loss"] == 1 / 8
+    assert record["o"]["draw"] == 2 / 8
+
+
+def test_prometheus(tmp_path: Path) -> None:
+    """Test that the latest record is exported to the Prometheus file"""
+    fp, prom = tmp_path / "metrics.jsonl", tmp_path / "metrics.prom"
+    with MetricsWriter(fp, prom) as writer:
+        metrics = TrainingMetrics(writer, QLearningAgent(), QLearningAgent(), 2)
+        for winner in ["X", "X", None, "O"]:
+            metrics.record(winner, 0.1)
+
+    lines = prom.read_text().splitlines()
+    assert "tictactoe_training_episode 4" in lines
+    assert "tictactoe_training_epsilon 0.1" in lines
+    assert 'tictactoe_training_win{player="x"} 0.0' in lines
+    assert 'tictactoe_training_loss{player="x"} 0.5' in lines
+    assert "# TYPE tictactoe_training_states gauge" in lines
+    assert not (tmp_path / "metrics.prom.tmp").exists()
+
+
+def test_writer_errors(tmp_path: Path) -> None:
+    """Test that a file that can't be opened fails straight away, and an error
+    in the writer thread is raised when the writer is closed"""
+    with pytest.raises(FileNotFoundError):
+        MetricsWriter(tmp_path / "missing" / "metrics.jsonl")
+
+    prom = tmp_path / "missing" / "metrics.prom"
+    writer = MetricsWriter(tmp_path / "metrics.jsonl", prom)
+    TrainingMetrics(writer, QLearningAgent(), QLearningAgent(), 1).record("X", 0.1)
+    with pytest.raises(FileNotFoundError):
+        writer.close()
+
+    writer = MetricsWriter(tmp_path / "metrics.jsonl")
+    writer.write({"episode": object()})
+    with pytest.raises(TypeError):
+        writer.close()
@@ -0,0 +1,95 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.persistence import ArrayQTable, QTable
+from src.training import play_episode, train_parallel
+from src.training.parallel import _storage, train_worker
+
+
+def test_train_worker() -> None:
+    """Test that a worker reports the changes it made, and the states visited"""
+    start = ArrayQTable()
+    start.values[0, 4] = 0.5
+    start.visited[0] = True
+    tables = (start.values, start.visited, start.values.copy(), start.visited.copy())
+
+    x_delta, x_visited, o_delta, o_visited = train_worker(
+        tables, range(10), 10, alpha=0.2, gamma=0.9, symmetric=False, seed=0
+    )
+
+    assert x_visited[0] and x_visited.sum() > 10
+    assert o_visited.sum() > 10
+    assert not x_delta[~x_visited].any()
+    assert not o_delta[~o_visited].any()
+    assert start.values[0, 4] == 0.5  # <- caller's table untouched
+
+
+@pytest.mark.parametrize("merge", ["mean", "hogwild"])
+def test_single_worker_matches_sequential(merge: str) -> None:
+    """Test that one worker trains exactly like a single process would, with the
+    exploration rate following the global schedule"""
+    with ThreadPoolExecutor(1) as executor:
+        parallel_x, parallel_o = train_parallel(
+            300, n_workers=1, sync_interval=100, merge=merge, seed=7, executor=executor
+        )
+
+    player_x = QLearningAgent(qtable=ArrayQTable())
+    player_o = QLearningAgent(qtable=ArrayQTable())
+    for round_idx in range(3):
+        random.seed(7 + round_idx)
+        for episode_idx in range(100 * round_idx, 100 * (round_idx + 1)):
+            play_episode(1.0 - episode_idx / 300, player_x, player_o)
+
+    for parallel, sequential in [(parallel_x, player_x), (parallel_o, player_o)]:
+        assert isinstance(parallel.qtable, ArrayQTable)
+        assert isinstance(sequential.qtable, ArrayQTable)
+        np.testing.assert_allclose(parallel.qtable.values, sequential.qtable.values)
+        assert (parallel.qtable.visited == sequential.qtable.visited).all()
+
+
+@pytest.mark.parametrize("merge", ["mean", "sum"])
+def test_train_parallel_processes(merge: str) -> None:
+    """Test that several worker processes can train a pair of agents"""
+    progress = _Progress()
+    player_x, player_o = train_parallel(
+        1000, n_workers=2, sync_interval=150, merge=merge, seed=0, progress=progress
+    )
+    assert progress.n == 1000
+    assert player_x.qtable.get_value("---------", "11") != 0.0
+    assert any(player_o.qtable.get_values("----X----").values())
+
+
+def test_train_parallel_symmetric() -> None:
+    """Test that symmetric agents can be trained in parallel"""
+    with ThreadPoolExecutor(2) as executor:
+        player_x, _ = train_parallel(
+            200, n_workers=2, sync_interval=50, symmetric=True, executor=executor
+        )
+    assert player_x.qtable.get_values("X--------") == player_x.qtable.get_values(
+        "--X------"
+    )
+
+
+def test_train_parallel_bad_merge() -> None:
+    """Test that an unrecognised merge is rejected"""
+    with pytest.raises(ValueError):
+        train_parallel(10, n_workers=1, merge="median")
+
+
+def test_storage_needs_array_qtable() -> None:
+    """Test that an agent not backed by an ArrayQTable is rejected"""
+    agent = QLearningAgent(qtable=QTable())
+    with pytest.raises(TypeError):
+        _storage(agent)
+
+
+class _Progress:
+    def __init__(self) -> None:
+        self.n = 0
+
+    def update(self, n: int) -> None:
+        self.n += n
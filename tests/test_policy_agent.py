@@ -0,0 +1,121 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.agents import PolicyAgent, QLearningAgent
+from src.agents.policyagent import NO_ACTION, compile_policy
+from src.exceptions import FrozenPolicyError
+from src.games import stateindex
+from src.training import play_episode
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["plain", "symmetric"])
+def trained_agent(request) -> QLearningAgent:
+    random.seed(0)
+    player_x = QLearningAgent(symmetric=request.param)
+    player_o = QLearningAgent(symmetric=request.param)
+    for episode_idx in range(2000):
+        play_episode(1.0 - episode_idx / 2000, player_x, player_o)
+    return player_o
+
+
+def test_compiled_policy_matches_agent(trained_agent: QLearningAgent) -> None:
+    """Test that the compiled policy picks the same move as the agent it was
+    compiled from, in every state"""
+    policy_agent = PolicyAgent(compile_policy(trained_agent.qtable))
+    for state in stateindex.STATES:
+        valid_moves = [(i // 3, i % 3) for i, c in enumerate(state) if c == "-"]
+        if valid_moves:
+            assert policy_agent.select_action(
+                state, valid_moves
+            ) == trained_agent.select_action(state, valid_moves)
+
+
+def test_full_board_has_no_action() -> None:
+    """Test that states with no empty cells have no action"""
+    policy = PolicyAgent().policy
+    assert policy.dtype == np.uint8
+    assert policy[stateindex.state_id("XOXXOOOXX")] == NO_ACTION
+    assert policy[0] == 0  # <- first empty cell
+
+
+def test_restricted_valid_moves() -> None:
+    """Test that the first valid move is played when the policy's move isn't
+    allowed"""
+    policy_agent = PolicyAgent()
+    assert policy_agent.select_action("---------", [(0, 0), (2, 1)]) == (0, 0)
+    assert policy_agent.select_action("---------", [(2, 1), (1, 2)]) == (1, 2)
+
+
+def test_save_load(trained_agent: QLearningAgent, tmp_path: Path) -> None:
+    """Test that a saved policy is loaded back unchanged, and takes up about a
+    byte per state"""
+    policy_agent = PolicyAgent(compile_policy(trained_agent.qtable))
+    path = tmp_path / "agent.policy"
+    policy_agent.save(path)
+    assert path.stat().st_size < stateindex.N_STATES + 16
+
+    loaded = PolicyAgent()
+    loaded.load(path)
+    assert (loaded.policy == policy_agent.policy).all()
+
+
+def test_load_bad_files(tmp_path: Path) -> None:
+    """Test that files which aren't policies, or are for a different version or
+    set of states, are rejected"""
+    path = tmp_path / "agent.policy"
+    path.write_bytes(b"state,00,01,02,10,11,12,20,21,22\n")
+    with pytest.raises(ValueError, match="not a policy"):
+        PolicyAgent().load(path)
+
+    for offset, value in [(4, b"\x02\x00"), (8, b"\x01\x00\x00\x00")]:
+        PolicyAgent().save(path)
+        data = bytearray(path.read_bytes())
+        data[offset : offset + len(value)] = value
+        path.write_bytes(bytes(data))
+        with pytest.raises(ValueError):
+            PolicyAgent().load(path)
+
+
+def test_select_actions(trained_agent: QLearningAgent) -> None:
+    """Test that batches of states get the policy's actions, or random valid
+    actions when exploring"""
+    policy_agent = PolicyAgent(compile_policy(trained_agent.qtable))
+    states = np.array([0, stateindex.state_id("X---O----")])
+    valid_mask = np.array([[c == "-" for c in stateindex.STATES[s]] for s in states])
+    assert (
+        policy_agent.select_actions(states, valid_mask)
+        == trained_agent.select_actions(states, valid_mask)
+    ).all()
+
+    rng = np.random.default_rng(0)
+    explored = np.stack(
+        [
+            policy_agent.select_actions(states, valid_mask, epsilon=1.0, rng=rng)
+            for _ in range(100)
+        ]
+    )
+    assert valid_mask[[0, 1], explored].all()
+    assert len(np.unique(explored[:, 0])) == 9
+
+    with pytest.raises(RuntimeError):
+        policy_agent.select_actions(
+            np.array([stateindex.state_id("XOXXOOOXX")]), np.zeros((1, 9), bool)
+        )
+
+
+def test_select_action_none_available() -> None:
+    """Test that an error is raised when there are no valid moves"""
+    with pytest.raises(RuntimeError):
+        PolicyAgent().select_action("XOXXOOOXX", [])
+
+
+def test_cannot_train() -> None:
+    """Test that a compiled policy refuses to be trained"""
+    policy_agent = PolicyAgent()
+    with pytest.raises(FrozenPolicyError):
+        policy_agent.update("---------", (1, 1), 0.0, "X---O----")
+    with pytest.raises(FrozenPolicyError):
+        policy_agent.update_many(*[np.zeros(1, dtype=int)] * 5)
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from src.training.profiling import SamplingProfiler, profiled
+
+
+def busy() -> int:
+    return sum(i * i for i in range(200000))
+
+
+def test_profiled_cprofile(tmp_path: Path) -> None:
+    """Test that the cProfile report is written to the file"""
+    fp = tmp_path / "profile.txt"
+    with profiled("cprofile", fp):
+        busy()
+    report = fp.read_text()
+    assert "function calls" in report
+    assert "busy" in report
+
+
+def test_profiled_sampling(tmp_path: Path) -> None:
+    """Test that sampled stacks are written in folded format, outermost function
+    first"""
+    fp = tmp_path / "profile.txt"
+    with profiled("sampling", fp):
+        for _ in range(20):
+            busy()
+    lines = fp.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("busy (test_profiling.py" in line for line in lines)
+    assert stack.split(";")[-1] != stack.split(";")[0]
+
+
+def test_sampling_profiler_stop() -> None:
+    """Test that no samples are taken once the profiler has stopped"""
+    with SamplingProfiler(interval=0.0001) as sampler:
+        busy()
+    n_samples = sum(sampler.samples.values())
+    busy()
+    assert sum(sampler.samples.values()) == n_samples
+
+
+def test_profiled_off(tmp_path: Path) -> None:
+    """Test that nothing is written without a profiler"""
+    fp = tmp_path / "profile.txt"
+    with profiled(None, fp):
+        busy()
+    assert not fp.exists()
+
+
+def test_profiled_unrecognised(tmp_path: Path) -> None:
+    with pytest.raises(ValueError), profiled("perf", tmp_path / "profile.txt"):
+        pass
@@ -1,10 +1,13 @@
 import csv
-from copy import deepcopy
+from copy import copy, deepcopy
 from pathlib import Path
 
+import numpy as np
 import pytest
 
-from src.agents.qlearningagent import QLearningAgent
+from src.agents.qlearningagent import QLearningAgent, ValueChanges
+from src.games import stateindex, statekey
+from src.persistence import ArrayQTable, QTable
 
 
 @pytest.fixture
@@ -12,6 +15,11 @@ def qlearningagent():
     return QLearningAgent("O")
 
 
+def set_values(agent: QLearningAgent, state: str, values: dict[str, float]) -> None:
+    for action, value in values.items():
+        agent.qtable.update(state, action, value)
+
+
 def test_select_action(qlearningagent: QLearningAgent) -> None:
     """Test that the correct move is selected from the Q-table for a given state"""
 
@@ -27,32 +35,28 @@ def test_select_action(qlearningagent: QLearningAgent) -> None:
         "21": 1.2,
         "22": 2.0,
     }
-    qlearningagent.qtable.table = {state: values}
+    set_values(qlearningagent, state, values)
     valid_moves_all = [(int(key[0]), int(key[1])) for key in values.keys()]
     row, col = qlearningagent.select_action(state, valid_moves=valid_moves_all)
+    assert (row, col) == (0, 2)
 
-    # Now try limiting valid moves:
+    # Now try limiting valid moves, with the state given by its key:
     valid_moves_limited = [(1, 0), (2, 1), (1, 2)]
-    row, col = qlearningagent.select_action(state, valid_moves=valid_moves_limited)
+    key = statekey.from_str(state)
+    row, col = qlearningagent.select_action(key, valid_moves=valid_moves_limited)
     assert (row, col) == (1, 2)
 
 
+def test_select_action_ties(qlearningagent: QLearningAgent) -> None:
+    """Test that ties go to the lowest action index, whatever order the valid
+    moves are listed in"""
+    set_values(qlearningagent, "----X----", {"01": 1.0, "21": 1.0})
+    valid_moves = [(2, 1), (0, 0), (0, 1)]
+    assert qlearningagent.select_action("----X----", valid_moves) == (0, 1)
+
+
 def test_select_action_none_available(qlearningagent: QLearningAgent) -> None:
-    # Assign arbitrary values to a state:
     state = "----X----"
-    values: dict[str, float] = {
-        "00": 0.0,
-        "01": 0.0,
-        "02": 0.0,
-        "10": 0.0,
-        "11": 0.0,
-        "12": 0.0,
-        "20": 0.0,
-        "21": 0.0,
-        "22": 0.0,
-    }
-    qlearningagent.qtable.table = {state: values}
-
     with pytest.raises(RuntimeError):
         qlearningagent.select_action(
             state,
@@ -64,30 +68,8 @@ def test_update_with_reward(qlearningagent: QLearningAgent) -> None:
     """Test that updates work as expected"""
 
     # Set up Q-Table
-    qlearningagent.qtable.table = {
-        "--X-O----": {
-            "00": 0.0,
-            "01": 0.0,
-            "02": 0.0,
-            "10": 0.0,
-            "11": 0.0,
-            "12": 0.0,
-            "20": 0.0,
-            "21": 0.0,
-            "22": 0.0,
-        },
-        "X-X-O--O-": {
-            "00": 0.0,
-            "01": 100.0,
-            "02": 0.0,
-            "10": 0.0,
-            "11": 0.0,
-            "12": 0.0,
-            "20": 0.0,
-            "21": 0.0,
-            "22": 0.0,
-        },
-    }
+    set_values(qlearningagent, "--X-O----", {})
+    set_values(qlearningagent, "X-X-O--O-", {"01": 100.0})
 
     # Set up qlearningagent:
     qlearningagent.alpha = 0.05
@@ -101,22 +83,57 @@ def test_update_with_reward(qlearningagent: QLearningAgent) -> None:
     )
 
     # Check everything except the updated value:
+    assert isinstance(qlearningagent.qtable, QTable)
     expected_qtable = deepcopy(qlearningagent.qtable.table)
-    updated_val = qlearningagent.qtable.table["--X-O----"].pop("00")
-    del expected_qtable["--X-O----"]["00"]
+    start_key = statekey.from_str("--X-O----")
+    updated_val = qlearningagent.qtable.table[start_key][0]
+    expected_qtable[start_key][0] = updated_val
     assert qlearningagent.qtable.table == expected_qtable
 
     # Check that value of (0, 0) action in Q-table was updated:
     assert updated_val == pytest.approx(4.8)
 
 
+def test_update_with_keys() -> None:
+    """Test that states can be given by their keys, and actions by their
+    indexes"""
+    qlearningagent = QLearningAgent()
+    qlearningagent.qtable.update("X-X-O--O-", "01", 100.0)
+    qlearningagent.update(
+        start_state=statekey.from_str("--X-O----"),
+        action=0,
+        reward=1,
+        new_state=statekey.from_str("X-X-O--O-"),
+    )
+    expected = QLearningAgent()
+    expected.qtable.update("X-X-O--O-", "01", 100.0)
+    expected.update("--X-O----", (0, 0), 1, "X-X-O--O-")
+    assert isinstance(qlearningagent.qtable, QTable)
+    assert isinstance(expected.qtable, QTable)
+    assert qlearningagent.qtable.table == expected.qtable.table
+
+    # ...including NumPy integers, as taken from arrays:
+    from_arrays = QLearningAgent()
+    from_arrays.qtable.update("X-X-O--O-", "01", 100.0)
+    from_arrays.update(
+        start_state=np.int64(statekey.from_str("--X-O----")),
+        action=np.int64(0),
+        reward=1,
+        new_state=np.int64(statekey.from_str("X-X-O--O-")),
+    )
+    assert from_arrays.qtable.get_values("--X-O----") == expected.qtable.get_values(
+        "--X-O----"
+    )
+
+
 def test_save_checkpoint(qlearningagent: QLearningAgent, tmp_path: Path) -> None:
     """Test that the save method generates a CSV file of the correct
     formagt"""
     # Assign arbitrary values to a state:
+    assert isinstance(qlearningagent.qtable, QTable)
     assert qlearningagent.qtable.table == {}
-    qlearningagent.qtable.table["----X----"] = {"00": 0.1, "01": 1.2, "21": 1.2}
-    qlearningagent.qtable.table["O---X----"] = {"12": 10.5, "02": 0.1}
+    set_values(qlearningagent, "----X----", {"00": 0.1, "01": 1.2, "21": 1.2})
+    set_values(qlearningagent, "O---X----", {"12": 10.5, "02": 0.1})
 
     csvpath = tmp_path / "qlearningagent_O.csv"
     qlearningagent.save(csvpath)
@@ -140,10 +157,13 @@ def test_save_checkpoint(qlearningagent: QLearningAgent, tmp_path: Path) -> None
         assert header == expected_header
 
         first_row = next(reader)
-        assert first_row == ["----X----", "0.1", "1.2", "", "", "", "", "", "1.2", ""]
+        assert first_row == ["----X----", "0.1", "1.2", *["0.0"] * 5, "1.2", "0.0"]
 
         second_row = next(reader)
-        assert second_row == ["O---X----", "", "", "0.1", "", "", "10.5", "", "", ""]
+        assert (
+            second_row
+            == ["O---X----", "0.0", "0.0", "0.1", "0.0", "0.0", "10.5"] + ["0.0"] * 3
+        )
 
         with pytest.raises(StopIteration):
             next(reader)  # Exception at end of file (no more rows)
@@ -175,28 +195,288 @@ def test_load_checkpoint(qlearningagent: QLearningAgent, tmp_path: Path) -> None
 
     qlearningagent.load(csvpath)
 
-    print(qlearningagent.qtable.table)
-    assert qlearningagent.qtable.table == {
-        "----X----": {
-            "00": 0.1,
-            "01": 1.2,
-            "02": 0.0,
-            "10": 0.0,
-            "11": 0.0,
-            "12": 0.0,
-            "20": 0.0,
-            "21": 1.2,
-            "22": 0.0,
-        },
-        "O---X----": {
-            "00": 0.0,
-            "01": 0.0,
-            "02": 0.1,
-            "10": 0.0,
-            "11": 0.0,
-            "12": 10.5,
-            "20": 0.0,
-            "21": 0.0,
-            "22": 0.0,
-        },
+    assert qlearningagent.qtable.get_values("----X----") == {
+        "00": 0.1,
+        "01": 1.2,
+        "02": 0.0,
+        "10": 0.0,
+        "11": 0.0,
+        "12": 0.0,
+        "20": 0.0,
+        "21": 1.2,
+        "22": 0.0,
     }
+    assert qlearningagent.qtable.get_values("O---X----") == {
+        "00": 0.0,
+        "01": 0.0,
+        "02": 0.1,
+        "10": 0.0,
+        "11": 0.0,
+        "12": 10.5,
+        "20": 0.0,
+        "21": 0.0,
+        "22": 0.0,
+    }
+    assert qlearningagent.qtable.n_states() == 2
+
+
+def test_update_array_qtable() -> None:
+    """Test that updates give the same values with an ArrayQTable as with the
+    default QTable"""
+    agents = [QLearningAgent(), QLearningAgent(qtable=ArrayQTable())]
+    for agent in agents:
+        agent.qtable.update("X-X-O--O-", "01", 100.0)
+        agent.update(
+            start_state="--X-O----", action=(0, 0), reward=1, new_state="X-X-O--O-"
+        )
+        agent.update(
+            start_state="--X-O----", action=(0, 0), reward=-1, new_state="X-X-O---O"
+        )
+    assert agents[0].qtable.get_values("--X-O----") == agents[1].qtable.get_values(
+        "--X-O----"
+    )
+    assert agents[1].qtable.get_value("--X-O----", "00") == pytest.approx(14.36)
+
+
+@pytest.mark.parametrize("qtable", [QTable, ArrayQTable])
+def test_cached_best_matches_scan(qtable) -> None:
+    """Test that greedy moves and bootstrapping from the cached best of each
+    state match scanning every action, over random updates that raise and lower
+    the best values and leave plenty of ties"""
+    rng = np.random.default_rng(0)
+    cached = QLearningAgent(alpha=0.5, qtable=qtable())
+    scanned = QLearningAgent(alpha=0.5, qtable=qtable(), cache_best=False)
+    keys = rng.choice(stateindex.KEYS, size=8, replace=False).tolist()
+    for _ in range(2000):
+        start, new = rng.choice(keys, size=2).tolist()
+        transition = {
+            "start_state": start,
+            "action": int(rng.integers(9)),
+            "reward": float(rng.choice([-1.0, 0.0, 1.0])),
+            "new_state": new,
+            "done": bool(rng.random() < 0.2),
+        }
+        cached.update(**transition)
+        scanned.update(**transition)
+        assert cached.qtable.action_values(start) == scanned.qtable.action_values(start)
+
+        empty = [
+            cell for cell, symbol in enumerate(statekey.to_str(new)) if symbol == "-"
+        ]
+        if not empty:
+            continue
+        n_moves = int(rng.integers(1, len(empty) + 1))
+        cells = sorted(rng.choice(empty, size=n_moves, replace=False).tolist())
+        valid_moves = [divmod(cell, 3) for cell in cells]
+        values = scanned.qtable.action_values(new)
+        best = max(cells, key=values.__getitem__)
+        assert cached.select_action(new, valid_moves) == divmod(best, 3)
+
+
+def test_cached_best_reset(tmp_path: Path) -> None:
+    """Test that the cached best values are dropped when the Q-table is replaced
+    or loaded"""
+    agent = QLearningAgent()
+    agent.update(statekey.from_str("X--------"), 1, 1.0, "X-O------", done=True)
+    assert agent.select_action("X--------", [(0, 1), (0, 2)]) == (0, 1)
+
+    qtable = QTable()
+    qtable.update("X--------", "02", 1.0)
+    agent.qtable = qtable
+    assert agent.select_action("X--------", [(0, 1), (0, 2)]) == (0, 2)
+
+    qtable.update("X--------", "01", 2.0)
+    qtable.save(tmp_path / "q.csv")
+    agent.qtable = QTable()
+    assert agent.select_action("X--------", [(0, 2), (0, 1)]) == (0, 1)  # <- tie
+    agent.update("X--------", (0, 1), -1.0, "X-O------", done=True)
+    assert agent.select_action("X--------", [(0, 2), (0, 1)]) == (0, 2)
+    agent.load(tmp_path / "q.csv")
+    assert agent.select_action("X--------", [(0, 2), (0, 1)]) == (0, 1)
+
+
+def test_cached_best_direct_writes() -> None:
+    """Test that writing to the Q-table directly leaves the cached best values
+    stale until the cache is cleared"""
+    agent = QLearningAgent(qtable=ArrayQTable())
+    agent.update("X--------", (0, 1), 1.0, "X-O------", done=True)
+    assert agent.select_action("X--------", [(0, 1), (0, 2)]) == (0, 1)
+
+    assert isinstance(agent.qtable, ArrayQTable)
+    agent.qtable.update("X--------", "02", 2.0)
+    assert agent.select_action("X--------", [(0, 1), (0, 2)]) == (0, 1)  # <- stale
+    agent.clear_cache()
+    assert agent.select_action("X--------", [(0, 1), (0, 2)]) == (0, 2)
+
+    agent.qtable.values[stateindex.state_id("X--------"), 8] = 3.0
+    assert agent.select_action("X--------", [(0, 2), (2, 2)]) == (0, 2)  # <- stale
+    agent.clear_cache()
+    assert agent.select_action("X--------", [(0, 2), (2, 2)]) == (2, 2)
+
+
+@pytest.mark.parametrize("qtable", [QTable, ArrayQTable])
+def test_select_actions(qtable) -> None:
+    """Test that the best valid action is selected for each state in a batch"""
+    agent = QLearningAgent(qtable=qtable())
+    agent.qtable.update("----X----", "02", 2.2)
+    agent.qtable.update("----X----", "12", 2.1)
+    agent.qtable.update("---------", "22", -1.0)
+    states = np.array([stateindex.state_id(s) for s in ["----X----"] * 3 + ["-" * 9]])
+    valid_mask = np.ones((4, 9), dtype=np.bool_)
+    valid_mask[1, 2] = False  # <- best action not allowed
+    valid_mask[2] = [False, False, False, True, False, False, False, True, False]
+    valid_mask[3, :8] = False  # <- only the worst action is allowed
+
+    actions = agent.select_actions(states, valid_mask)
+    assert actions.tolist() == [2, 5, 3, 8]  # <- ties go to the lowest index
+
+
+def test_select_actions_matches_select_action() -> None:
+    """Test that the batched selection agrees with select_action() on every
+    reachable state"""
+    agent = QLearningAgent()
+    rng = np.random.default_rng(0)
+    for idx in range(0, stateindex.N_STATES, 7):
+        for action in ["00", "11", "20", "21"]:
+            agent.qtable.update(stateindex.STATES[idx], action, rng.normal())
+
+    states, valid_moves = [], []
+    for idx in range(stateindex.N_STATES):
+        state = stateindex.STATES[idx]
+        moves = [divmod(i, 3) for i, symbol in enumerate(state) if symbol == "-"]
+        if moves:
+            states.append(idx)
+            valid_moves.append(moves)
+    valid_mask = np.zeros((len(states), 9), dtype=np.bool_)
+    for i, moves in enumerate(valid_moves):
+        valid_mask[i, [3 * r + c for r, c in moves]] = True
+
+    actions = agent.select_actions(np.array(states), valid_mask)
+    for idx, moves, action in zip(states, valid_moves, actions.tolist()):
+        assert agent.select_action(stateindex.STATES[idx], moves) == divmod(action, 3)
+
+
+def test_select_actions_explore() -> None:
+    """Test that exploration only ever picks valid actions, and picks all of them"""
+    agent = QLearningAgent(qtable=ArrayQTable())
+    agent.qtable.update("---------", "00", 1.0)
+    valid_mask = np.ones((2000, 9), dtype=np.bool_)
+    valid_mask[:, 4] = False
+    states = np.zeros(2000, dtype=np.intp)
+
+    actions = agent.select_actions(
+        states, valid_mask, epsilon=1.0, rng=np.random.default_rng(0)
+    )
+    assert sorted(set(actions.tolist())) == [0, 1, 2, 3, 5, 6, 7, 8]
+
+    actions = agent.select_actions(states, valid_mask, epsilon=0.5)
+    # Half explore, and 7 in 8 of those pick something other than the best action:
+    assert 0.4 < np.mean(actions != 0) * 8 / 7 < 0.6
+
+
+def test_select_actions_none_available() -> None:
+    """Test that an exception is raised if any state has no valid actions"""
+    agent = QLearningAgent()
+    valid_mask = np.ones((2, 9), dtype=np.bool_)
+    valid_mask[1] = False
+    with pytest.raises(RuntimeError):
+        agent.select_actions(np.array([0, 0]), valid_mask)
+
+
+def _random_transitions(rng: np.random.Generator, n: int, n_states: int):
+    """Random transitions between a handful of states, so that the same (state,
+    action) pairs come up again and again, and new states are often the start
+    states of other transitions"""
+    states = rng.choice(stateindex.N_STATES, size=n_states, replace=False)
+    return (
+        rng.choice(states, size=n),
+        rng.integers(0, 3, size=n),
+        rng.choice([0.0, 1.0, -0.2, -1.0], size=n),
+        rng.choice(states, size=n),
+        rng.random(n) < 0.3,
+    )
+
+
+@pytest.mark.parametrize(
+    "make_agent",
+    [
+        lambda: QLearningAgent(),
+        lambda: QLearningAgent(qtable=ArrayQTable()),
+        lambda: QLearningAgent(qtable=ArrayQTable(), symmetric=True),
+    ],
+)
+@pytest.mark.parametrize("n_states", [5, 50, 2000])
+def test_update_many_matches_update(make_agent, n_states: int) -> None:
+    """Test that a batch update gives the same Q-values as updating one
+    transition at a time, including repeats and transitions that depend on
+    each other"""
+    rng = np.random.default_rng(n_states)
+    looped, batched = make_agent(), make_agent()
+    for _ in range(3):
+        transitions = _random_transitions(rng, 300, n_states)
+        for start, action, reward, new, done in zip(*(t.tolist() for t in transitions)):
+            looped.update(
+                start_state=stateindex.STATES[start],
+                action=divmod(action, 3),
+                reward=reward,
+                new_state=stateindex.STATES[new],
+                done=done,
+            )
+        batched.update_many(*transitions)
+
+    all_states = np.arange(stateindex.N_STATES)
+    np.testing.assert_allclose(
+        batched.qtable.get_rows(all_states),
+        looped.qtable.get_rows(all_states),
+        rtol=1e-12,
+        atol=1e-15,
+    )
+
+
+def test_update_many_repeats() -> None:
+    """Test that repeats of the same (state, action) build on each other"""
+    agent = QLearningAgent(alpha=0.5, gamma=1.0, qtable=ArrayQTable())
+    state = stateindex.state_id("----X----")
+    agent.update_many(
+        start_states=np.array([state] * 3),
+        actions=np.array([0, 0, 0]),
+        rewards=np.array([1.0, 1.0, -1.0]),
+        new_states=np.array([0, 0, 0]),
+        dones=np.array([True, True, True]),
+    )
+    # 0 -> 0.5 -> 0.75 -> -0.125
+    assert agent.qtable.get_value("----X----", "00") == pytest.approx(-0.125)
+
+
+def test_update_many_empty() -> None:
+    """Test that an empty batch changes nothing"""
+    agent = QLearningAgent(qtable=ArrayQTable())
+    empty = np.array([], dtype=np.intp)
+    agent.update_many(empty, empty, empty, empty, empty.astype(np.bool_))
+    assert isinstance(agent.qtable, ArrayQTable)
+    assert not agent.qtable.values.any()
+
+
+def test_changes() -> None:
+    """Test that the size of every change to a Q-value is counted"""
+    agent = QLearningAgent(alpha=0.5, gamma=1.0)
+    agent.update("----X----", (0, 0), 1.0, "X---X---O", done=True)  # 0 -> 0.5
+    agent.update("----X----", (0, 0), -1.0, "X---X---O", done=True)  # -> -0.25
+    agent.update_many(
+        start_states=np.array([stateindex.state_id("X--------")]),
+        actions=np.array([4]),
+        rewards=np.array([0.5]),
+        new_states=np.array([0]),
+        dones=np.array([True]),
+    )  # 0 -> 0.25
+
+    assert agent.changes.count == 3
+    assert agent.changes.mean_since(ValueChanges()) == pytest.approx(1.5 / 3)
+    assert agent.changes.take_max() == pytest.approx(0.75)
+    assert agent.changes.max == 0.0
+
+    earlier = copy(agent.changes)
+    assert agent.changes.mean_since(earlier) == 0.0
+    agent.update("----X----", (0, 0), 0.0, "X---X---O", done=True)  # -> -0.125
+    assert agent.changes.mean_since(earlier) == pytest.approx(0.125)
+    assert agent.changes.max == pytest.approx(0.125)
@@ -4,36 +4,39 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 
+from pathlib import Path
+
+import numpy as np
 import pytest
 
+from src.games import stateindex, statekey
+from src.persistence import ArrayQTable, Persistence, binaryformat
 from src.persistence.qtable import QTable
 
+# X in the centre of the board:
+CENTRE_X = statekey.from_str("----X----")
+
 
 @pytest.fixture
 def qtable():
     return QTable()
 
 
+@pytest.fixture(params=[QTable, ArrayQTable])
+def any_qtable(request) -> Persistence:
+    """Any implementation that must honour the Q-table contract"""
+    return request.param()
+
+
 def test_update_new_entry(qtable: QTable):
-    """Test that the update method adds new entries to the table"""
+    """Test that the update method adds new entries to the table, keyed by the
+    base-3 key of the state with a value for each action index"""
     # Check table is empty:
     assert qtable.table == {}
 
     # Add a new entry:
     qtable.update(state="----X----", action="10", value=100.0)
-    assert qtable.table == {
-        "----X----": {
-            "00": 0.0,
-            "01": 0.0,
-            "02": 0.0,
-            "10": 100.0,
-            "11": 0.0,
-            "12": 0.0,
-            "20": 0.0,
-            "21": 0.0,
-            "22": 0.0,
-        }
-    }
+    assert qtable.table == {CENTRE_X: [0.0, 0.0, 0.0, 100.0, 0.0, 0.0, 0.0, 0.0, 0.0]}
 
 
 def test_update_existing_entry(qtable: QTable):
@@ -43,41 +46,20 @@ def test_update_existing_entry(qtable: QTable):
 
     # Add a new entry:
     qtable.update(state="----X----", action="00", value=100.0)
-    assert qtable.table == {
-        "----X----": {
-            "00": 100.0,
-            "01": 0.0,
-            "02": 0.0,
-            "10": 0.0,
-            "11": 0.0,
-            "12": 0.0,
-            "20": 0.0,
-            "21": 0.0,
-            "22": 0.0,
-        }
-    }
+    assert qtable.table == {CENTRE_X: [100.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]}
 
-    # Update that same another:
-    qtable.update(state="----X----", action="00", value=200.0)
-    assert qtable.table == {
-        "----X----": {
-            "00": 200.0,  # <- updated value
-            "01": 0.0,
-            "02": 0.0,
-            "10": 0.0,
-            "11": 0.0,
-            "12": 0.0,
-            "20": 0.0,
-            "21": 0.0,
-            "22": 0.0,
-        }
-    }
+    # Update that same another, by key and action index:
+    qtable.update(state=CENTRE_X, action=0, value=200.0)
+    assert qtable.table == {CENTRE_X: [200.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]}
 
 
 def test_get_state_values(qtable: QTable):
     """Test that the value of an action in a state can be correctly retrieved"""
-    qtable.table = {"----X----": {"01": 100.0}}  # Q-table is not empty
+    qtable.table = {CENTRE_X: [0.0, 100.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]}
     assert qtable.get_values("----X----", "01") == {"01": 100.0}
+    assert qtable.get_values(CENTRE_X, 1) == {"01": 100.0}
+    assert qtable.get_value(CENTRE_X, 1) == 100.0
+    assert qtable.action_values(CENTRE_X)[1] == 100.0
 
 
 def test_get_state_values_empty(qtable: QTable):
@@ -101,7 +83,7 @@ def test_get_state_values_empty(qtable: QTable):
 def test_get_state_values_all(qtable: QTable):
     """Test that all action values are returned when querying the value of a
     state without providing an action key"""
-    qtable.table = {"----X----": {"01": 100.0}}  # Q-table is not empty
+    qtable.table = {CENTRE_X: [0.0, 100.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]}
     assert qtable.get_values("----X----") == {
         "00": 0.0,
         "01": 100.0,
@@ -113,3 +95,133 @@ def test_get_state_values_all(qtable: QTable):
         "21": 0.0,
         "22": 0.0,
     }
+
+
+def test_contract_empty(any_qtable: Persistence):
+    """Test that every action of an unseen state is worth zero"""
+    assert any_qtable.get_values("----X----") == {
+        "00": 0.0,
+        "01": 0.0,
+        "02": 0.0,
+        "10": 0.0,
+        "11": 0.0,
+        "12": 0.0,
+        "20": 0.0,
+        "21": 0.0,
+        "22": 0.0,
+    }
+    assert any_qtable.get_values("----X----", "00") == {"00": 0.0}
+    assert any_qtable.get_value("----X----", "00") == 0.0
+    assert any_qtable.max_value("----X----") == 0.0
+
+
+def test_contract_update(any_qtable: Persistence):
+    """Test that updated values are returned by every getter"""
+    any_qtable.update(state="----X----", action="10", value=100.0)
+    any_qtable.update(state="----X----", action="10", value=-2.0)
+    any_qtable.update(state="----X----", action="22", value=-1.0)
+
+    assert any_qtable.get_values("----X----") == {
+        "00": 0.0,
+        "01": 0.0,
+        "02": 0.0,
+        "10": -2.0,
+        "11": 0.0,
+        "12": 0.0,
+        "20": 0.0,
+        "21": 0.0,
+        "22": -1.0,
+    }
+    assert any_qtable.get_values("----X----", "10") == {"10": -2.0}
+    assert any_qtable.get_value("----X----", "10") == -2.0
+    assert any_qtable.max_value("----X----") == 0.0  # <- untouched actions
+    assert any_qtable.get_value("---------", "10") == 0.0  # <- other states
+
+
+def test_contract_numpy_ints(any_qtable: Persistence):
+    """Test that states and actions can be given as NumPy integers"""
+    key = np.int64(statekey.from_str("----X----"))
+    any_qtable.update(state=key, action=np.int64(3), value=-2.0)
+    assert any_qtable.get_value("----X----", "10") == -2.0
+    assert any_qtable.get_value(key, np.intp(3)) == -2.0
+    assert any_qtable.n_states() == 1
+
+
+def test_contract_max_value(any_qtable: Persistence):
+    """Test that the highest value is found, even when it's negative"""
+    for action in ["00", "01", "02", "10", "11", "12", "20", "21", "22"]:
+        any_qtable.update(state="---------", action=action, value=-1.0)
+    any_qtable.update(state="---------", action="21", value=-0.5)
+    assert any_qtable.max_value("---------") == -0.5
+
+
+@pytest.mark.parametrize("suffix", [".csv", binaryformat.SUFFIX])
+def test_contract_save_load(any_qtable: Persistence, tmp_path: Path, suffix: str):
+    """Test that a saved table is loaded back with the same values, by either
+    implementation, in either format"""
+    any_qtable.update(state="----X----", action="00", value=0.1)
+    any_qtable.update(state="O---X----", action="12", value=10.5)
+    path = (tmp_path / "qtable").with_suffix(suffix)
+    any_qtable.save(path)
+
+    for loaded in [QTable(), ArrayQTable()]:
+        loaded.load(path)
+        for state in ["----X----", "O---X----", "---------"]:
+            assert loaded.get_values(state) == any_qtable.get_values(state)
+
+
+def test_save_format_matches(tmp_path: Path):
+    """Test that ArrayQTable writes the same CSV file as QTable"""
+    tables = [QTable(), ArrayQTable()]
+    for table in tables:
+        table.update(state="---------", action="11", value=0.5)
+        table.update(state="----X----", action="00", value=-0.25)
+    tables[0].save(tmp_path / "dict.csv")
+    tables[1].save(tmp_path / "array.csv")
+    assert (tmp_path / "dict.csv").read_text() == (tmp_path / "array.csv").read_text()
+
+
+def test_array_row_is_view():
+    """Test that the row of an ArrayQTable is a view into the table, not a copy"""
+    qtable = ArrayQTable()
+    row = qtable.row("----X----")
+    assert np.shares_memory(row, qtable.values)
+    qtable.update(state="----X----", action="02", value=3.0)
+    assert row[2] == 3.0
+
+
+def test_array_fixed_size():
+    """Test that the ArrayQTable takes the same memory however full it is"""
+    qtable = ArrayQTable()
+    nbytes = qtable.nbytes
+    assert nbytes == stateindex.N_STATES * (9 * 8 + 1)
+    qtable.update(state="----X----", action="02", value=3.0)
+    assert qtable.nbytes == nbytes
+
+
+def test_array_unreachable_state():
+    """Test that a KeyError is raised for states that can't come up in a game"""
+    with pytest.raises(KeyError):
+        ArrayQTable().update(state="XXXXXXXXX", action="00", value=1.0)
+
+
+def test_max_value_untouched_actions(qtable: QTable):
+    """Test that actions that haven't been updated are treated as zero"""
+    qtable.update(CENTRE_X, 1, -100.0)
+    assert qtable.max_value("----X----") == 0.0
+
+
+def test_contract_get_rows(any_qtable: Persistence):
+    """Test that the values of a batch of states are returned as an array, with
+    columns in the order of the actions"""
+    any_qtable.update(state="----X----", action="00", value=0.1)
+    any_qtable.update(state="----X----", action="22", value=-0.5)
+    any_qtable.update(state="O---X----", action="12", value=10.5)
+    ids = np.array([stateindex.state_id(s) for s in ["O---X----", "----X----"]])
+    rows = any_qtable.get_rows(np.append(ids, 0))
+    assert rows.tolist() == [
+        [0.0, 0.0, 0.0, 0.0, 0.0, 10.5, 0.0, 0.0, 0.0],
+        [0.1, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, -0.5],
+        [0.0] * 9,
+    ]
+    assert any_qtable.get_rows(np.array([], dtype=np.intp)).shape == (0, 9)
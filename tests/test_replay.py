@@ -0,0 +1,155 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.games import stateindex
+from src.persistence import ArrayQTable
+from src.training import play_episode
+from src.training.replay import ReplayBuffer, ReplayWriter, train_replay
+
+
+def _transitions(n: int, first: int = 0):
+    """n distinct transitions, numbered from first by their state ids"""
+    state_ids = np.arange(first, first + n, dtype=np.int32)
+    return (
+        state_ids,
+        state_ids % 9,
+        state_ids / 10,
+        state_ids + 1,
+        state_ids % 2 == 0,
+    )
+
+
+def test_ring_buffer_wraps() -> None:
+    """Test that once the buffer is full, new transitions replace the oldest"""
+    buffer = ReplayBuffer(3)
+    for state_id, action, reward, next_id, done in zip(
+        *(column.tolist() for column in _transitions(5))
+    ):
+        buffer.add(state_id, action, reward, next_id, done)
+    assert len(buffer) == 3
+    assert sorted(buffer.state_ids.tolist()) == [2, 3, 4]
+    assert sorted(buffer.rewards.tolist()) == pytest.approx([0.2, 0.3, 0.4])
+
+
+@pytest.mark.parametrize("n", [2, 5, 12])
+def test_add_many_matches_add(n: int) -> None:
+    """Test that adding a batch, including more than fit, stores the same as
+    adding its transitions one at a time"""
+    looped, batched = ReplayBuffer(5), ReplayBuffer(5)
+    for buffer in (looped, batched):
+        buffer.add(*(column[0].item() for column in _transitions(1, first=100)))
+    for row in zip(*(column.tolist() for column in _transitions(n))):
+        looped.add(*row)
+    batched.add_many(*_transitions(n))
+
+    assert len(batched) == len(looped) == min(n + 1, 5)
+    for column in ("state_ids", "actions", "rewards", "next_state_ids", "dones"):
+        np.testing.assert_array_equal(getattr(batched, column), getattr(looped, column))
+    # The next transition goes in the same place:
+    for buffer in (looped, batched):
+        buffer.add(200, 0, 0.0, 201, False)
+    np.testing.assert_array_equal(batched.state_ids, looped.state_ids)
+
+
+def test_sample_uniform() -> None:
+    """Test that minibatches are drawn from the stored transitions only, and
+    hold their columns together"""
+    buffer = ReplayBuffer(100, rng=np.random.default_rng(0))
+    buffer.add_many(*_transitions(10))
+    batch = buffer.sample(1000)
+    assert set(batch.state_ids.tolist()) == set(range(10))
+    np.testing.assert_array_equal(batch.state_ids, batch.idxs)
+    np.testing.assert_array_equal(batch.next_state_ids, batch.state_ids + 1)
+    np.testing.assert_array_equal(batch.actions, batch.state_ids % 9)
+
+
+def test_sample_prioritized() -> None:
+    """Test that transitions are drawn in proportion to their priorities, with
+    new ones starting at the highest priority seen so far"""
+    buffer = ReplayBuffer(
+        100, sampling="prioritized", priority_exponent=1.0, rng=np.random.default_rng(0)
+    )
+    buffer.add_many(*_transitions(10))
+    # Every transition has the same priority to start with:
+    counts = np.bincount(buffer.sample(10_000).idxs, minlength=10)
+    assert counts.min() > 800
+
+    buffer.update_priorities(np.arange(10), np.zeros(10))
+    buffer.update_priorities(np.array([3]), np.array([-9.0]))
+    counts = np.bincount(buffer.sample(10_000).idxs, minlength=10)
+    assert counts[3] > 9_000
+
+    buffer.add(50, 0, 0.0, 51, False)
+    assert buffer.priorities[10] == buffer.priorities[3]
+
+
+def test_bad_buffer() -> None:
+    """Test that bad arguments, and sampling from an empty buffer, raise errors"""
+    with pytest.raises(ValueError):
+        ReplayBuffer(0)
+    with pytest.raises(ValueError):
+        ReplayBuffer(10, sampling="newest")
+    with pytest.raises(RuntimeError):
+        ReplayBuffer(10).sample(1)
+
+
+def test_writer_matches_update() -> None:
+    """Test that replaying stored transitions in order trains a player the same
+    as training it during the episodes"""
+    trained_x = QLearningAgent(qtable=ArrayQTable())
+    trained_o = QLearningAgent(qtable=ArrayQTable())
+    random.seed(3)
+    for _ in range(20):
+        play_episode(1.0, trained_x, trained_o)
+
+    replayed_x = QLearningAgent(qtable=ArrayQTable())
+    replayed_o = QLearningAgent(qtable=ArrayQTable())
+    buffers = (ReplayBuffer(1000), ReplayBuffer(1000))
+    random.seed(3)
+    for _ in range(20):
+        play_episode(1.0, replayed_x, replayed_o, consumers=[ReplayWriter(*buffers)])
+    assert replayed_x.qtable.n_states() == 0  # <- only stored
+    for player, buffer in zip((replayed_x, replayed_o), buffers):
+        n = len(buffer)
+        player.update_many(
+            buffer.state_ids[:n],
+            buffer.actions[:n],
+            buffer.rewards[:n],
+            buffer.next_state_ids[:n],
+            buffer.dones[:n],
+        )
+
+    assert isinstance(replayed_x.qtable, ArrayQTable)
+    assert isinstance(replayed_o.qtable, ArrayQTable)
+    assert isinstance(trained_x.qtable, ArrayQTable)
+    assert isinstance(trained_o.qtable, ArrayQTable)
+    np.testing.assert_allclose(replayed_x.qtable.values, trained_x.qtable.values)
+    np.testing.assert_allclose(replayed_o.qtable.values, trained_o.qtable.values)
+
+
+@pytest.mark.parametrize("sampling", ["uniform", "prioritized"])
+def test_train_replay(sampling: str) -> None:
+    """Test that both players learn from minibatches of their own transitions"""
+    player_x = QLearningAgent(qtable=ArrayQTable())
+    player_o = QLearningAgent(qtable=ArrayQTable())
+    buffer_x, buffer_o = train_replay(
+        50,
+        player_x,
+        player_o,
+        capacity=100,
+        batch_size=16,
+        batches_per_episode=2,
+        sampling=sampling,
+        rng=np.random.default_rng(0),
+    )
+    assert len(buffer_x) == 100 and len(buffer_o) == 100
+    # Each player's moves were played on their own turns:
+    for buffer, x_ahead in [(buffer_x, 0), (buffer_o, 1)]:
+        for state_id in buffer.state_ids.tolist():
+            x_marks = stateindex.X_BITS[state_id].bit_count()
+            assert x_marks - stateindex.O_BITS[state_id].bit_count() == x_ahead
+    assert player_x.changes.count > 0 and player_o.changes.count > 0
+    assert player_x.qtable.n_states() > 10 and player_o.qtable.n_states() > 10
@@ -0,0 +1,99 @@
+import pickle
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from src.agents import QLearningAgent
+from src.persistence import ArrayQTable, SharedQTable
+from src.training import play_episode, train_parallel
+from src.training.evaluation import losing_fraction
+
+
+@pytest.fixture
+def shared_qtable():
+    with SharedQTable() as qtable:
+        yield qtable
+
+
+def test_attach(shared_qtable: SharedQTable) -> None:
+    """Test that tables attached by name share their values with the owner"""
+    with SharedQTable.attach(shared_qtable.name) as attached:
+        assert not attached.owner
+        attached.update("----X----", "00", 0.5)
+        assert shared_qtable.get_value("----X----", "00") == 0.5
+        assert shared_qtable.visited.sum() == 1
+
+        shared_qtable.update("X---O----", "22", -1.0)
+        assert attached.get_values("X---O----")["22"] == -1.0
+
+    # The owner can still use the table after others have closed it:
+    assert shared_qtable.max_value("----X----") == 0.5
+
+
+def test_new_table_is_empty(shared_qtable: SharedQTable) -> None:
+    """Test that new tables start out with all values at zero"""
+    assert shared_qtable.owner
+    assert not shared_qtable.values.any()
+    assert not shared_qtable.visited.any()
+
+
+def test_pickle_attaches(shared_qtable: SharedQTable) -> None:
+    """Test that an unpickled table is attached to the same shared memory"""
+    with pickle.loads(pickle.dumps(shared_qtable)) as attached:
+        attached.update("---------", "11", 0.25)
+    assert shared_qtable.get_value("---------", "11") == 0.25
+
+
+def test_unlink() -> None:
+    """Test that a table can't be attached to once it has been unlinked"""
+    qtable = SharedQTable()
+    name = qtable.name
+    qtable.close()
+    qtable.unlink()
+    with pytest.raises(FileNotFoundError):
+        SharedQTable.attach(name)
+
+
+def test_updates_from_other_processes(shared_qtable: SharedQTable) -> None:
+    """Test that updates made in other processes are seen by the owner"""
+    states = ["---------", "X--------", "X---O----", "XX--O----"]
+    with ProcessPoolExecutor(2) as executor:
+        for future in [
+            executor.submit(shared_qtable.update, state, "22", float(i))
+            for i, state in enumerate(states, start=1)
+        ]:
+            future.result()
+    assert [shared_qtable.get_value(state, "22") for state in states] == [1, 2, 3, 4]
+
+
+def test_hogwild_matches_single_process() -> None:
+    """Test that agents trained by several processes updating shared tables at
+    once learn policies as good as agents trained by a single process"""
+    n_episodes = 20000
+    random.seed(0)
+    player_x = QLearningAgent(qtable=ArrayQTable())
+    player_o = QLearningAgent(qtable=ArrayQTable())
+    for episode_idx in range(n_episodes):
+        play_episode(1.0 - episode_idx / n_episodes, player_x, player_o)
+
+    hogwild_x, hogwild_o = train_parallel(
+        n_episodes, n_workers=4, sync_interval=500, merge="hogwild", seed=0
+    )
+
+    assert losing_fraction(hogwild_x, "X") <= losing_fraction(player_x, "X") + 0.02
+    assert losing_fraction(hogwild_o, "O") <= losing_fraction(player_o, "O") + 0.02
+
+
+def test_load(shared_qtable: SharedQTable, tmp_path: Path) -> None:
+    """Test that a saved table is loaded into the shared memory"""
+    saved = ArrayQTable()
+    saved.update("X---O----", "22", 0.75)
+    path = tmp_path / "qtable.qtab"
+    saved.save(path)
+
+    with SharedQTable.attach(shared_qtable.name) as attached:
+        attached.load(path)
+    assert shared_qtable.get_value("X---O----", "22") == 0.75
+    assert shared_qtable.visited.sum() == 1
@@ -0,0 +1,78 @@
+import numpy as np
+
+from src.games import stateindex
+from src.games.solver import DRAW, INVALID, LOSS, WIN, Solver, solve
+
+
+def bits(state: str) -> tuple[int, int]:
+    return stateindex.X_BITS[stateindex.state_id(state)], stateindex.O_BITS[
+        stateindex.state_id(state)
+    ]
+
+
+def brute_force(state: str) -> int:
+    """Minimax without a transposition table, on the string form of a state"""
+    marker, last = ("X", "O") if state.count("X") == state.count("O") else ("O", "X")
+    if _won(state, last):
+        return LOSS
+    if "-" not in state:
+        return DRAW
+    return max(
+        -brute_force(state[:i] + marker + state[i + 1 :])
+        for i in range(9)
+        if state[i] == "-"
+    )
+
+
+def _won(state: str, marker: str) -> bool:
+    lines = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8)]
+    lines += [(0, 4, 8), (2, 4, 6)]
+    return any(all(state[i] == marker for i in line) for line in lines)
+
+
+def test_empty_board_is_a_draw() -> None:
+    solver = Solver()
+    assert solver.value(0, 0) == DRAW
+    assert len(solver.table) == stateindex.N_STATES
+
+
+def test_values() -> None:
+    """Test some positions with known values"""
+    solver = Solver()
+    assert solver.value(*bits("XX--O---O")) == WIN  # <- X completes the top row
+    assert solver.value(*bits("XXX-O---O")) == LOSS  # <- O to move, X has won
+    assert solver.value(*bits("XOXXOOOX-")) == DRAW
+    # X has a fork (two ways to win), so O loses whatever it plays:
+    assert solver.value(*bits("X-X-O-X-O")) == LOSS
+    # Letting O block the top row leaves X with a draw at best:
+    assert solver.action_values(*bits("XX--O---O"))[2] == WIN
+    assert solver.action_values(*bits("XX--O---O"))[5] == DRAW
+
+
+def test_matches_brute_force() -> None:
+    """Test the solver against a search without a transposition table"""
+    values, _ = solve()
+    for idx in range(stateindex.N_STATES - 1, stateindex.N_STATES - 300, -7):
+        assert values[idx] == brute_force(stateindex.STATES[idx])
+    assert values[stateindex.state_id("X---O----")] == brute_force("X---O----")
+
+
+def test_solve_action_values() -> None:
+    """Test that each state's value is that of its best action, and that only
+    empty cells have a value"""
+    values, action_values = solve()
+    valid = action_values != INVALID
+    playable = valid.any(axis=1)
+    np.testing.assert_array_equal(values[playable], action_values[playable].max(axis=1))
+    occupied = np.array(stateindex.X_BITS) | np.array(stateindex.O_BITS)
+    assert not (valid & ((occupied[:, None] >> np.arange(9)) & 1 == 1)).any()
+    assert solve() is solve()
+
+
+def test_blocked_draw_has_no_actions() -> None:
+    """Test that a position where no line can be won is over, like a full board,
+    even with an empty cell left"""
+    values, action_values = solve()
+    idx = stateindex.state_id("XOXXOOOX-")
+    assert values[idx] == DRAW
+    assert (action_values[idx] == INVALID).all()
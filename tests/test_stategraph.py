@@ -0,0 +1,37 @@
+import random
+
+import numpy as np
+
+from src.games import TicTacToe, stategraph, stateindex
+from src.games.vectortictactoe import EMPTY, O, X
+
+
+def test_matches_game() -> None:
+    """Test that following the graph gives the same states and results as playing
+    TicTacToe"""
+    graph = stategraph.build()
+    rng = random.Random(0)
+    codes = {"X": X, "O": O, None: EMPTY}
+    for _ in range(200):
+        game = TicTacToe()
+        idx = 0
+        marker = "X"
+        while not game.is_over():
+            assert not graph.terminal[idx]
+            assert graph.to_move[idx] == codes[marker]
+            valid = [3 * row + col for row, col in game.get_all_valid_moves()]
+            assert np.flatnonzero(graph.legal[idx]).tolist() == valid
+            action = rng.choice(valid)
+            game.play_move(marker, *divmod(action, 3))
+            idx = int(graph.next_ids[idx, action])
+            assert idx == stateindex.board_id(game.board)
+            marker = "O" if marker == "X" else "X"
+        assert graph.terminal[idx]
+        assert graph.winner[idx] == codes[game.winner]
+        assert not graph.legal[idx].any()
+
+
+def test_read_only() -> None:
+    graph = stategraph.build()
+    assert graph is stategraph.build()
+    assert not graph.next_ids.flags.writeable
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from src.games import TicTacToe, stateindex, statekey
+
+
+def test_n_states() -> None:
+    """Test that every reachable position (including terminal ones) is indexed
+    exactly once"""
+    assert stateindex.N_STATES == 5478
+    assert len(set(stateindex.STATES)) == stateindex.N_STATES
+
+
+def test_empty_board_first() -> None:
+    """Test that ids are ordered by the number of marks on the board"""
+    assert stateindex.state_str(0) == "---------"
+    counts = [9 - s.count("-") for s in stateindex.STATES]
+    assert counts == sorted(counts)
+
+
+def test_round_trip() -> None:
+    """Test that every id can be decoded to a string and board and back again"""
+    for idx in range(stateindex.N_STATES):
+        state = stateindex.state_str(idx)
+        board = stateindex.to_board(idx)
+        assert board.as_str() == state
+        assert stateindex.state_id(state) == idx
+        assert stateindex.board_id(board) == idx
+        assert stateindex.bits_id(stateindex.X_BITS[idx], stateindex.O_BITS[idx]) == idx
+
+
+def test_states_seen_in_play_are_indexed() -> None:
+    """Test that every state reached in random games has an id"""
+    rng = random.Random(0)
+    for _ in range(200):
+        game = TicTacToe()
+        marker = "X"
+        while not game.is_over():
+            assert stateindex.state_id(game.board.as_str()) >= 0
+            game.play_move(marker, *rng.choice(game.get_all_valid_moves()))
+            marker = "O" if marker == "X" else "X"
+        assert stateindex.board_id(game.board) >= 0
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        "XXXXXXXXX",  # O never had a turn
+        "O--------",  # O went first
+        "XXXOOO---",  # Play carried on after X won
+    ],
+)
+def test_unreachable_state(state: str) -> None:
+    """Test that a KeyError is raised for states that can't come up in a game"""
+    with pytest.raises(KeyError):
+        stateindex.state_id(state)
+
+
+def test_key_round_trip() -> None:
+    """Test that every id has the base-3 key of its state, and back again"""
+    for idx in range(stateindex.N_STATES):
+        key = stateindex.KEYS[idx]
+        assert statekey.to_str(key) == stateindex.state_str(idx)
+        assert stateindex.key_id(key) == idx
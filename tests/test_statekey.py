@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from src.games import TicTacToe, bitboard, statekey
+
+
+def test_empty_board() -> None:
+    """Test that the empty board has key 0 and the full range is covered"""
+    assert statekey.from_str("---------") == 0
+    assert statekey.from_str("OOOOOOOOO") == statekey.N_KEYS - 1
+
+
+def test_round_trip() -> None:
+    """Test that every key can be decoded to a string and back again"""
+    for key in range(0, statekey.N_KEYS, 7):
+        assert statekey.from_str(statekey.to_str(key)) == key
+
+
+def test_cell_weights() -> None:
+    """Test that cell 3 * row + col is the digit with weight 3 ** (3 * row + col)"""
+    assert statekey.from_str("X--------") == 1
+    assert statekey.from_str("-O-------") == 2 * 3
+    assert statekey.from_str("--------X") == 3**8
+
+
+def test_from_bits() -> None:
+    """Test that the key of a pair of bitboards is the key of their string"""
+    rng = random.Random(0)
+    for _ in range(200):
+        x_bits, o_bits = 0, 0
+        for idx in rng.sample(range(9), rng.randint(0, 9)):
+            if rng.random() < 0.5:
+                x_bits |= 1 << idx
+            else:
+                o_bits |= 1 << idx
+        state = bitboard.as_str(x_bits, o_bits)
+        assert statekey.from_bits(x_bits, o_bits) == statekey.from_str(state)
+
+
+@pytest.mark.parametrize("state", ["", "---", "----------", "--------x", "----?----"])
+def test_from_str_bad_state(state: str) -> None:
+    """Test that a ValueError is raised for strings that aren't states"""
+    with pytest.raises(ValueError):
+        statekey.from_str(state)
+
+
+@pytest.mark.parametrize("key", [-1, statekey.N_KEYS])
+def test_to_str_bad_key(key: int) -> None:
+    """Test that a ValueError is raised for keys out of range"""
+    with pytest.raises(ValueError):
+        statekey.to_str(key)
+
+
+def test_key_follows_play() -> None:
+    """Test that the board's key matches its string through play and undo"""
+    rng = random.Random(1)
+    for _ in range(50):
+        game = TicTacToe()
+        marker = "X"
+        while not game.is_over():
+            game.play_move(marker, *rng.choice(game.get_all_valid_moves()))
+            assert game.board.as_key() == statekey.from_str(game.board.as_str())
+            marker = "O" if marker == "X" else "X"
+        while game.n_moves:
+            game.undo_move()
+            assert game.board.as_key() == statekey.from_str(game.board.as_str())
+        assert game.board.as_key() == 0
+
+
+def test_empty_cells() -> None:
+    """Test that the empty cells of a state are listed by index, in order"""
+    assert statekey.empty_cells(0) == tuple(range(9))
+    assert statekey.empty_cells(statekey.from_str("X---O---X")) == (1, 2, 3, 5, 6, 7)
+    assert statekey.empty_cells(statekey.from_str("XOXOXOOXO")) == ()
+    with pytest.raises(ValueError):
+        statekey.empty_cells(statekey.N_KEYS)
@@ -0,0 +1,46 @@
+import random
+
+from src.agents import QLearningAgent
+from src.persistence import ArrayQTable, QTable, SymmetricQTable
+from src.training import TrainingStats, play_episode
+
+
+def test_timed() -> None:
+    """Test that the time spent in a with statement is added to the phase"""
+    stats = TrainingStats()
+    with stats.timed("save"):
+        sum(range(10000))
+    assert stats.seconds["save"] > 0.0
+    assert stats.seconds["select"] == 0.0
+
+
+def test_count_states() -> None:
+    """Test that the number of states in each player's Q-table is counted"""
+    random.seed(0)
+    stats = TrainingStats()
+    player_x = QLearningAgent()
+    player_o = QLearningAgent(qtable=ArrayQTable(), symmetric=True)
+    for _ in range(50):
+        play_episode(1.0, player_x, player_o, stats=stats)
+
+    stats.count_states(X=player_x.qtable, O=player_o.qtable)
+
+    assert isinstance(player_x.qtable, QTable)
+    assert isinstance(player_o.qtable, SymmetricQTable)
+    assert isinstance(player_o.qtable.inner, ArrayQTable)
+    assert stats.states_discovered == {
+        "X": len(player_x.qtable.table),
+        "O": int(player_o.qtable.inner.visited.sum()),
+    }
+    assert stats.episodes == 50
+    assert stats.episodes_per_second > 0
+
+
+def test_summary() -> None:
+    """Test that the summary reports every phase and the states discovered"""
+    stats = TrainingStats(episodes=10, plies=70, states_discovered={"X": 5, "O": 6})
+    summary = stats.summary()
+    assert summary.startswith("10 episodes, 70 moves in ")
+    for phase in stats.seconds:
+        assert f"  {phase} " in summary
+    assert "States discovered: X 5, O 6" in summary
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.games import stateindex, statekey, symmetry
+from src.persistence import ArrayQTable, QTable, SymmetricQTable
+from src.persistence.interface import ACTIONS
+
+
+@pytest.fixture(params=[QTable, ArrayQTable])
+def symmetric_qtable(request) -> SymmetricQTable:
+    return SymmetricQTable(request.param())
+
+
+def test_update_shared_by_variants(symmetric_qtable: SymmetricQTable) -> None:
+    """Test that a value learned in one orientation is known in all of them"""
+    # X| |
+    # -----
+    #  |O|    Playing "22" (bottom right) here...
+    # -----
+    #  | |
+    symmetric_qtable.update("X---O----", "22", 1.0)
+
+    #  | |X
+    # -----
+    #  |O|    ...is the same as playing "20" (bottom left) here
+    # -----
+    #  | |
+    assert symmetric_qtable.get_value("--X-O----", "20") == 1.0
+    assert symmetric_qtable.get_values("--X-O----", "20") == {"20": 1.0}
+    assert symmetric_qtable.get_values("--X-O----") == {
+        "00": 0.0,
+        "01": 0.0,
+        "02": 0.0,
+        "10": 0.0,
+        "11": 0.0,
+        "12": 0.0,
+        "20": 1.0,
+        "21": 0.0,
+        "22": 0.0,
+    }
+    assert symmetric_qtable.max_value("----O-X--") == 1.0
+
+
+def test_only_canonical_states_stored(tmp_path: Path) -> None:
+    """Test that only the canonical form of each state is stored"""
+    inner = QTable()
+    symmetric_qtable = SymmetricQTable(inner)
+    for t in range(8):
+        symmetric_qtable.update(symmetry.transform("XO-------", t), "22", float(t))
+
+    canonical, _ = symmetry.canonicalize("XO-------")
+    assert list(inner.table) == [statekey.from_str(canonical)]
+
+    csvpath = tmp_path / "symmetric.csv"
+    symmetric_qtable.save(csvpath)
+    loaded = SymmetricQTable(QTable())
+    loaded.load(csvpath)
+    assert loaded.get_values("XO-------") == symmetric_qtable.get_values("XO-------")
+
+
+def test_agent_symmetric() -> None:
+    """Test that a symmetric agent picks the mirror image of a move it learned"""
+    agent = QLearningAgent(symmetric=True)
+    agent.update(
+        start_state="X---O----", action=(2, 2), reward=1, new_state="X-O-O---X"
+    )
+
+    # Bottom right corner learned with X in the top left, so the bottom left corner
+    # is played with X in the top right:
+    valid_moves = [(0, 0), (1, 0), (2, 0)]
+    assert agent.select_action("--X-O----", valid_moves) == (2, 0)
+
+
+def test_get_rows(symmetric_qtable: SymmetricQTable) -> None:
+    """Test that a batch of rows is mapped back onto each state's own board"""
+    symmetric_qtable.update("X---O----", "22", 1.0)
+    symmetric_qtable.update("X---O----", "01", -1.0)
+    states = [symmetry.transform("X---O----", t) for t in range(8)]
+    rows = symmetric_qtable.get_rows(
+        np.array([stateindex.state_id(state) for state in states])
+    )
+    for state, row in zip(states, rows):
+        values = symmetric_qtable.get_values(state)
+        assert row.tolist() == [values[action] for action in ACTIONS]
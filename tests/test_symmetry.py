@@ -0,0 +1,60 @@
+import pytest
+
+from src.games import stateindex, symmetry
+
+
+def test_transforms_are_permutations() -> None:
+    """Test that every transform moves each cell to a different cell"""
+    assert len(set(symmetry.CELL_MAPS)) == 8
+    for cell_map in symmetry.CELL_MAPS:
+        assert sorted(cell_map) == list(range(9))
+        assert cell_map[4] == 4  # <- the centre never moves
+
+
+@pytest.mark.parametrize("t", range(8))
+def test_inverse(t: int) -> None:
+    """Test that applying a transform and then its inverse changes nothing"""
+    state = "XO---X-O-"
+    assert (
+        symmetry.transform(symmetry.transform(state, t), symmetry.INVERSE[t]) == state
+    )
+
+
+def test_transform() -> None:
+    """Test that a transform moves the marks around the board"""
+    # X|O|     | |X
+    # -----    -----
+    #  | |  ->  | |O    (rotate 90 degrees clockwise)
+    # -----    -----
+    #  | |     | |
+    assert symmetry.transform("XO-------", 1) == "--X--O---"
+
+
+def test_canonicalize() -> None:
+    """Test that every variant of a state has the same canonical form, and that
+    the transform turns the state into it"""
+    state = "XO---X-O-"
+    canonical, _ = symmetry.canonicalize(state)
+    for t in range(8):
+        variant = symmetry.transform(state, t)
+        variant_canonical, variant_t = symmetry.canonicalize(variant)
+        assert variant_canonical == canonical
+        assert symmetry.transform(variant, variant_t) == canonical
+    assert symmetry.is_canonical(canonical)
+    assert not symmetry.is_canonical(state)
+
+
+def test_canonicalize_unindexed() -> None:
+    """Test that states which aren't reachable in a game can be canonicalized"""
+    assert symmetry.canonicalize("X-------X") == ("--X---X--", 1)
+
+
+def test_canonical_ids() -> None:
+    """Test that the 5478 reachable states fall into 765 canonical classes"""
+    assert len(set(symmetry.CANONICAL_IDS)) == 765
+    for idx in range(stateindex.N_STATES):
+        canonical = stateindex.state_str(symmetry.CANONICAL_IDS[idx])
+        assert symmetry.canonicalize(stateindex.state_str(idx)) == (
+            canonical,
+            symmetry.TRANSFORMS[idx],
+        )
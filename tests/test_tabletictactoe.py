@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from src.games import TicTacToe
+from src.games.tabletictactoe import IllegalMoveError, TableTicTacToe
+
+
+@pytest.fixture
+def game() -> TableTicTacToe:
+    return TableTicTacToe()
+
+
+def test_matches_tictactoe() -> None:
+    """Test that random games play out the same as on TicTacToe"""
+    rng = random.Random(0)
+    for _ in range(200):
+        game, reference = TableTicTacToe(), TicTacToe()
+        marker = "X"
+        while not reference.is_over():
+            assert not game.is_over()
+            assert game.as_str() == reference.board.as_str()
+            valid_moves = reference.get_all_valid_moves()
+            assert game.get_all_valid_moves() == valid_moves
+            row, col = rng.choice(valid_moves)
+            game.play_move(marker, row, col)
+            reference.play_move(marker, row, col)
+            marker = "O" if marker == "X" else "X"
+        assert game.is_over()
+        assert game.winner == reference.winner
+        assert game.as_str() == reference.board.as_str()
+        assert game.get_all_valid_moves() == []
+
+
+def test_illegal_moves(game: TableTicTacToe) -> None:
+    game.play_move("X", 1, 1)
+    with pytest.raises(IllegalMoveError):
+        game.play_move("O", 1, 1)
+    with pytest.raises(IllegalMoveError):
+        game.play_move("X", 0, 0)
+    with pytest.raises(ValueError):
+        game.play_move("Z", 0, 0)
+    with pytest.raises(ValueError):
+        game.play_move("O", 3, 0)
+
+
+def test_game_over(game: TableTicTacToe) -> None:
+    for marker, row, col in [("X", 0, 0), ("O", 1, 0), ("X", 0, 1), ("O", 1, 1)]:
+        game.play_move(marker, row, col)
+    game.play_move("X", 0, 2)
+    assert game.is_over()
+    assert game.winner == "X"
+    with pytest.raises(IllegalMoveError):
+        game.play_move("O", 2, 2)
+
+    game.reset()
+    assert not game.is_over()
+    assert game.winner is None
+    assert game.as_str() == "---------"
@@ -0,0 +1,110 @@
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.games import statekey
+from src.persistence import ArrayQTable
+from src.training import play_episode
+from src.training.episode import Learner, Transition
+from src.training.threaded import (
+    LockedLearner,
+    StripedLocks,
+    gil_enabled,
+    train_threaded,
+)
+
+
+def test_striped_locks() -> None:
+    """Test that states share a lock by key, and every rotation and reflection
+    of a state shares one when the states are canonical"""
+    locks = StripedLocks(4)
+    assert locks.for_state(1) is locks.for_state(5)
+    assert locks.for_state(1) is not locks.for_state(2)
+
+    symmetric = StripedLocks(64, symmetric=True)
+    corners = [statekey.from_str(s) for s in ["X--------", "--X------", "--------X"]]
+    assert len({id(symmetric.for_state(key)) for key in corners}) == 1
+
+    with pytest.raises(ValueError):
+        StripedLocks(0)
+
+
+def test_locked_learner_loses_no_updates() -> None:
+    """Test that updates to the same state from many threads at once are all
+    applied"""
+    # With alpha and gamma of 1, a transition from a state back to itself with a
+    # reward of 1 adds 1 to the value, so the value counts the updates:
+    qtable = ArrayQTable()
+    key = statekey.from_str("X---O----")
+    transition = Transition("X", key, 0, 1.0, key, False)
+    locks_x, locks_o = StripedLocks(), StripedLocks()
+
+    def update_many_times() -> None:
+        agent = QLearningAgent(alpha=1.0, gamma=1.0, qtable=qtable, cache_best=False)
+        learner = LockedLearner(agent, agent, locks_x, locks_o)
+        for _ in range(2000):
+            learner.consume(transition)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # <- switch threads as often as possible
+    try:
+        with ThreadPoolExecutor(8) as executor:
+            for future in [executor.submit(update_many_times) for _ in range(8)]:
+                future.result()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert qtable.get_value(key, 0) == 8 * 2000
+
+
+def test_single_thread_matches_play_episode() -> None:
+    """Test that one thread trains the players as play_episode does"""
+    player_x, player_o = train_threaded(300, 1, seed=7, report_every=100)
+
+    expected_x = QLearningAgent(qtable=ArrayQTable())
+    expected_o = QLearningAgent(qtable=ArrayQTable())
+    learner = Learner(expected_x, expected_o)
+    for round_idx in range(3):
+        rng = random.Random(7 + round_idx)
+        for episode_idx in range(100 * round_idx, 100 * (round_idx + 1)):
+            play_episode(
+                1.0 - episode_idx / 300,
+                expected_x,
+                expected_o,
+                consumers=[learner],
+                rng=rng,
+            )
+
+    assert isinstance(player_x.qtable, ArrayQTable)
+    assert isinstance(player_o.qtable, ArrayQTable)
+    assert isinstance(expected_x.qtable, ArrayQTable)
+    assert isinstance(expected_o.qtable, ArrayQTable)
+    np.testing.assert_array_equal(player_x.qtable.values, expected_x.qtable.values)
+    np.testing.assert_array_equal(player_o.qtable.values, expected_o.qtable.values)
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_train_threaded(symmetric: bool) -> None:
+    """Test that several threads train both players' shared tables"""
+    player_x, player_o = train_threaded(
+        2000, 4, symmetric=symmetric, report_every=100, seed=0, fallback=False
+    )
+    for player in (player_x, player_o):
+        assert player.qtable.n_states() > 100
+        assert np.abs(player.qtable.get_rows(np.arange(10))).max() <= 1.0
+
+
+def test_fallback() -> None:
+    """Test that with the GIL, training falls back to one thread"""
+    if not gil_enabled():
+        pytest.skip("Free-threaded build")
+    with pytest.warns(RuntimeWarning):
+        train_threaded(10, 4, seed=0)
+
+
+def test_bad_threads() -> None:
+    with pytest.raises(ValueError):
+        train_threaded(10, 0)
@@ -0,0 +1,116 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.persistence import ArrayQTable
+from src.training import TrainingStats, play_episode
+from src.training.consumers import TrajectoryRecorder
+from src.training.episode import Learner
+from src.training.trajectoryfile import (
+    HEADER_SIZE,
+    RECORD,
+    TrajectoryWriter,
+    read,
+    train_offline,
+)
+
+
+def _record(fp: Path, n_episodes: int, chunk_size: int = 65_536, seed: int = 0):
+    """Train two players on n_episodes, writing their transitions to fp, and
+    return them with the trajectories played"""
+    player_x = QLearningAgent(qtable=ArrayQTable())
+    player_o = QLearningAgent(qtable=ArrayQTable())
+    trajectories = TrajectoryRecorder()
+    random.seed(seed)
+    with TrajectoryWriter(fp, chunk_size=chunk_size) as writer:
+        consumers = [Learner(player_x, player_o), trajectories, writer]
+        for episode_idx in range(n_episodes):
+            play_episode(
+                1.0 - episode_idx / n_episodes,
+                player_x,
+                player_o,
+                consumers=consumers,
+            )
+    return player_x, player_o, trajectories.trajectories
+
+
+def test_write_read(tmp_path: Path) -> None:
+    """Test that every transition is written in order, in fixed-width records,
+    whatever the chunk size"""
+    fp = tmp_path / "run.traj"
+    *_, trajectories = _record(fp, 30, chunk_size=7)
+    transitions = [t for trajectory in trajectories for t in trajectory]
+
+    records = read(fp)
+    assert fp.stat().st_size == HEADER_SIZE + len(transitions) * RECORD.itemsize
+    assert len(records) == len(transitions)
+    assert records["state"].tolist() == [t.state for t in transitions]
+    assert records["next_state"].tolist() == [t.next_state for t in transitions]
+    assert records["action"].tolist() == [t.action for t in transitions]
+    assert records["reward"].tolist() == [t.reward for t in transitions]
+    assert records["done"].tolist() == [t.done for t in transitions]
+
+
+def test_read_cut_short(tmp_path: Path) -> None:
+    """Test that a record cut short is ignored, and an empty file has none"""
+    fp = tmp_path / "run.traj"
+    _record(fp, 3)
+    n_records = len(read(fp))
+    with fp.open("ab") as f:
+        f.write(b"\0" * (RECORD.itemsize // 2))
+    assert len(read(fp)) == n_records
+
+    with TrajectoryWriter(tmp_path / "empty.traj"):
+        pass
+    assert len(read(tmp_path / "empty.traj")) == 0
+
+
+def test_read_not_trajectory(tmp_path: Path) -> None:
+    fp = tmp_path / "run.traj"
+    fp.write_bytes(b"QTAB" + b"\0" * 60)
+    with pytest.raises(ValueError):
+        read(fp)
+
+
+@pytest.mark.parametrize("batched", [False, True])
+def test_train_offline_matches_online(tmp_path: Path, batched: bool) -> None:
+    """Test that replaying a file, a chunk at a time, trains the players the
+    same as they were trained while playing"""
+    fp = tmp_path / "run.traj"
+    player_x, player_o, trajectories = _record(fp, 200)
+
+    replayed_x = QLearningAgent(qtable=ArrayQTable())
+    replayed_o = QLearningAgent(qtable=ArrayQTable())
+    stats = TrainingStats()
+    n = train_offline(
+        [fp], replayed_x, replayed_o, chunk_size=100, batched=batched, stats=stats
+    )
+
+    assert n == stats.plies == sum(len(trajectory) for trajectory in trajectories)
+    assert stats.episodes == 200
+    assert isinstance(replayed_x.qtable, ArrayQTable)
+    assert isinstance(replayed_o.qtable, ArrayQTable)
+    assert isinstance(player_x.qtable, ArrayQTable)
+    assert isinstance(player_o.qtable, ArrayQTable)
+    np.testing.assert_allclose(replayed_x.qtable.values, player_x.qtable.values)
+    np.testing.assert_allclose(replayed_o.qtable.values, player_o.qtable.values)
+
+
+def test_train_offline_hyperparameters(tmp_path: Path) -> None:
+    """Test that players with another learning rate learn something else from
+    the same files"""
+    fps = [tmp_path / "a.traj", tmp_path / "b.traj"]
+    for seed, fp in enumerate(fps):
+        _record(fp, 50, seed=seed)
+
+    fast = QLearningAgent(alpha=0.5, qtable=ArrayQTable())
+    slow = QLearningAgent(alpha=0.05, qtable=ArrayQTable())
+    for player in (fast, slow):
+        train_offline(fps, player, QLearningAgent(qtable=ArrayQTable()))
+    assert fast.qtable.n_states() == slow.qtable.n_states() > 0
+    assert isinstance(fast.qtable, ArrayQTable)
+    assert isinstance(slow.qtable, ArrayQTable)
+    assert np.abs(fast.qtable.values).sum() > np.abs(slow.qtable.values).sum()
@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.games import stategraph, stateindex, transitions
+from src.games.vectortictactoe import EMPTY, X
+
+
+def test_build() -> None:
+    """Test a few transitions against the state graph"""
+    table = transitions.build()
+    graph = stategraph.build()
+    assert table.next_ids.shape == (stateindex.N_STATES, 9)
+    assert np.array_equal(table.next_ids, graph.next_ids)
+
+    # X completes the top row:
+    idx = stateindex.state_id("XX--O---O")
+    assert table.terminal[idx, 2]
+    assert table.winner[idx, 2] == X
+    assert not table.terminal[idx, 3]
+    assert table.winner[idx, 3] == EMPTY
+    # Taken cells lead nowhere:
+    assert table.next_ids[idx, 0] == stategraph.NO_STATE
+    assert not table.terminal[idx, 0]
+
+
+def test_load_caches(tmp_path) -> None:
+    """Test that the table is written on first use, and read back after"""
+    fp = tmp_path / "transitions.npz"
+    built = transitions.load(fp)
+    assert fp.exists()
+    assert transitions.load(fp) is built
+
+    transitions.load.cache_clear()
+    loaded = transitions.load(fp)
+    assert loaded is not built
+    for field in ["next_ids", "terminal", "winner"]:
+        assert np.array_equal(getattr(loaded, field), getattr(built, field))
+
+
+def test_load_rebuilds_bad_cache(tmp_path) -> None:
+    """Test that a cache that can't be used is rebuilt"""
+    fp = tmp_path / "transitions.npz"
+    fp.write_bytes(b"not a table")
+    table = transitions.load(fp)
+    assert np.array_equal(table.next_ids, transitions.build().next_ids)
+    with np.load(fp) as cached:
+        assert np.array_equal(cached["next_ids"], table.next_ids)
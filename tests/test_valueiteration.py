@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from src.agents import QLearningAgent
+from src.agents.policyagent import compile_policy
+from src.games import stategraph, stateindex, statekey
+from src.games.vectortictactoe import EMPTY, O
+from src.training.evaluation import evaluate_policy
+from src.training.valueiteration import (
+    DRAW_REWARD,
+    LOSS_REWARD,
+    WIN_REWARD,
+    to_qtable,
+    value_iteration,
+)
+
+
+def test_converges() -> None:
+    """Test that the values stop changing well before the sweep limit"""
+    q, n_sweeps = value_iteration()
+    assert n_sweeps < 20
+    q_again, _ = value_iteration(max_sweeps=n_sweeps + 5)
+    assert np.array_equal(q, q_again)
+
+
+def test_sweep_limit() -> None:
+    """Test that stopping before the values settle is warned about"""
+    with pytest.warns(RuntimeWarning):
+        _, n_sweeps = value_iteration(max_sweeps=2)
+    assert n_sweeps == 2
+
+
+def test_fixed_point() -> None:
+    """Test that every Q-value is what the rules of play_episode give it, with the
+    opponent replying greedily"""
+    gamma = 0.9
+    q, _ = value_iteration(gamma=gamma)
+    graph = stategraph.build()
+
+    def greedy(idx: int) -> int:
+        return int(np.argmax(np.where(graph.legal[idx], q[idx], -np.inf)))
+
+    for idx in range(stateindex.N_STATES):
+        for action in np.flatnonzero(graph.legal[idx]).tolist():
+            after_move = int(graph.next_ids[idx, action])
+            if graph.terminal[after_move]:
+                won = graph.winner[after_move] == graph.to_move[idx]
+                expected = WIN_REWARD if won else DRAW_REWARD
+            else:
+                after_reply = int(graph.next_ids[after_move, greedy(after_move)])
+                if graph.terminal[after_reply]:
+                    lost = graph.winner[after_reply] != EMPTY
+                    expected = LOSS_REWARD if lost else DRAW_REWARD
+                else:
+                    expected = gamma * q[after_reply][graph.legal[after_reply]].max()
+            assert q[idx, action] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("marker", ["X", "O"])
+def test_policy_is_optimal(marker: str) -> None:
+    """Test that the greedy policy of the values never gives away a game"""
+    q, _ = value_iteration()
+    result = evaluate_policy(compile_policy(to_qtable(q, marker)), marker)
+    assert result.exploitability == 0
+    assert result.optimal_fraction == 1.0
+
+
+def test_to_qtable(tmp_path) -> None:
+    """Test that the saved Q-values load into an agent that plays the same moves"""
+    q, _ = value_iteration()
+    qtable = to_qtable(q, "O")
+    state = "X--------"
+    assert qtable.get_values(state) == pytest.approx(
+        dict(zip(qtable.get_values(state), q[stateindex.state_id(state)]))
+    )
+    # Every one of O's turns is in O's table, and nothing else:
+    graph = stategraph.build()
+    o_turns = graph.legal.any(axis=1) & (graph.to_move == O)
+    assert qtable.n_states() == np.count_nonzero(o_turns)
+    states = [statekey.to_str(key) for key in qtable.table]
+    assert all(s.count("X") == s.count("O") + 1 for s in states)
+
+    qtable.save(tmp_path / "q.csv")
+    agent = QLearningAgent()
+    agent.load(tmp_path / "q.csv")
+    assert agent.select_action(state, [(0, 1), (1, 1), (2, 2)]) == (1, 1)
+
+    with pytest.raises(ValueError):
+        to_qtable(q, "Z")
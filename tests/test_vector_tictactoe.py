@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from src.exceptions import IllegalMoveError
+from src.games import TicTacToe, VectorTicTacToe, stateindex
+from src.games.vectortictactoe import EMPTY, O, X
+
+
+@pytest.fixture
+def env() -> VectorTicTacToe:
+    return VectorTicTacToe(3)
+
+
+def test_valid_mask(env: VectorTicTacToe) -> None:
+    """Test that only the empty cells of each board are valid"""
+    assert env.valid_mask().all()
+    env.step(np.array([0, 4, 8]))
+    env.step(np.array([1, 0, 8 - 1]))
+    mask = env.valid_mask()
+    assert mask.sum(axis=1).tolist() == [7, 7, 7]
+    assert not mask[0, 0] and not mask[0, 1]
+    assert not mask[1, 4] and not mask[1, 0]
+    assert not mask[2, 8] and not mask[2, 7]
+
+
+def test_step_illegal(env: VectorTicTacToe) -> None:
+    """Test that playing in an occupied cell raises an IllegalMoveError"""
+    env.step(np.array([0, 1, 2]))
+    with pytest.raises(IllegalMoveError):
+        env.step(np.array([3, 1, 5]))
+
+
+def test_step_win_and_reset(env: VectorTicTacToe) -> None:
+    """Test that a finished board reports its winner, then starts a new game"""
+    # Board 0: X takes the top row. Board 1: O takes the left column.
+    # Board 2: keeps playing
+    moves = [[0, 1, 4], [3, 0, 0], [1, 2, 8], [4, 3, 2], [2, 5, 6], [5, 6, 3]]
+    for turn, actions in enumerate(moves):
+        states, dones, winners = env.step(np.array(actions))
+        if turn == 4:
+            assert dones.tolist() == [True, False, False]
+            assert winners.tolist() == [X, EMPTY, EMPTY]
+            assert stateindex.state_str(int(states[0])) == "XXXOO----"
+            assert env.state_ids[0] == 0  # <- reset
+            assert env.to_move[0] == X
+    assert dones.tolist() == [False, True, False]
+    assert winners.tolist() == [EMPTY, O, EMPTY]
+    assert stateindex.state_str(int(states[1])) == "OXXO-XO--"
+
+
+def test_matches_tictactoe() -> None:
+    """Test that random games play out the same as they do with TicTacToe"""
+    rng = np.random.default_rng(0)
+    n_boards = 64
+    env = VectorTicTacToe(n_boards)
+    games = [TicTacToe() for _ in range(n_boards)]
+    markers = {X: "X", O: "O"}
+    for _ in range(100):
+        valid_mask = env.valid_mask()
+        actions = np.argmax(np.where(valid_mask, rng.random((n_boards, 9)), -1), 1)
+        movers = env.to_move.copy()
+        states, dones, winners = env.step(actions)
+        for i, game in enumerate(games):
+            assert valid_mask[i].tolist() == [
+                (r, c) in game.get_all_valid_moves() for r in range(3) for c in range(3)
+            ]
+            game.play_move(markers[movers[i]], *divmod(int(actions[i]), 3))
+            assert stateindex.board_id(game.board) == states[i]
+            assert game.is_over() == dones[i]
+            assert game.winner == markers.get(winners[i])
+            if game.is_over():
+                games[i] = TicTacToe()
+
+
+def test_reset(env: VectorTicTacToe) -> None:
+    """Test that every board can be set back to an empty board"""
+    env.step(np.array([0, 1, 2]))
+    assert env.reset().tolist() == [0, 0, 0]
+    assert env.valid_mask().all()
+    assert env.to_move.tolist() == [X, X, X]
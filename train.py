@@ -1,12 +1,27 @@
 import argparse
-import cProfile
-import random
+from contextlib import AbstractContextManager, nullcontext
 from pathlib import Path
+from time import perf_counter
 
+import numpy as np
 from tqdm import tqdm
 
-from src.agents import Agent, QLearningAgent
-from src.games import TicTacToe
+from src.agents import Agent, PolicyAgent, QLearningAgent
+from src.agents.policyagent import compile_policy
+from src.games import VectorTicTacToe
+from src.games.vectortictactoe import EMPTY, O, X
+from src.persistence import ArrayQTable, QTable
+from src.training import TrainingStats, play_episode, train_parallel
+from src.training.consumers import MetricsRecorder
+from src.training.convergence import AdaptiveExploration, ConvergenceMonitor
+from src.training.episode import BACKENDS, Consumer, Learner
+from src.training.metrics import TrainingMetrics, metrics_stream
+from src.training.parallel import MERGES
+from src.training.profiling import PROFILERS, profiled
+from src.training.replay import SAMPLINGS, train_replay
+from src.training.threaded import train_threaded
+from src.training.trajectoryfile import TrajectoryWriter, train_offline
+from src.training.valueiteration import to_qtable, value_iteration
 
 
 def configure_cli_args():
@@ -26,118 +41,724 @@ def configure_cli_args():
         "--skip-save",
         action="store_true",
     )
+    parser.add_argument(
+        "--symmetry",
+        action="store_true",
+        help="Share Q-values between rotations and reflections of the board",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Play this many games in lockstep with the vectorized environment",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Spread episodes over this many processes",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="Spread episodes over this many threads sharing the Q-tables (on "
+        "free-threaded Python, else falls back to one thread)",
+    )
+    parser.add_argument(
+        "--sync-interval",
+        type=int,
+        default=1000,
+        help="Episodes each worker plays between Q-table merges. Default=1000",
+    )
+    parser.add_argument(
+        "--merge",
+        choices=MERGES,
+        default="mean",
+        help="How to combine the workers' Q-table changes, or hogwild to have "
+        "them all update shared Q-tables in place. Default=mean",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=PROFILERS,
+        default=None,
+        help="Profile training with cProfile, or by sampling the stack (only the "
+        "main process is profiled)",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=Path,
+        default=Path("profile.txt"),
+        help="Where to write the profile. Default=profile.txt",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="Append training metrics to this JSON Lines file",
+    )
+    parser.add_argument(
+        "--metrics-every",
+        type=int,
+        default=1000,
+        help="Episodes between metrics records. Default=1000",
+    )
+    parser.add_argument(
+        "--prometheus",
+        type=Path,
+        default=None,
+        help="Also export the latest metrics to this Prometheus text file",
+    )
+    parser.add_argument(
+        "--early-stop",
+        action="store_true",
+        help="Adapt exploration to how fast the agents learn, and stop (and save) "
+        "once training has converged, playing at most --n-episodes",
+    )
+    parser.add_argument(
+        "--check-every",
+        type=int,
+        default=1000,
+        help="With --early-stop, episodes between convergence checks. Default=1000",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1e-3,
+        help="With --early-stop, how far the mean Q-value change must fall to "
+        "count as progress. Default=0.001",
+    )
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=5,
+        help="With --early-stop, checks without progress before stopping. Default=5",
+    )
+    parser.add_argument(
+        "--eval-games",
+        type=int,
+        default=0,
+        help="With --early-stop, also score each player on this many games "
+        "against a random opponent at every check. Default=0",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="object",
+        help="Play episodes on TicTacToe objects, or by looking moves up in a "
+        "precomputed transition table (faster, same games). Default=object",
+    )
+    parser.add_argument(
+        "--replay",
+        type=int,
+        default=None,
+        metavar="CAPACITY",
+        help="Record each player's transitions in a replay buffer holding this "
+        "many, and learn from minibatches drawn from it after every episode",
+    )
+    parser.add_argument(
+        "--replay-batch-size",
+        type=int,
+        default=32,
+        help="With --replay, transitions in each minibatch. Default=32",
+    )
+    parser.add_argument(
+        "--replay-batches",
+        type=int,
+        default=1,
+        help="With --replay, minibatches each player learns from after every "
+        "episode. Default=1",
+    )
+    parser.add_argument(
+        "--replay-sampling",
+        choices=SAMPLINGS,
+        default="uniform",
+        help="With --replay, draw minibatches uniformly, or in proportion to "
+        "each transition's last TD error. Default=uniform",
+    )
+    parser.add_argument(
+        "--record",
+        type=Path,
+        default=None,
+        help="Write every transition played to this trajectory file, to train "
+        "on again with --train-from",
+    )
+    parser.add_argument(
+        "--train-from",
+        type=Path,
+        nargs="+",
+        default=None,
+        metavar="PATH",
+        help="Train on the transitions recorded in these trajectory files, in "
+        "order, instead of playing episodes",
+    )
+    parser.add_argument(
+        "--learning-rate",
+        type=float,
+        default=None,
+        help="With --train-from, the players' learning rate. Default=0.2",
+    )
+    parser.add_argument(
+        "--gamma",
+        type=float,
+        default=None,
+        help="With --train-from, the players' discount factor. Default=0.9",
+    )
+    parser.add_argument(
+        "--value-iteration",
+        action="store_true",
+        help="Compute both players' Q-values by value iteration over every state "
+        "of the game instead of playing episodes",
+    )
     args = parser.parse_args()
+    if args.value_iteration and (
+        args.early_stop
+        or args.workers is not None
+        or args.batch_size is not None
+        or args.metrics is not None
+        or args.symmetry
+    ):
+        parser.error(
+            "--value-iteration can't be used with --early-stop, --workers, "
+            "--batch-size, --metrics or --symmetry"
+        )
+    if args.backend != "object" and (
+        args.value_iteration or args.workers is not None or args.batch_size is not None
+    ):
+        parser.error(
+            "--backend can't be used with --value-iteration, --workers or --batch-size"
+        )
+    if args.replay is not None and (
+        args.value_iteration
+        or args.early_stop
+        or args.workers is not None
+        or args.batch_size is not None
+    ):
+        parser.error(
+            "--replay can't be used with --value-iteration, --early-stop, "
+            "--workers or --batch-size"
+        )
+    if args.record is not None and (
+        args.value_iteration
+        or args.workers is not None
+        or args.batch_size is not None
+        or args.replay is not None
+        or args.train_from is not None
+    ):
+        parser.error(
+            "--record can't be used with --value-iteration, --workers, "
+            "--batch-size, --replay or --train-from"
+        )
+    if args.train_from is not None and (
+        args.value_iteration
+        or args.early_stop
+        or args.workers is not None
+        or args.batch_size is not None
+        or args.replay is not None
+        or args.metrics is not None
+    ):
+        parser.error(
+            "--train-from can't be used with --value-iteration, --early-stop, "
+            "--workers, --batch-size, --replay or --metrics"
+        )
+    if args.train_from is None and (
+        args.learning_rate is not None or args.gamma is not None
+    ):
+        parser.error("--learning-rate and --gamma require --train-from")
+    if args.early_stop and (args.workers is not None or args.batch_size is not None):
+        parser.error("--early-stop can't be used with --workers or --batch-size")
+    if args.threads is not None and (
+        args.value_iteration
+        or args.early_stop
+        or args.workers is not None
+        or args.batch_size is not None
+        or args.replay is not None
+        or args.train_from is not None
+        or args.record is not None
+        or args.metrics is not None
+    ):
+        parser.error(
+            "--threads can't be used with --value-iteration, --early-stop, "
+            "--workers, --batch-size, --replay, --train-from, --record or --metrics"
+        )
+    if args.workers is not None and args.batch_size is not None:
+        parser.error("--workers and --batch-size can't be used together")
+    if args.workers is not None and args.metrics is not None:
+        parser.error("--metrics can't be used with --workers")
+    if args.prometheus is not None and args.metrics is None:
+        parser.error("--prometheus requires --metrics")
     return args
 
 
-def main(n_episodes: int, skip_save: bool) -> None:
-    player_x = QLearningAgent()
-    player_o = QLearningAgent()
+def save_agents(
+    player_x: QLearningAgent,
+    player_o: QLearningAgent,
+    stats: None | TrainingStats = None,
+) -> None:
+    """Save both players' Q-tables, and the greedy policies compiled from them"""
+    stats = TrainingStats() if stats is None else stats
+    with stats.timed("save"):
+        for marker, player in [("x", player_x), ("o", player_o)]:
+            fp = Path(f"saves/agent_{marker}_q_table.csv")
+            player.save(fp)
+            PolicyAgent(compile_policy(player.qtable)).save(fp.with_suffix(".policy"))
+
 
-    for episode_idx in tqdm(range(n_episodes)):
-        alpha = 1.0 - episode_idx / n_episodes  # Alpha decays to zero
-        play_episode(alpha, player_x=player_x, player_o=player_o)
+def finish(
+    player_x: QLearningAgent,
+    player_o: QLearningAgent,
+    stats: TrainingStats,
+    skip_save: bool,
+) -> None:
+    """Save the trained players, unless skip_save, and report the stats"""
     if not skip_save:
-        player_x.save(Path("saves/agent_x_q_table.csv"))
-        player_o.save(Path("saves/agent_o_q_table.csv"))
+        save_agents(player_x, player_o, stats)
+    stats.count_states(X=player_x.qtable, O=player_o.qtable)
+    print(stats.summary())
+
+
+def training_consumers(
+    player_x: QLearningAgent,
+    player_o: QLearningAgent,
+    metrics: None | TrainingMetrics,
+    recorder: None | TrajectoryWriter = None,
+) -> list[Consumer]:
+    """Train the players on each episode's transitions as they come, record the
+    results in metrics if given, and the transitions with recorder if given"""
+    consumers: list[Consumer] = [Learner(player_x, player_o)]
+    if metrics is not None:
+        consumers.append(MetricsRecorder(metrics))
+    if recorder is not None:
+        consumers.append(recorder)
+    return consumers
+
+
+def recording(fp: None | Path) -> AbstractContextManager[None | TrajectoryWriter]:
+    """Write transitions to fp while in the context, or nothing if fp is None"""
+    return nullcontext() if fp is None else TrajectoryWriter(fp)
+
+
+def main(
+    n_episodes: int,
+    skip_save: bool,
+    symmetry: bool = False,
+    metrics_fp: None | Path = None,
+    metrics_every: int = 1000,
+    prometheus_fp: None | Path = None,
+    backend: str = "object",
+    record_fp: None | Path = None,
+) -> None:
+    player_x = QLearningAgent(symmetric=symmetry)
+    player_o = QLearningAgent(symmetric=symmetry)
+    stats = TrainingStats()
+
+    with (
+        metrics_stream(
+            metrics_fp, player_x, player_o, metrics_every, prometheus_fp
+        ) as metrics,
+        recording(record_fp) as recorder,
+    ):
+        consumers = training_consumers(player_x, player_o, metrics, recorder)
+        for episode_idx in tqdm(range(n_episodes)):
+            alpha = 1.0 - episode_idx / n_episodes  # Alpha decays to zero
+            play_episode(
+                alpha,
+                player_x=player_x,
+                player_o=player_o,
+                stats=stats,
+                backend=backend,
+                consumers=consumers,
+            )
+    finish(player_x, player_o, stats, skip_save)
+
+
+def main_until_converged(
+    max_episodes: int,
+    skip_save: bool,
+    symmetry: bool = False,
+    check_every: int = 1000,
+    tolerance: float = 1e-3,
+    patience: int = 5,
+    eval_games: int = 0,
+    metrics_fp: None | Path = None,
+    metrics_every: int = 1000,
+    prometheus_fp: None | Path = None,
+    backend: str = "object",
+    record_fp: None | Path = None,
+) -> None:
+    """Train until the Q-values and (with eval_games) the players' scores against
+    a random opponent stop improving, or max_episodes have been played"""
+    player_x = QLearningAgent(symmetric=symmetry)
+    player_o = QLearningAgent(symmetric=symmetry)
+    stats = TrainingStats()
+    monitor = ConvergenceMonitor(
+        player_x,
+        player_o,
+        check_every=check_every,
+        tolerance=tolerance,
+        patience=patience,
+        eval_games=eval_games,
+    )
+    exploration = AdaptiveExploration()
+
+    with (
+        metrics_stream(
+            metrics_fp, player_x, player_o, metrics_every, prometheus_fp
+        ) as metrics,
+        recording(record_fp) as recorder,
+        tqdm(total=max_episodes) as progress,
+    ):
+        consumers = training_consumers(player_x, player_o, metrics, recorder)
+        for episode_idx in range(max_episodes):
+            play_episode(
+                exploration.epsilon,
+                player_x=player_x,
+                player_o=player_o,
+                stats=stats,
+                backend=backend,
+                consumers=consumers,
+            )
+            progress.update()
+            if (episode_idx + 1) % check_every == 0:
+                converged = monitor.check(episode_idx + 1)
+                last = monitor.history[-1]
+                exploration.update(last.q_delta)
+                progress.set_postfix(
+                    epsilon=f"{exploration.epsilon:.3f}", q_delta=f"{last.q_delta:.4f}"
+                )
+                if converged and exploration.settled:
+                    break
+    if monitor.converged():
+        print(f"Converged after {stats.episodes:,} episodes")
+    finish(player_x, player_o, stats, skip_save)
+
+
+def main_batched(
+    n_episodes: int,
+    skip_save: bool,
+    batch_size: int,
+    symmetry: bool = False,
+    metrics_fp: None | Path = None,
+    metrics_every: int = 1000,
+    prometheus_fp: None | Path = None,
+) -> None:
+    player_x = QLearningAgent(qtable=ArrayQTable(), symmetric=symmetry)
+    player_o = QLearningAgent(qtable=ArrayQTable(), symmetric=symmetry)
+    stats = TrainingStats()
 
+    with metrics_stream(
+        metrics_fp, player_x, player_o, metrics_every, prometheus_fp
+    ) as metrics:
+        play_batched(
+            n_episodes,
+            batch_size,
+            player_x=player_x,
+            player_o=player_o,
+            stats=stats,
+            metrics=metrics,
+        )
+    finish(player_x, player_o, stats, skip_save)
 
-def play_episode(
-    alpha: float,
+
+def main_parallel(
+    n_episodes: int,
+    skip_save: bool,
+    workers: int,
+    sync_interval: int,
+    merge: str,
+    symmetry: bool = False,
+) -> None:
+    stats = TrainingStats()
+    with tqdm(total=n_episodes) as progress:
+        player_x, player_o = train_parallel(
+            n_episodes,
+            n_workers=workers,
+            sync_interval=sync_interval,
+            merge=merge,
+            symmetric=symmetry,
+            progress=progress,
+        )
+    # The workers' time isn't broken down into phases:
+    stats.episodes = n_episodes
+    finish(player_x, player_o, stats, skip_save)
+
+
+def main_threaded(
+    n_episodes: int,
+    skip_save: bool,
+    threads: int,
+    symmetry: bool = False,
+    backend: str = "object",
+) -> None:
+    """Train on several threads sharing the players' Q-tables (see
+    src.training.threaded)"""
+    stats = TrainingStats()
+    with tqdm(total=n_episodes) as progress:
+        player_x, player_o = train_threaded(
+            n_episodes,
+            n_threads=threads,
+            symmetric=symmetry,
+            backend=backend,
+            progress=progress,
+        )
+    # The threads' time isn't broken down into phases:
+    stats.episodes = n_episodes
+    finish(player_x, player_o, stats, skip_save)
+
+
+def main_replay(
+    n_episodes: int,
+    skip_save: bool,
+    capacity: int,
+    batch_size: int = 32,
+    batches_per_episode: int = 1,
+    sampling: str = "uniform",
+    symmetry: bool = False,
+    metrics_fp: None | Path = None,
+    metrics_every: int = 1000,
+    prometheus_fp: None | Path = None,
+    backend: str = "object",
+) -> None:
+    """Train on minibatches drawn from replay buffers of the players' transitions
+    (see src.training.replay)"""
+    player_x = QLearningAgent(qtable=ArrayQTable(), symmetric=symmetry)
+    player_o = QLearningAgent(qtable=ArrayQTable(), symmetric=symmetry)
+    stats = TrainingStats()
+
+    with (
+        metrics_stream(
+            metrics_fp, player_x, player_o, metrics_every, prometheus_fp
+        ) as metrics,
+        tqdm(total=n_episodes) as progress,
+    ):
+        train_replay(
+            n_episodes,
+            player_x,
+            player_o,
+            capacity=capacity,
+            batch_size=batch_size,
+            batches_per_episode=batches_per_episode,
+            sampling=sampling,
+            stats=stats,
+            metrics=metrics,
+            backend=backend,
+            progress=progress,
+        )
+    finish(player_x, player_o, stats, skip_save)
+
+
+def main_offline(
+    fps: list[Path],
+    skip_save: bool,
+    learning_rate: float = 0.2,
+    gamma: float = 0.9,
+    symmetry: bool = False,
+) -> None:
+    """Train on the transitions recorded in trajectory files (see
+    src.training.trajectoryfile), without playing any episodes"""
+    player_x = QLearningAgent(
+        alpha=learning_rate, gamma=gamma, qtable=ArrayQTable(), symmetric=symmetry
+    )
+    player_o = QLearningAgent(
+        alpha=learning_rate, gamma=gamma, qtable=ArrayQTable(), symmetric=symmetry
+    )
+    stats = TrainingStats()
+    train_offline(fps, player_x, player_o, stats=stats)
+    finish(player_x, player_o, stats, skip_save)
+
+
+def main_value_iteration(skip_save: bool) -> None:
+    """Compute both players' Q-values by value iteration (see
+    src.training.valueiteration), without playing any episodes"""
+    player_x = QLearningAgent(qtable=QTable())
+    player_o = QLearningAgent(qtable=QTable())
+    stats = TrainingStats()
+    with stats.timed("update"):
+        q, n_sweeps = value_iteration(gamma=player_x.gamma)
+        player_x.qtable = to_qtable(q, "X")
+        player_o.qtable = to_qtable(q, "O")
+    print(f"Value iteration took {n_sweeps} sweeps")
+    finish(player_x, player_o, stats, skip_save)
+
+
+def play_batched(
+    n_episodes: int,
+    batch_size: int,
     player_x: Agent,
     player_o: Agent,
-) -> None | str:
+    rng: None | np.random.Generator = None,
+    stats: None | TrainingStats = None,
+    metrics: None | TrainingMetrics = None,
+) -> None:
     """
-    Alternate between each player starting with X until the game is over
-
-    Arguments:
-    alpha (float): probability of choosing a random action instead of following
-    the policy.
+    Train both players on n_episodes games, played batch_size at a time with
+    VectorTicTacToe. Each board follows the same rules as play_episode: a player
+    is trained on the state after their opponent's reply, or on the final state
+    if the game ended, with alpha decaying to zero as episodes are completed.
+    Players whose Q-values are kept in an ArrayQTable train fastest.
 
-    Returns:
-    The marker of the winner ("X" or "O") or None if the game ends in a draw.
+    Boards still in play once n_episodes games have finished are abandoned.
+    Completed episodes, and the time spent in each phase of every step, are
+    counted in stats if it is given, and the results of the games in metrics.
     """
+    rng = np.random.default_rng() if rng is None else rng
+    stats = TrainingStats() if stats is None else stats
+    players = {X: player_x, O: player_o}
+
+    env = VectorTicTacToe(batch_size)
+    # The last state and action of the player who is waiting for their turn:
+    prev_states = np.zeros(batch_size, dtype=np.int32)
+    prev_actions = np.zeros(batch_size, dtype=np.intp)
+    has_prev = np.zeros(batch_size, dtype=np.bool_)
+
+    n_complete = 0
+    with tqdm(total=n_episodes) as progress:
+        while n_complete < n_episodes:
+            alpha = 1.0 - n_complete / n_episodes  # Alpha decays to zero
+            started = perf_counter()
 
-    # The "new state" for the markov chain isn't after the player plays their
-    # move, but rather after the opponent plays their following move (unless
-    # the game is terminal). So we need to keep track of the previous states.
-    prev_player: None | Agent = None
-    prev_state: None | str = None
-    prev_action: None | tuple[int, int] = None
-
-    game = TicTacToe()
-    while not game.is_over():
-        for player in [player_x, player_o]:
-            marker = "X" if player == player_x else "O"
-
-            # Observe the state:
-            start_state = game.board.as_str()
-            all_valid_moves = game.get_all_valid_moves()
-
-            # Decide between exploration or exploitation:
-            if random.random() > alpha:
-                row, col = player.select_action(start_state, all_valid_moves)
-            else:
-                row, col = random.choice(all_valid_moves)
-
-            # Apply selected move:
-            game.play_move(marker=marker, row=row, col=col)
-
-            # Determine reward if any
-            if game.is_over():
-                # Train this player. Assign reward if it won, else mild punishment
-                # if it's a draw (can't lose on your own round)
-                player.update(
-                    start_state=start_state,
-                    action=(row, col),
-                    reward=1 if game.winner == marker else -0.2,
-                    new_state=game.board.as_str(),
-                    done=True,
+            # Observe the states, and decide between exploration or exploitation:
+            start_states = env.state_ids.copy()
+            movers = env.to_move.copy()
+            valid_mask = env.valid_mask()
+            is_x = movers == X
+            actions = np.empty(batch_size, dtype=np.intp)
+            for moving, player in [(is_x, player_x), (~is_x, player_o)]:
+                actions[moving] = player.select_actions(
+                    start_states[moving], valid_mask[moving], epsilon=alpha, rng=rng
                 )
-                # Train opponent player with bigger punishment if they lost, and
-                # mild punishment if it's a draw (opponent can't win since it's not
-                # their turn):
-                if (
-                    (prev_player is not None)
-                    and (prev_state is not None)
-                    and (prev_action) is not None
-                ):
-                    prev_player.update(
-                        start_state=prev_state,
-                        action=prev_action,
-                        reward=-0.2 if game.winner is None else -1,
-                        new_state=game.board.as_str(),
-                        done=True,
-                    )
-
-                # End episode immediately (don't let other player have a go)
-                break
-            else:
-                # Apply OPPONENT's update method with new state:
-                if (
-                    (prev_player is not None)
-                    and (prev_state is not None)
-                    and (prev_action) is not None
-                ):
-                    prev_player.update(
-                        start_state=prev_state,
-                        action=prev_action,
-                        reward=0,  # always zero for non-terminal states
-                        new_state=game.board.as_str(),
-                        done=False,
-                    )
-
-                # Save for next training round:
-                prev_player = player
-                prev_state = start_state
-                prev_action = (row, col)
-
-    return game.winner
+
+            selected = perf_counter()
+
+            # Apply selected moves:
+            new_states, dones, winners = env.step(actions)
+            stepped = perf_counter()
+
+            for marker, player in players.items():
+                # Train this player on moves that ended the game (can't lose on
+                # your own round):
+                own = dones & (movers == marker)
+                # ...and on their previous move, now that the opponent has
+                # replied (bigger punishment if the reply won the game):
+                opp = has_prev & (movers != marker)
+                opp_rewards = np.where(dones, np.where(winners == EMPTY, -0.2, -1), 0)
+                batch_states = np.concatenate([start_states[own], prev_states[opp]])
+                # Apply updates in order of the number of marks on the board, so
+                # that no transition bootstraps from a state updated before it in
+                # the same batch, and the batch can be applied in one go:
+                order = np.argsort(batch_states, kind="stable")
+                player.update_many(
+                    start_states=batch_states[order],
+                    actions=np.concatenate([actions[own], prev_actions[opp]])[order],
+                    rewards=np.concatenate(
+                        [np.where(winners[own] == marker, 1, -0.2), opp_rewards[opp]]
+                    )[order],
+                    new_states=np.concatenate([new_states[own], new_states[opp]])[
+                        order
+                    ],
+                    dones=np.concatenate([dones[own], dones[opp]])[order],
+                )
+
+            # Save for next training round:
+            prev_states = start_states
+            prev_actions = actions
+            has_prev = ~dones
+
+            n_new = min(int(dones.sum()), n_episodes - n_complete)
+            n_complete += n_new
+            progress.update(n_new)
+            if metrics is not None:
+                metrics.record_many(winners[dones][:n_new], alpha)
+            stats.add(
+                selected - started,
+                stepped - selected,
+                perf_counter() - stepped,
+                batch_size,
+            )
+            stats.episodes += n_new
+
+
+def run(args: argparse.Namespace) -> None:
+    if args.value_iteration:
+        main_value_iteration(skip_save=args.skip_save)
+    elif args.workers is not None:
+        main_parallel(
+            n_episodes=args.n_episodes,
+            skip_save=args.skip_save,
+            workers=args.workers,
+            sync_interval=args.sync_interval,
+            merge=args.merge,
+            symmetry=args.symmetry,
+        )
+    elif args.threads is not None:
+        main_threaded(
+            n_episodes=args.n_episodes,
+            skip_save=args.skip_save,
+            threads=args.threads,
+            symmetry=args.symmetry,
+            backend=args.backend,
+        )
+    elif args.batch_size is not None:
+        main_batched(
+            n_episodes=args.n_episodes,
+            skip_save=args.skip_save,
+            batch_size=args.batch_size,
+            symmetry=args.symmetry,
+            metrics_fp=args.metrics,
+            metrics_every=args.metrics_every,
+            prometheus_fp=args.prometheus,
+        )
+    elif args.train_from is not None:
+        main_offline(
+            fps=args.train_from,
+            skip_save=args.skip_save,
+            learning_rate=0.2 if args.learning_rate is None else args.learning_rate,
+            gamma=0.9 if args.gamma is None else args.gamma,
+            symmetry=args.symmetry,
+        )
+    elif args.replay is not None:
+        main_replay(
+            n_episodes=args.n_episodes,
+            skip_save=args.skip_save,
+            capacity=args.replay,
+            batch_size=args.replay_batch_size,
+            batches_per_episode=args.replay_batches,
+            sampling=args.replay_sampling,
+            symmetry=args.symmetry,
+            metrics_fp=args.metrics,
+            metrics_every=args.metrics_every,
+            prometheus_fp=args.prometheus,
+            backend=args.backend,
+        )
+    elif args.early_stop:
+        main_until_converged(
+            max_episodes=args.n_episodes,
+            skip_save=args.skip_save,
+            symmetry=args.symmetry,
+            check_every=args.check_every,
+            tolerance=args.tolerance,
+            patience=args.patience,
+            eval_games=args.eval_games,
+            metrics_fp=args.metrics,
+            metrics_every=args.metrics_every,
+            prometheus_fp=args.prometheus,
+            backend=args.backend,
+            record_fp=args.record,
+        )
+    else:
+        main(
+            n_episodes=args.n_episodes,
+            skip_save=args.skip_save,
+            symmetry=args.symmetry,
+            metrics_fp=args.metrics,
+            metrics_every=args.metrics_every,
+            prometheus_fp=args.prometheus,
+            backend=args.backend,
+            record_fp=args.record,
+        )
 
 
 if __name__ == "__main__":
     args = configure_cli_args()
-    cProfile.run(
-        "main(n_episodes=args.n_episodes, skip_save=args.skip_save)",
-        sort="tottime",
-    )
+    with profiled(args.profile, args.profile_output):
+        run(args)